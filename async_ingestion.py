@@ -0,0 +1,192 @@
+import time
+import random
+import asyncio
+import argparse
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from data_store import MarketDataStore, CSVSource, YFinanceSource
+
+# Errors worth retrying: network failures and timeouts. ConnectionError, TimeoutError and the
+# requests / curl_cffi errors raised under yfinance are all OSErrors. Anything else, such as a
+# ValueError for an unknown ticker, fails the request at once.
+TRANSIENT_ERRORS = (OSError, asyncio.TimeoutError)
+
+
+class AsyncSource(ABC):
+    # Interface of the ingestion sources: an awaitable fetch() returning a DataFrame of bars for
+    # [start_date, end_date). Subclass it to serve bars from a stub server or fixtures in tests.
+    @abstractmethod
+    async def fetch(self, ticker, start_date, end_date):
+        pass
+
+    def close(self):
+        pass
+
+
+class ThreadedSource(AsyncSource):
+    # Runs a blocking source (YFinanceSource, CSVSource, ...) on a shared thread pool,
+    # so up to max_workers requests are in flight at once
+    def __init__(self, source, max_workers=8):
+        self.source = source
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fetch')
+
+    async def fetch(self, ticker, start_date, end_date):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.source.fetch, ticker, start_date, end_date)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class RateLimiter:
+    # Token bucket: at most `rate` acquisitions per second on average, with bursts of up to `burst`
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class TickerResult:
+    # Outcome of ingesting one ticker
+    __slots__ = ('ticker', 'rows', 'requests', 'attempts', 'seconds', 'error')
+
+    def __init__(self, ticker, rows=0, requests=0, attempts=0, seconds=0.0, error=None):
+        self.ticker = ticker
+        self.rows = rows
+        self.requests = requests
+        self.attempts = attempts
+        self.seconds = seconds
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class AsyncIngestor:
+    """
+    Concurrent ingestion into the MarketDataStore
+    ---------------------------------------------
+    Fetches the missing date ranges of many tickers at once. `concurrency`
+    bounds the requests in flight, an optional token bucket caps them at
+    `rate` per second, and requests that fail with one of the `transient`
+    errors (network failures and timeouts by default) are retried up to
+    `retries` times with exponential backoff and jitter; other errors are not
+    retried. Each ticker reports its rows, request
+    attempts and wall time as it finishes; a ticker that still fails is reported
+    with its error and does not stop the others.
+
+    The source is an AsyncSource; blocking sources are wrapped in ThreadedSource.
+    """
+
+    def __init__(self, store=None, source=None, concurrency=8, rate=None, burst=1, retries=3,
+                 backoff=0.5, max_backoff=30.0, progress=print, transient=TRANSIENT_ERRORS):
+        self.store = store if store is not None else MarketDataStore()
+        if source is None:
+            source = self.store.source
+        self.source = source if isinstance(source, AsyncSource) else ThreadedSource(source, concurrency)
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate, burst) if rate else None
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.transient = transient
+        self.progress = progress
+
+    async def _fetch(self, semaphore, result, ticker, start, end):
+        # One range request with rate limiting and retries of transient errors
+        for attempt in range(self.retries + 1):
+            async with semaphore:
+                if self.limiter is not None:
+                    await self.limiter.acquire()
+                result.attempts += 1
+                try:
+                    return await self.source.fetch(ticker, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+                except self.transient:
+                    if attempt == self.retries:
+                        raise
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    async def _ingest(self, semaphore, ticker, start_date, end_date, counter, total):
+        result = TickerResult(ticker)
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            ranges = self.store.missing_ranges(ticker, start_date, end_date)
+            result.requests = len(ranges)
+            if ranges:
+                frames = await asyncio.gather(*(self._fetch(semaphore, result, ticker, start, end) for start, end in ranges))
+                # Writing touches only this ticker's directory; keep it off the event loop
+                result.rows = await loop.run_in_executor(None, self.store.append, ticker, ranges, frames)
+        except Exception as error:
+            result.error = f"{type(error).__name__}: {error}"
+        result.seconds = time.perf_counter() - started
+        counter[0] += 1
+        if self.progress is not None:
+            status = result.error or f"{result.rows} rows from {result.requests} requests ({result.attempts} attempts)"
+            self.progress(f"[{counter[0]}/{total}] {ticker}: {status} in {result.seconds:.2f}s")
+        return result
+
+    async def ingest(self, tickers, start_date, end_date):
+        # Returns one TickerResult per ticker, in the order given
+        semaphore = asyncio.Semaphore(self.concurrency)
+        counter = [0]
+        return await asyncio.gather(*(self._ingest(semaphore, ticker, start_date, end_date, counter, len(tickers))
+                                      for ticker in tickers))
+
+    def run(self, tickers, start_date, end_date):
+        # Blocking entry point for scripts
+        try:
+            return asyncio.run(self.ingest(list(tickers), start_date, end_date))
+        finally:
+            self.source.close()
+
+
+def main():
+    from batch_runner import load_universe
+    parser = argparse.ArgumentParser(description="Fetch many tickers into the local data store concurrently.")
+    parser.add_argument('--tickers', nargs='+', help="Tickers to fetch (default: all of stocks/tickers.txt)")
+    parser.add_argument('--start', default="2018-01-01")
+    parser.add_argument('--end', default="2024-12-31")
+    parser.add_argument('--concurrency', type=int, default=8, help="Requests in flight at once")
+    parser.add_argument('--rate', type=float, default=None, help="Maximum requests per second")
+    parser.add_argument('--burst', type=int, default=1)
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--backoff', type=float, default=0.5, help="First retry delay in seconds, doubled per retry")
+    parser.add_argument('--source', choices=['yfinance', 'csv'], default='yfinance')
+    args = parser.parse_args()
+
+    if args.source == 'csv':
+        source = CSVSource.from_lists('./stocks/options.txt', './stocks/tickers.txt', './data')
+    else:
+        source = YFinanceSource()
+    tickers = args.tickers or list(load_universe())
+    ingestor = AsyncIngestor(MarketDataStore(source=source), concurrency=args.concurrency, rate=args.rate,
+                             burst=args.burst, retries=args.retries, backoff=args.backoff)
+
+    started = time.perf_counter()
+    results = ingestor.run(tickers, args.start, args.end)
+    failed = [result for result in results if not result.ok]
+    print(f"Fetched {sum(result.rows for result in results)} rows for {len(results) - len(failed)} tickers "
+          f"in {time.perf_counter() - started:.2f}s; {len(failed)} failed")
+
+
+if __name__ == "__main__":
+    main()
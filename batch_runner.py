@@ -0,0 +1,220 @@
+import os
+import io
+import time
+import argparse
+import itertools
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import config
+from data_store import MarketDataStore, CSVSource, YFinanceSource, memory_report
+from results_store import ResultsStore
+from reporting import ReportWriter
+from run_cache import RunCache
+
+STRATEGY_NAMES = ['BollingerKeltnerChaikinSMAStrategy', 'LongOnlyBollingerKeltnerChaikinSMAStrategy']
+DEFAULT_WINDOW = ("2018-01-01", "2024-12-31")
+
+
+class BatchSettings:
+    # How every run of a batch is backtested. backend 'fast' runs on fast_backtest.FastBacktest
+    # instead of backtesting.py; given a run_cache directory, unchanged runs are read from it
+    # (refresh reruns and overwrites them); with execution, every run fills with the costs and
+    # intrabar stops of execution.model_for(ticker); with details, run_task also returns each
+    # run's trades and equity curve for the results store and the reports.
+    def __init__(self, backend='backtesting', run_cache=None, refresh=False, execution=False, details=False):
+        self.backend = backend
+        self.run_cache = run_cache
+        self.refresh = refresh
+        self.execution = execution
+        self.details = details
+
+
+# Per-worker state, filled once by _init_worker and only read afterwards
+_worker_frames = {}
+_worker_strategies = {}
+_worker_settings = BatchSettings()
+_worker_cache = None
+
+
+def load_strategies():
+    # Import the strategy classes lazily so the parent process stays light
+    from strategies.strategy1 import BollingerKeltnerChaikinSMAStrategy
+    from strategies.strategy2 import LongOnlyBollingerKeltnerChaikinSMAStrategy
+    return {
+        'BollingerKeltnerChaikinSMAStrategy': BollingerKeltnerChaikinSMAStrategy,
+        'LongOnlyBollingerKeltnerChaikinSMAStrategy': LongOnlyBollingerKeltnerChaikinSMAStrategy,
+    }
+
+
+def load_universe(options_file='./stocks/options.txt', tickers_file='./stocks/tickers.txt'):
+    # Pair each ticker with its display option, as main() does
+    with open(options_file, 'r') as file:
+        options = [line.strip() for line in file if line.strip()]
+    with open(tickers_file, 'r') as file:
+        tickers = [line.strip() for line in file if line.strip()]
+    return dict(zip(tickers, options))
+
+
+def _init_worker(store_root, tickers, start_date, end_date, settings=None):
+    # Load every ticker once per worker; the memory-mapped store keeps the pages shared between processes.
+    # settings is the batch's BatchSettings (the defaults when None).
+    global _worker_settings, _worker_cache
+    _worker_settings = settings if settings is not None else BatchSettings()
+    _worker_cache = RunCache(_worker_settings.run_cache, config.run_cache_max_bytes, config.run_cache_max_entries,
+                             config.run_cache_max_age_days) if _worker_settings.run_cache else None
+    store = MarketDataStore(store_root)
+    for ticker in tickers:
+        _worker_frames[ticker] = store.frame(ticker, start_date, end_date)
+    _worker_strategies.update(load_strategies())
+
+
+def run_task(task):
+    # Run one (ticker, strategy, window) backtest and return a flat row of its stats
+    from fast_backtest import run_backtest, strategy_params
+    from execution import model_for
+    ticker, strategy_name, start_date, end_date = task
+    execution = model_for(ticker) if _worker_settings.execution else None
+    row = {'Ticker': ticker, 'Strategy': strategy_name, 'Window Start': start_date, 'Window End': end_date}
+    frame = _worker_frames[ticker]
+    data = frame.loc[(frame.index >= pd.Timestamp(start_date)) & (frame.index < pd.Timestamp(end_date))]
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if _worker_cache is not None:
+                output, row['Cached'] = _worker_cache.run(data, _worker_strategies[strategy_name],
+                                                          backend=_worker_settings.backend,
+                                                          refresh=_worker_settings.refresh, execution=execution)
+            else:
+                output = run_backtest(data, _worker_strategies[strategy_name], _worker_settings.backend, execution)
+    except Exception as error:
+        row['Error'] = f"{type(error).__name__}: {error}"
+    else:
+        row.update({key: value for key, value in output.items() if not key.startswith('_')})
+        if _worker_settings.details:
+            row['_trades'] = output['_trades']
+            row['_equity_curve'] = output['_equity_curve']
+            row['_params'] = strategy_params(_worker_strategies[strategy_name], execution)
+    row['Run Time [s]'] = time.perf_counter() - started
+    return row
+
+
+def build_tasks(tickers, strategy_names, windows):
+    # Cross product of tickers x strategies x date windows
+    return [(ticker, strategy_name, start, end)
+            for ticker, strategy_name, (start, end) in itertools.product(tickers, strategy_names, windows)]
+
+
+def save_results(rows, results_store):
+    # Bulk-append the successful runs to a ResultsStore in one transaction, each keyed by
+    # the parameters it ran with (the strategy's defaults unless a run overrode them)
+    runs = []
+    for row in rows:
+        if 'Error' in row:
+            continue
+        metrics = {key: value for key, value in row.items()
+                   if key not in ('Ticker', 'Strategy', 'Window Start', 'Window End')}
+        runs.append((row['Ticker'], row['Strategy'], metrics, row['_params'], row['Window Start'], row['Window End']))
+    return results_store.save_runs(runs)
+
+
+def run_batch(tickers, strategy_names=STRATEGY_NAMES, windows=(DEFAULT_WINDOW,), *, settings=None, processes=None,
+              store=None, results_store=None, reports=None):
+    # Fill the store for the whole span, then fan the runs out over a process pool; settings is a
+    # BatchSettings. Given a ResultsStore, every run's metrics, trades and equity curve are appended
+    # to it; given a ReportWriter, each run's charts are submitted to it as soon as the run returns.
+    settings = settings if settings is not None else BatchSettings()
+    if results_store is not None or reports is not None:
+        settings = BatchSettings(settings.backend, settings.run_cache, settings.refresh, settings.execution, True)
+    store = store if store is not None else MarketDataStore()
+    windows = [tuple(window) for window in windows]
+    start_date = min(start for start, _ in windows)
+    end_date = max(end for _, end in windows)
+    for ticker in tickers:
+        store.update(ticker, start_date, end_date)
+
+    tasks = build_tasks(tickers, strategy_names, windows)
+    processes = processes or os.cpu_count()
+    chunksize = max(1, len(tasks) // (processes * 4))
+    rows = []
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(store.root, list(tickers), start_date, end_date, settings)) as executor:
+        for row in executor.map(run_task, tasks, chunksize=chunksize):
+            if reports is not None and 'Error' not in row:
+                name = f"{row['Ticker']}_{row['Strategy']}_{row['Window Start']}_{row['Window End']}"
+                reports.submit(name, row['_equity_curve'])
+            rows.append(row)
+    if results_store is not None:
+        save_results(rows, results_store)
+    if results_store is not None or reports is not None:
+        rows = [{key: value for key, value in row.items() if not key.startswith('_')} for row in rows]
+    return pd.DataFrame(rows)
+
+
+def parse_window(text):
+    start, end = text.split(':')
+    return start, end
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run every ticker x strategy backtest in parallel.")
+    parser.add_argument('--tickers', nargs='+', help="Tickers to run (default: all of stocks/tickers.txt)")
+    parser.add_argument('--strategies', nargs='+', default=STRATEGY_NAMES, choices=STRATEGY_NAMES)
+    parser.add_argument('--window', action='append', type=parse_window, metavar='START:END',
+                        help="Date window, may be repeated (default: 2018-01-01:2024-12-31)")
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--source', choices=['yfinance', 'csv'], default='yfinance',
+                        help="Where the store fetches missing bars from; 'csv' uses the files in data/")
+    parser.add_argument('--output', default=os.path.join('backtesting_results', 'batch_results.csv'))
+    parser.add_argument('--results-db', default=None,
+                        help="Also append metrics, trades and equity curves to this SQLite results store")
+    parser.add_argument('--reports', default=None, metavar='DIR',
+                        help="Render downsampled equity and drawdown charts for every run into DIR")
+    parser.add_argument('--backend', choices=['backtesting', 'fast'], default='backtesting',
+                        help="'fast' runs the same rules on the array engine in fast_backtest.py")
+    parser.add_argument('--run-cache', nargs='?', const=config.run_cache_dir, default=None, metavar='DIR',
+                        help="Reuse the results of unchanged runs from this run cache (default dir: config.run_cache_dir)")
+    parser.add_argument('--refresh', action='store_true', help="Rerun everything and overwrite the run cache entries")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="Print the memory each worker holds per symbol for its price data")
+    parser.add_argument('--execution', action='store_true',
+                        help="Fill with per-asset spread, slippage and intrabar stops (execution.py, config.execution_*)")
+    args = parser.parse_args()
+
+    tickers = args.tickers or list(load_universe())
+    if args.source == 'csv':
+        source = CSVSource.from_lists('./stocks/options.txt', './stocks/tickers.txt', './data')
+    else:
+        source = YFinanceSource()
+
+    started = time.perf_counter()
+    results_store = ResultsStore(args.results_db) if args.results_db else None
+    reports = ReportWriter(args.reports) if args.reports else None
+    settings = BatchSettings(args.backend, args.run_cache, args.refresh, args.execution)
+    results = run_batch(tickers, args.strategies, args.window or [DEFAULT_WINDOW], settings=settings,
+                        processes=args.processes, store=MarketDataStore(source=source),
+                        results_store=results_store, reports=reports)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    results.to_csv(args.output, index=False)
+    print(f"{len(results)} backtests finished in {time.perf_counter() - started:.2f}s")
+    print(f"Batch results saved to {args.output}")
+    if results_store is not None:
+        results_store.close()
+        print(f"Runs appended to {args.results_db}")
+    if reports is not None:
+        reports.close()
+        print(f"Charts saved to {args.reports}")
+    if args.memory_report:
+        # The frames every worker loads in _init_worker, loaded the same way here
+        store = MarketDataStore(source=source)
+        windows = args.window or [DEFAULT_WINDOW]
+        start_date, end_date = min(start for start, _ in windows), max(end for _, end in windows)
+        report = memory_report({ticker: store.frame(ticker, start_date, end_date) for ticker in tickers})
+        print(report.to_string(index=False))
+        print(f"Per worker: {report['Private Bytes'].sum() / 1024:.0f} KiB private, "
+              f"{report['Shared Bytes'].sum() / 1024:.0f} KiB shared through the page cache "
+              f"(a float64 copy of every column would be {report['Float64 Copy Bytes'].sum() / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
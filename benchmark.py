@@ -0,0 +1,246 @@
+import os
+import io
+import sys
+import json
+import time
+import glob
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+import subprocess
+import numpy as np
+import pandas as pd
+import config
+from data_store import MarketDataStore, CSVSource
+from strategies import indicator_cache, indicators
+from strategies.Strategy1_Backtesting import Strategy1Backtesting
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_results')
+
+
+class Phase:
+    # Times one phase and, when memory tracing is on, records its peak traced allocation
+    def __init__(self, row, name, trace_memory):
+        self.row = row
+        self.name = name
+        self.trace_memory = trace_memory
+
+    def __enter__(self):
+        if self.trace_memory:
+            tracemalloc.start()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.row[f'{self.name}_s'] = time.perf_counter() - self.started
+        if self.trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.row[f'{self.name}_peak_bytes'] = peak
+
+
+def synthetic_frame(bars, seed=0):
+    # Geometric random walk OHLCV on a one-minute calendar, so 1e7 bars fit in Timestamp range
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, bars)))
+    spread = np.abs(rng.normal(0, 0.0005, bars)) * close
+    open_ = np.r_[close[0], close[:-1]]
+    frame = pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Close': close,
+        'Adj Close': close,
+        'Volume': rng.integers(1_000, 1_000_000, bars).astype(np.float64),
+    }, index=pd.date_range('2000-01-03', periods=bars, freq='min', name='Date'))
+    return frame
+
+
+def load_datasets(names):
+    # {dataset name: CSV path} for the files in data/, optionally filtered by name
+    paths = sorted(glob.glob(os.path.join(DATA_DIR, '*_data.csv')))
+    datasets = {os.path.basename(path)[:-len('_data.csv')]: path for path in paths}
+    if names:
+        datasets = {name: path for name, path in datasets.items() if name in names}
+    return datasets
+
+
+def compute_indicators(frame):
+    high, low, close, volume = (frame[column].to_numpy(np.float64) for column in ('High', 'Low', 'Close', 'Volume'))
+    indicators.bbands(close, 20, 2.0)
+    indicators.kc(high, low, close, 20, 2.0)
+    indicators.adosc(high, low, close, volume, 3, 10)
+    indicators.sma(close, 100)
+
+
+def bench_backtest(name, frame, strategy_name, strategy, trace_memory, load_seconds=None):
+    # Indicator init, event loop and results writing for one Backtest.run
+    from backtesting import Backtest
+    from main import save_backtesting_results
+    row = {'benchmark': 'backtest', 'dataset': name, 'strategy': strategy_name, 'bars': len(frame)}
+    if load_seconds is not None:
+        row['data_load_s'] = load_seconds
+    indicator_cache.default_cache = indicator_cache.IndicatorCache(directory=None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        bt = Backtest(frame, strategy, cash=config.initial_balance, commission=config.commission, exclusive_orders=True)
+        with Phase(row, 'indicator_init', trace_memory):
+            compute_indicators(frame)
+        # Warm the strategy's cache so the timed run is dominated by the event loop
+        bt.run()
+        with Phase(row, 'event_loop', trace_memory):
+            output = bt.run()
+        with tempfile.TemporaryDirectory() as directory, Phase(row, 'results_write', trace_memory):
+            save_backtesting_results(output['_equity_curve'], output['_trades'], output,
+                                     os.path.join(directory, 'results.sqlite'))
+    row['bars_per_s'] = len(frame) / row['event_loop_s']
+    return row
+
+
+def bench_apply_signals(name, frame, vectorized, trace_memory):
+    # Strategy1Backtesting on random 2% entry signals, iterrows or array mode
+    rng = np.random.default_rng(1)
+    long_signals = rng.random(len(frame)) < 0.02
+    short_signals = rng.random(len(frame)) < 0.02
+    engine = Strategy1Backtesting(config.initial_balance, config.position_size, config.stop_loss,
+                                  config.profit_target1, config.partial_sell1, config.profit_target2,
+                                  config.partial_sell2, config.days_threshold, config.price_threshold)
+    row = {'benchmark': 'apply_signals_vectorized' if vectorized else 'apply_signals', 'dataset': name, 'bars': len(frame)}
+    data = frame.copy()
+    with Phase(row, 'event_loop', trace_memory):
+        engine.apply_signals(data, long_signals, short_signals, vectorized=vectorized)
+    with Phase(row, 'metrics', trace_memory):
+        engine.calculate_metrics()
+    row['bars_per_s'] = len(frame) / row['event_loop_s']
+    return row
+
+
+def bench_indicators(name, frame, trace_memory):
+    row = {'benchmark': 'indicators', 'dataset': name, 'bars': len(frame)}
+    with Phase(row, 'indicator_init', trace_memory):
+        compute_indicators(frame)
+    row['bars_per_s'] = len(frame) / row['indicator_init_s']
+    return row
+
+
+def bench_process_data(trace_memory):
+    # The process_data path against the local CSV source: cold store, warm store, then CSV export.
+    # The export goes to a temporary directory so the files in data/ are left alone.
+    from batch_runner import load_universe
+    from data_ingestion import load_data, save_to_csv
+    tickers = load_universe()
+    source = CSVSource.from_lists('./stocks/options.txt', './stocks/tickers.txt', DATA_DIR)
+    rows = []
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        store = MarketDataStore(os.path.join(directory, 'store'), source)
+        frames = {}
+        for label in ('cold', 'warm'):
+            row = {'benchmark': f'process_data_{label}', 'dataset': 'universe'}
+            with Phase(row, 'data_load', trace_memory):
+                for ticker in tickers:
+                    frames[ticker] = load_data(ticker, "2018-01-01", "2024-12-31", store)
+            row['bars'] = sum(len(frame) for frame in frames.values())
+            row['bars_per_s'] = row['bars'] / row['data_load_s']
+            rows.append(row)
+        row = {'benchmark': 'process_data_csv_export', 'dataset': 'universe', 'bars': rows[-1]['bars']}
+        with Phase(row, 'results_write', trace_memory):
+            for ticker, option in tickers.items():
+                save_to_csv(frames[ticker], os.path.join(directory, f"{option.lower().replace(' ', '_')}_data.csv"))
+        row['bars_per_s'] = row['bars'] / row['results_write_s']
+        rows.append(row)
+    return rows
+
+
+def run_benchmarks(args):
+    from strategies.strategy1 import BollingerKeltnerChaikinSMAStrategy
+    strategies = {'BollingerKeltnerChaikinSMAStrategy': BollingerKeltnerChaikinSMAStrategy}
+    datasets = load_datasets(args.datasets)
+    frames = {}
+    for name, path in datasets.items():
+        started = time.perf_counter()
+        frames[name] = (pd.read_csv(path, index_col='Date', parse_dates=True), time.perf_counter() - started)
+    for bars in args.synthetic:
+        started = time.perf_counter()
+        frames[f'synthetic_{bars}'] = (synthetic_frame(bars), time.perf_counter() - started)
+
+    rows = []
+    for name, (frame, load_seconds) in frames.items():
+        print(f"Benchmarking {name} ({len(frame)} bars)")
+        rows.append(bench_indicators(name, frame, args.memory))
+        rows.append(bench_apply_signals(name, frame, True, args.memory))
+        if len(frame) <= args.max_event_bars:
+            rows.append(bench_apply_signals(name, frame, False, args.memory))
+            for strategy_name, strategy in strategies.items():
+                rows.append(bench_backtest(name, frame, strategy_name, strategy, args.memory, load_seconds))
+    if 'process_data' in args.include:
+        rows.extend(bench_process_data(args.memory))
+    return rows
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(current, baseline_file):
+    # Print the speed ratio of every benchmark also present in the baseline
+    with open(baseline_file, 'r') as file:
+        baseline = json.load(file)
+    key = lambda row: (row['benchmark'], row['dataset'], row.get('strategy'), row['bars'])
+    previous = {key(row): row for row in baseline['results']}
+    print(f"Compared with {baseline['commit']}:")
+    for row in current['results']:
+        old = previous.get(key(row))
+        if old and old.get('bars_per_s'):
+            ratio = row['bars_per_s'] / old['bars_per_s']
+            print(f"  {row['benchmark']:<26} {row['dataset']:<32} {ratio:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backtest throughput and indicator latency offline.")
+    parser.add_argument('--datasets', nargs='*', help="Names from data/ (default: all), e.g. spy tsla")
+    parser.add_argument('--synthetic', nargs='*', type=int, default=[100_000, 1_000_000],
+                        help="Sizes of synthetic series to add, in bars")
+    parser.add_argument('--max-event-bars', type=int, default=100_000,
+                        help="Skip the per-bar engines (Backtest, iterrows) above this many bars")
+    parser.add_argument('--include', nargs='*', default=['process_data'])
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help="Skip tracemalloc, which slows down Python-heavy phases")
+    parser.add_argument('--output', default=None, help="JSON file (default: benchmark_results/<commit>.json)")
+    parser.add_argument('--compare', default=None, help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rows = run_benchmarks(args)
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'timestamp': pd.Timestamp.now().isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'memory_traced': args.memory,
+        'total_s': time.perf_counter() - started,
+        'results': rows,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=2, default=float)
+
+    table = pd.DataFrame(rows)
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(table[['benchmark', 'dataset', 'bars', 'bars_per_s']].to_string(index=False))
+    print(f"Benchmark results saved to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import config
+from data_store import MarketDataStore, OHLCV_COLUMNS
+from strategies import indicators, rules
+from strategies.Strategy1_Backtesting import Strategy1Backtesting
+
+DEFAULT_CHUNK_BARS = 1_000_000
+
+
+def iter_csv_chunks(filename, chunk_bars=DEFAULT_CHUNK_BARS, start_date=None, end_date=None):
+    # OHLCV frames of up to chunk_bars rows from a data/*.csv style file, read lazily. Only bars in
+    # [start_date, end_date) are kept, as MarketDataStore.load does; the file is in date order, so
+    # reading stops at the first bar past end_date.
+    start = None if start_date is None else pd.Timestamp(start_date)
+    end = None if end_date is None else pd.Timestamp(end_date)
+    for chunk in pd.read_csv(filename, index_col='Date', parse_dates=True, chunksize=chunk_bars):
+        if end is not None and chunk.index[0] >= end:
+            break
+        if start is not None:
+            chunk = chunk[chunk.index >= start]
+        if end is not None:
+            chunk = chunk[chunk.index < end]
+        if len(chunk):
+            yield chunk
+
+
+def iter_store_chunks(store, ticker, start_date=None, end_date=None, chunk_bars=DEFAULT_CHUNK_BARS):
+    # Frames over consecutive slices of the memory-mapped store; only one chunk is read into memory at a time
+    arrays = store.load(ticker, start_date, end_date, OHLCV_COLUMNS)
+    for lo in range(0, len(arrays['Date']), chunk_bars):
+        index = pd.DatetimeIndex(np.array(arrays['Date'][lo:lo + chunk_bars]), name='Date')
+        yield pd.DataFrame({column: np.array(arrays[column][lo:lo + chunk_bars]) for column in OHLCV_COLUMNS},
+                           index=index)
+
+
+def _continue_ema(values, length, previous):
+    # EMA of a new chunk, carrying on from the previous chunk's last EMA value
+    alpha = 2.0 / (length + 1)
+    series = pd.Series(np.concatenate([[previous], values]))
+    return series.ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+
+
+class ChunkedSignals:
+    """
+    Chunk-by-chunk Bollinger-Keltner Chaikin SMA signals
+    ----------------------------------------------------
+    update() takes one OHLCV chunk and returns its long and short entry
+    signals, equal to computing the indicators in strategies/indicators.py over
+    the whole history at once and applying the entry rules of
+    strategies/rules.py. State carried between chunks is bounded: the last
+    max-window bars for the rolling SMA and Bollinger Bands, the last value of
+    each EMA (Keltner basis and band, Chaikin fast and slow), the A/D line
+    level, the previous close and the last bar of every entry series. Until the
+    EMAs are seeded all bars seen so far are still inside the carried window,
+    so the warm-up matches the batch computation.
+    """
+
+    def __init__(self, bb_length=20, bb_std=2.0, kc_length=20, kc_scalar=2.0,
+                 adosc_fast=3, adosc_slow=10, sma_length=100, long_only=False):
+        self.bb_length = bb_length
+        self.bb_std = bb_std
+        self.kc_length = kc_length
+        self.kc_scalar = kc_scalar
+        self.adosc_fast = adosc_fast
+        self.adosc_slow = adosc_slow
+        self.sma_length = sma_length
+        self.rules = rules.RuleSet(long_only=long_only)
+        self.window = max(bb_length, sma_length, kc_length, adosc_slow) + 1
+        self.history = None
+        self.keltner = None
+        self.chaikin = None
+        self.last = None
+
+    def _keltner(self, high, low, close, m):
+        if self.keltner is not None:
+            prev_basis, prev_band = self.keltner
+            ranges = indicators.true_range(high[-m - 1:], low[-m - 1:], close[-m - 1:])[1:]
+            basis = _continue_ema(close[-m:], self.kc_length, prev_basis)
+            band = _continue_ema(ranges, self.kc_length, prev_band)
+        else:
+            # Same as indicators.kc while everything seen so far is still in the carried window
+            basis = indicators.ema(close, self.kc_length, 0)[-m:]
+            band = indicators.ema(indicators.true_range(high, low, close), self.kc_length, 0)[-m:]
+        if np.isfinite(basis[-1]) and np.isfinite(band[-1]):
+            self.keltner = (basis[-1], band[-1])
+        return basis - self.kc_scalar * band, basis + self.kc_scalar * band
+
+    def _chaikin(self, high, low, close, volume, m):
+        if self.chaikin is not None:
+            prev_line, prev_fast, prev_slow = self.chaikin
+            line = prev_line + indicators.ad(high[-m:], low[-m:], close[-m:], volume[-m:])
+            fast = _continue_ema(line, self.adosc_fast, prev_fast)
+            slow = _continue_ema(line, self.adosc_slow, prev_slow)
+        else:
+            line = indicators.ad(high, low, close, volume)
+            fast = indicators.ema(line, self.adosc_fast)
+            slow = indicators.ema(line, self.adosc_slow)
+            line, fast, slow = line[-m:], fast[-m:], slow[-m:]
+        if np.isfinite(fast[-1]) and np.isfinite(slow[-1]):
+            self.chaikin = (line[-1], fast[-1], slow[-1])
+        return fast - slow
+
+    def update(self, chunk):
+        # (long_signals, short_signals) boolean arrays for the bars of this chunk
+        new = [chunk[column].to_numpy(np.float64) for column in ('High', 'Low', 'Close', 'Volume')]
+        m = len(new[2])
+        if self.history is not None:
+            new = [np.concatenate([old, values]) for old, values in zip(self.history, new)]
+        high, low, close, volume = new
+
+        bb_lower, _, bb_upper = (band[-m:] for band in indicators.bbands(close, self.bb_length, self.bb_std))
+        sma = indicators.sma(close, self.sma_length)[-m:]
+        kc_lower, kc_upper = self._keltner(high, low, close, m)
+        chaikin = self._chaikin(high, low, close, volume, m)
+
+        current = {'bb_upper': bb_upper, 'bb_lower': bb_lower, 'kc_upper': kc_upper, 'kc_lower': kc_lower,
+                   'chaikin': chaikin, 'sma': sma}
+        previous = rules.shifted(current, self.last)
+        self.last = {name: values[-1] for name, values in current.items()}
+        self.history = [values[-self.window:].copy() for values in new]
+        return self.rules.entry_signals(current, previous)
+
+
+class ChunkedBacktest:
+    """
+    Out-of-core backtest over OHLCV chunks
+    --------------------------------------
+    Streams chunks through ChunkedSignals and Strategy1Backtesting's array
+    engine, which keeps its open position between calls. After each chunk the
+    engine's trade log and equity curve are appended to CSV files in
+    output_dir and cleared, so memory depends on the chunk size only. The
+    summary metrics are the engine's own, accumulated incrementally by
+    metrics.OnlineMetrics as the chunks pass.
+
+    For intraday bars pass holding_bars (a bar count) or a pd.Timedelta as
+    holding_period in place of the config.days_threshold time stop.
+    """
+
+    def __init__(self, output_dir=None, signals=None, holding_bars=None, holding_period=None):
+        self.signals = signals if signals is not None else ChunkedSignals()
+        self.engine = Strategy1Backtesting(config.initial_balance, config.position_size, config.stop_loss,
+                                           config.profit_target1, config.partial_sell1, config.profit_target2,
+                                           config.partial_sell2,
+                                           holding_period if holding_period is not None else config.days_threshold,
+                                           config.price_threshold, holding_bars)
+        self.output_dir = output_dir
+        self.chunks = 0
+        self.trades = 0
+
+    def _flush(self):
+        engine = self.engine
+        if self.output_dir is not None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            for name, rows in (('equity_curve', engine.get_performance().reset_index()),
+                               ('trade_log', engine.get_trade_history())):
+                if len(rows):
+                    path = os.path.join(self.output_dir, f"{name}.csv")
+                    rows.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+        self.trades += len(engine.trade_history)
+        engine.equity_curve.clear()
+        engine.trade_history.clear()
+
+    def run(self, chunks):
+        if self.output_dir is not None:
+            for name in ('equity_curve', 'trade_log'):
+                path = os.path.join(self.output_dir, f"{name}.csv")
+                if os.path.exists(path):
+                    os.remove(path)
+        for chunk in chunks:
+            if not len(chunk):
+                continue
+            long_signals, short_signals = self.signals.update(chunk)
+            self.engine.apply_signals_vectorized(chunk.index, chunk['Close'].to_numpy(), long_signals, short_signals)
+            self._flush()
+            self.chunks += 1
+        return self
+
+    @property
+    def bars(self):
+        return self.engine.metrics.bars
+
+    def metrics(self):
+        return self.engine.calculate_metrics()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest a long bar history chunk by chunk with bounded memory.")
+    parser.add_argument('input', help="A CSV file with Date and OHLCV columns, or a ticker in the data store")
+    parser.add_argument('--chunk-bars', type=int, default=DEFAULT_CHUNK_BARS)
+    parser.add_argument('--start', default=None)
+    parser.add_argument('--end', default=None)
+    parser.add_argument('--holding-bars', type=int, default=None, help="Time stop after this many bars")
+    parser.add_argument('--holding-period', type=pd.Timedelta, default=None, help="Time stop after e.g. '90min'")
+    parser.add_argument('--long-only', action='store_true')
+    parser.add_argument('--output', default=os.path.join('backtesting_results', 'chunked'))
+    args = parser.parse_args()
+
+    if os.path.exists(args.input):
+        chunks = iter_csv_chunks(args.input, args.chunk_bars, args.start, args.end)
+    else:
+        chunks = iter_store_chunks(MarketDataStore(), args.input, args.start, args.end, args.chunk_bars)
+
+    started = time.perf_counter()
+    backtest = ChunkedBacktest(args.output, ChunkedSignals(long_only=args.long_only),
+                               args.holding_bars, args.holding_period).run(chunks)
+    elapsed = time.perf_counter() - started
+    print(f"{backtest.bars} bars in {backtest.chunks} chunks, {backtest.trades} trades, {elapsed:.2f}s "
+          f"({backtest.bars / elapsed:,.0f} bars/s)")
+    for metric, value in backtest.metrics().items():
+        print(f"{metric}: {value:.4f}")
+    print(f"Equity curve and trade log saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,3 +8,34 @@ partial_sell2 = 0.5
 days_threshold = 30
 price_threshold = 0.05
 commission = 0.002
+profile_strategies = False
+profile_dir = 'profiles'
+plot_results = True
+report_dir = 'reports'
+report_max_points = 2000
+interactive_plot = False
+# Exit ladder of the backtesting.py strategies (strategies/rules.py): price multiples of the entry
+# price at which ladder_portions of the position are closed, and the stop moved up by ladder_stop_step
+ladder_targets = [2.0, 2.5, 3.0]
+short_ladder_targets = [0.5, 0.4, 0.333]
+ladder_portions = [partial_sell1, partial_sell2, 1.0]
+ladder_stop_step = 1.2
+short_ladder_stop_step = 0.8
+time_stop_days = 10
+time_stop_gain = 0.05
+# Backtest run cache (run_cache.py); set run_cache = False to always rerun
+run_cache = True
+run_cache_dir = '.run_cache'
+run_cache_max_bytes = 512 * 1024 ** 2
+run_cache_max_entries = None
+run_cache_max_age_days = None
+# Execution costs (execution.py), used when a run enables them: spreads and slippage in basis points
+# of the price for stocks and indices, in pips for FX pairs (tickers ending in '=X'). Spreads are the
+# full bid/ask spread, half of which is paid per fill. execution_overrides sets values per ticker, e.g.
+# {'TSLA': {'spread_bps': 5.0}, 'USDJPY=X': {'spread_pips': 2.0}}
+execution_spread_bps = 2.0
+execution_slippage_bps = 1.0
+execution_fx_spread_pips = 1.5
+execution_fx_slippage_pips = 0.5
+execution_intrabar_stops = True
+execution_overrides = {}
@@ -1,8 +1,9 @@
 import os
-import yfinance as yf
 import pandas as pd
+from data_store import MarketDataStore, OHLCV_COLUMNS
 
 def fetch_stock_data(ticker, start_date, end_date):
+    import yfinance as yf
     print(f"Fetching data for {ticker} from {start_date} to {end_date}")
     stock_data = yf.download(ticker, start=start_date, end=end_date)
     print(f"Data fetched: {stock_data.shape[0]} rows")
@@ -15,8 +16,17 @@ def save_to_csv(data, filename):
     data.to_csv(filename)
     print("Data saved successfully.")
 
-def process_data(ticker, option, start_date, end_date):
+def load_data(ticker, start_date, end_date, store=None, columns=None):
+    # Serve bars from the local store, fetching only the dates it does not hold yet;
+    # columns default to the ones Backtest reads (data_store.BACKTEST_COLUMNS)
+    store = store if store is not None else MarketDataStore()
+    fetched = store.update(ticker, start_date, end_date)
+    if fetched:
+        print(f"Stored {fetched} new rows for {ticker}")
+    return store.frame(ticker, start_date, end_date, columns)
+
+def process_data(ticker, option, start_date, end_date, store=None):
     filename = os.path.join(os.path.dirname(__file__), f"data/{option.lower().replace(' ', '_')}_data.csv")
-    stock_data = fetch_stock_data(ticker, start_date, end_date)
+    stock_data = load_data(ticker, start_date, end_date, store, OHLCV_COLUMNS)
     save_to_csv(stock_data, filename)
     return filename
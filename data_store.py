@@ -0,0 +1,241 @@
+import os
+import json
+import mmap
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+COLUMN_DTYPES = {
+    'Open': np.float64,
+    'High': np.float64,
+    'Low': np.float64,
+    'Close': np.float64,
+    'Adj Close': np.float64,
+    'Volume': np.int64,
+}
+# Columns Backtest and the strategies read; frame() serves only these unless asked for more
+BACKTEST_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+# Candidate Volume dtypes, narrowest first. Prices stay float64: backtesting.py computes fills
+# in the data's dtype, so float32 prices would change results.
+VOLUME_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'store')
+
+
+def normalize_frame(frame):
+    # Bring a downloaded or parsed frame to a Date index and the plain OHLCV columns
+    if frame.empty:
+        return pd.DataFrame({column: np.array([], dtype=dtype) for column, dtype in COLUMN_DTYPES.items()},
+                            index=pd.DatetimeIndex([], dtype='datetime64[ns]', name='Date'))
+    if isinstance(frame.columns, pd.MultiIndex):
+        frame = frame.droplevel(-1, axis=1)
+    frame = frame.copy()
+    frame.index = pd.DatetimeIndex(frame.index).tz_localize(None).as_unit('ns')
+    frame.index.name = 'Date'
+    if 'Adj Close' not in frame.columns and 'Close' in frame.columns:
+        frame['Adj Close'] = frame['Close']
+    frame = frame[OHLCV_COLUMNS].dropna(subset=['Close'])
+    frame['Volume'] = frame['Volume'].fillna(0)
+    return frame.astype(COLUMN_DTYPES)
+
+
+def narrow_volume(values):
+    # Volume in the narrowest integer dtype that holds all of it
+    values = np.asarray(values, dtype=np.int64)
+    low, high = (values.min(), values.max()) if len(values) else (0, 0)
+    for dtype in VOLUME_DTYPES:
+        limits = np.iinfo(dtype)
+        if limits.min <= low and high <= limits.max:
+            return values.astype(dtype)
+    return values
+
+
+def _is_mapped(array):
+    # Whether an array's memory belongs to a memory-mapped file
+    while array is not None:
+        if isinstance(array, (np.memmap, mmap.mmap)):
+            return True
+        array = getattr(array, 'base', None)
+    return False
+
+
+def memory_usage(frame):
+    # Bytes held by a frame's columns: shared ones are views of the store's memory-mapped files, served
+    # from the page cache to every process, private ones are copies owned by this process
+    shared = private = 0
+    for column in frame.columns:
+        values = frame[column].to_numpy()
+        if _is_mapped(values):
+            shared += values.nbytes
+        else:
+            private += values.nbytes
+    return {
+        'Bars': len(frame),
+        'Columns': len(frame.columns),
+        'Dtypes': ' '.join(f"{column}:{dtype}" for column, dtype in frame.dtypes.items()),
+        'Shared Bytes': shared,
+        'Private Bytes': private + frame.index.nbytes,
+        # A copied frame of every stored column as float64, as loading the CSV files gives
+        'Float64 Copy Bytes': len(frame) * (len(OHLCV_COLUMNS) + 1) * 8,
+    }
+
+
+def memory_report(frames):
+    # memory_usage() of {ticker: frame}, one row per symbol
+    return pd.DataFrame([{'Ticker': ticker, **memory_usage(frame)} for ticker, frame in frames.items()])
+
+
+class YFinanceSource:
+    # Downloads daily bars from Yahoo Finance; end_date is exclusive, as in yf.download
+    def fetch(self, ticker, start_date, end_date):
+        import yfinance as yf
+        print(f"Fetching data for {ticker} from {start_date} to {end_date}")
+        data = yf.download(ticker, start=start_date, end=end_date, auto_adjust=False, progress=False)
+        print(f"Data fetched: {data.shape[0]} rows")
+        return data
+
+
+class CSVSource:
+    # Serves bars from local CSV files, e.g. the files in data/, so the store works offline
+    def __init__(self, paths):
+        self.paths = dict(paths)
+
+    @classmethod
+    def from_lists(cls, options_file, tickers_file, directory):
+        # Map each ticker to data/<option>_data.csv, the naming used by process_data
+        with open(options_file, 'r') as file:
+            options = [line.strip() for line in file if line.strip()]
+        with open(tickers_file, 'r') as file:
+            tickers = [line.strip() for line in file if line.strip()]
+        paths = {}
+        for ticker, option in zip(tickers, options):
+            paths[ticker] = os.path.join(directory, f"{option.lower().replace(' ', '_')}_data.csv")
+        return cls(paths)
+
+    def fetch(self, ticker, start_date, end_date):
+        if ticker not in self.paths:
+            raise ValueError(f"No local data file for {ticker}.")
+        data = pd.read_csv(self.paths[ticker], index_col='Date', parse_dates=True)
+        return data.loc[(data.index >= pd.Timestamp(start_date)) & (data.index < pd.Timestamp(end_date))]
+
+
+class MarketDataStore:
+    """
+    Local columnar store of daily OHLCV bars
+    ----------------------------------------
+    Each ticker is kept as one .npy file per column plus a meta.json that records
+    the date range already requested from the source. update() only fetches the
+    parts of a requested range that are not covered yet and appends them, and
+    load() serves memory-mapped, typed arrays for any date slice without parsing
+    CSV text. Volume is stored in the narrowest integer dtype that holds it.
+
+    frame() wraps those arrays without copying them, and Backtest, its _Data
+    arrays and the indicator cache read the same buffers, so a process holding
+    many symbols only keeps the page-cache pages of the columns it reads
+    (BACKTEST_COLUMNS by default; Adj Close is not loaded).
+
+    The source is any object with a fetch(ticker, start_date, end_date) method
+    returning a DataFrame of bars; it defaults to YFinanceSource.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, source=None):
+        self.root = root
+        self.source = source if source is not None else YFinanceSource()
+
+    def _ticker_dir(self, ticker):
+        return os.path.join(self.root, ticker.replace(os.sep, '_'))
+
+    def _meta_path(self, ticker):
+        return os.path.join(self._ticker_dir(ticker), 'meta.json')
+
+    def coverage(self, ticker):
+        # Return the (start, end) range already fetched for a ticker, or None
+        path = self._meta_path(ticker)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as file:
+            meta = json.load(file)
+        return pd.Timestamp(meta['start']), pd.Timestamp(meta['end'])
+
+    def missing_ranges(self, ticker, start_date, end_date):
+        # Work out which parts of [start_date, end_date) still have to be fetched
+        start, end = pd.Timestamp(start_date), self._cap_end(end_date)
+        if start >= end:
+            return []
+        covered = self.coverage(ticker)
+        if covered is None:
+            return [(start, end)]
+        covered_start, covered_end = covered
+        ranges = []
+        if start < covered_start:
+            ranges.append((start, covered_start))
+        if end > covered_end:
+            ranges.append((covered_end, end))
+        return ranges
+
+    def _cap_end(self, end_date):
+        # Bars after today do not exist yet, so never mark them as covered
+        return min(pd.Timestamp(end_date), pd.Timestamp.today().normalize())
+
+    def update(self, ticker, start_date, end_date):
+        # Fetch the missing parts of the range and append them to the store
+        ranges = self.missing_ranges(ticker, start_date, end_date)
+        if not ranges:
+            return 0
+        frames = [self.source.fetch(ticker, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+                  for start, end in ranges]
+        return self.append(ticker, ranges, frames)
+
+    def append(self, ticker, ranges, frames):
+        # Store bars fetched for the given missing ranges and extend the covered range; returns the row count
+        frames = [normalize_frame(frame) for frame in frames]
+        covered = self.coverage(ticker)
+        starts = [start for start, _ in ranges] + ([covered[0]] if covered else [])
+        ends = [end for _, end in ranges] + ([covered[1]] if covered else [])
+        self.write(ticker, pd.concat(frames), min(starts), max(ends))
+        return sum(len(frame) for frame in frames)
+
+    def write(self, ticker, frame, start_date, end_date):
+        # Merge new bars with the stored ones and rewrite the column files atomically
+        frame = normalize_frame(frame)
+        if self.coverage(ticker) is not None:
+            frame = pd.concat([self.frame(ticker, columns=OHLCV_COLUMNS), frame])
+        frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+
+        directory = self._ticker_dir(ticker)
+        os.makedirs(directory, exist_ok=True)
+        columns = {'Date': frame.index.asi8}
+        columns.update({column: frame[column].to_numpy(COLUMN_DTYPES[column]) for column in OHLCV_COLUMNS})
+        columns['Volume'] = narrow_volume(columns['Volume'])
+        for name, values in columns.items():
+            path = os.path.join(directory, f"{name}.npy")
+            with open(path + '.tmp', 'wb') as file:
+                np.save(file, values)
+            os.replace(path + '.tmp', path)
+        meta = {
+            'start': pd.Timestamp(start_date).strftime('%Y-%m-%d'),
+            'end': pd.Timestamp(end_date).strftime('%Y-%m-%d'),
+            'rows': len(frame),
+        }
+        with open(self._meta_path(ticker) + '.tmp', 'w') as file:
+            json.dump(meta, file)
+        os.replace(self._meta_path(ticker) + '.tmp', self._meta_path(ticker))
+
+    def load(self, ticker, start_date=None, end_date=None, columns=None):
+        # Return {'Date': datetime64[ns], column: typed array} for bars in [start_date, end_date)
+        if self.coverage(ticker) is None:
+            raise ValueError(f"No stored data for {ticker}.")
+        directory = self._ticker_dir(ticker)
+        dates = np.load(os.path.join(directory, 'Date.npy'), mmap_mode='r').view('datetime64[ns]')
+        lo = 0 if start_date is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(start_date), 'ns'))
+        hi = len(dates) if end_date is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(end_date), 'ns'))
+        arrays = {'Date': dates[lo:hi]}
+        for column in (columns or OHLCV_COLUMNS):
+            arrays[column] = np.load(os.path.join(directory, f"{column}.npy"), mmap_mode='r')[lo:hi]
+        return arrays
+
+    def frame(self, ticker, start_date=None, end_date=None, columns=None):
+        # Same slice as load() of BACKTEST_COLUMNS by default, as a DataFrame indexed by Date for Backtest.
+        # The columns stay views of the memory-mapped files (read-only; pandas copies on write).
+        arrays = self.load(ticker, start_date, end_date, columns or BACKTEST_COLUMNS)
+        index = pd.DatetimeIndex(arrays.pop('Date'), name='Date')
+        return pd.DataFrame(arrays, index=index, copy=False)
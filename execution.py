@@ -0,0 +1,115 @@
+import numpy as np
+import config
+
+BPS = 1e-4
+
+
+def is_fx(ticker):
+    # yfinance FX pairs are quoted as e.g. EURUSD=X
+    return ticker.endswith('=X')
+
+
+def pip_size(ticker):
+    # One pip: 0.01 for yen pairs, 0.0001 for the others
+    return 0.01 if 'JPY' in ticker.upper() else 0.0001
+
+
+class CostModel:
+    # A price cost per unit traded; cost() takes a price or an array of prices
+    def cost(self, price):
+        return price * 0.0
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+
+class BpsCost(CostModel):
+    # Proportional to the price, in basis points
+    def __init__(self, bps):
+        self.bps = bps
+
+    def cost(self, price):
+        return price * (self.bps * BPS)
+
+    def __repr__(self):
+        return f"BpsCost({self.bps})"
+
+
+class PipCost(CostModel):
+    # A fixed number of pips, as FX spreads are quoted
+    def __init__(self, pips, pip_size=0.0001):
+        self.pips = pips
+        self.pip_size = pip_size
+
+    def cost(self, price):
+        return price * 0.0 + self.pips * self.pip_size
+
+    def __repr__(self):
+        return f"PipCost({self.pips}, {self.pip_size})"
+
+
+class ExecutionModel:
+    """
+    Order fills with spread, slippage and intrabar stops
+    ----------------------------------------------------
+    spread is the full bid/ask spread, half of which is paid on every fill;
+    slippage is paid on every fill on top of it, and commission is the
+    relative fee of config.commission. All costs are computed from prices
+    alone, so they evaluate on whole arrays at once (fill_prices) as well as
+    on single fills.
+
+    With intrabar_stops, stop losses trigger when the bar's Low (longs) or
+    High (shorts) reaches the stop instead of only on the close, and fill at
+    the stop, or at the open when the bar gaps through it.
+
+    commission_function() expresses the costs as a backtesting.py commission
+    callable, which fast_backtest.FastBacktest accepts as well.
+    """
+
+    def __init__(self, spread=None, slippage=None, commission=config.commission, intrabar_stops=True):
+        self.spread = spread if spread is not None else CostModel()
+        self.slippage = slippage if slippage is not None else CostModel()
+        self.commission = commission
+        self.intrabar_stops = intrabar_stops
+
+    def unit_cost(self, price):
+        # Half spread plus slippage per unit, paid on each fill
+        return self.spread.cost(price) / 2 + self.slippage.cost(price)
+
+    def fill_prices(self, prices, side):
+        # Executed prices of buys (side 1) or sells (side -1) at the given quotes
+        return prices + side * self.unit_cost(prices)
+
+    def stop_hits(self, stop, side, open_, high, low):
+        # (triggered, fill price before costs) for a stop protecting a long (side 1) or short (side -1)
+        if side > 0:
+            return low <= stop, np.minimum(open_, stop)
+        return high >= stop, np.maximum(open_, stop)
+
+    def commission_function(self):
+        # commission(order_size, price) for Backtest: the fee plus spread and slippage of the fill
+        commission = self.commission
+        unit_cost = self.unit_cost
+
+        def fill_costs(order_size, price):
+            return abs(order_size) * (price * commission + unit_cost(price))
+        return fill_costs
+
+    def __repr__(self):
+        return (f"ExecutionModel(spread={self.spread!r}, slippage={self.slippage!r}, "
+                f"commission={self.commission}, intrabar_stops={self.intrabar_stops})")
+
+
+def model_for(ticker):
+    # The execution model of one instrument from config: pips for FX pairs, basis points otherwise,
+    # with per-ticker values from config.execution_overrides
+    settings = dict(config.execution_overrides.get(ticker, {}))
+    if is_fx(ticker):
+        size = settings.get('pip_size', pip_size(ticker))
+        spread = PipCost(settings.get('spread_pips', config.execution_fx_spread_pips), size)
+        slippage = PipCost(settings.get('slippage_pips', config.execution_fx_slippage_pips), size)
+    else:
+        spread = BpsCost(settings.get('spread_bps', config.execution_spread_bps))
+        slippage = BpsCost(settings.get('slippage_bps', config.execution_slippage_bps))
+    return ExecutionModel(spread, slippage, settings.get('commission', config.commission),
+                          settings.get('intrabar_stops', config.execution_intrabar_stops))
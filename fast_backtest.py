@@ -0,0 +1,242 @@
+import math
+import inspect
+import numpy as np
+import pandas as pd
+from backtesting import Backtest
+# Private backtesting.py APIs, so the stats and warm-up match Backtest.run() exactly;
+# requirements.txt pins the version they were written against
+from backtesting._stats import compute_stats
+from backtesting._util import _Data, _indicator_warmup_nbars
+import config
+from strategies import rules
+
+# Size of Strategy.buy() / sell() without arguments: all available margin
+FULL_EQUITY = 1 - np.finfo(float).eps
+# Kinds of pending _Order
+CLOSE, ENTRY, STOP = 'close', 'entry', 'stop'
+
+
+class _ClosedTrade:
+    # The fields of a closed backtesting.py Trade that compute_stats reads
+    __slots__ = ('size', 'entry_price', 'entry_bar', 'exit_price', 'exit_bar', 'entry_time', 'exit_time',
+                 '_commissions', 'sl')
+    tp = None
+    tag = None
+
+    def __init__(self, size, entry_price, entry_bar, exit_price, exit_bar, index, commissions, sl=None):
+        self.size = size
+        self.entry_price = entry_price
+        self.entry_bar = entry_bar
+        self.exit_price = exit_price
+        self.exit_bar = exit_bar
+        self.entry_time = index[entry_bar]
+        self.exit_time = index[exit_bar]
+        self._commissions = commissions
+        self.sl = sl
+
+    @property
+    def pl(self):
+        return (self.size * (self.exit_price - self.entry_price)) - self._commissions
+
+    @property
+    def pl_pct(self):
+        gross_pl_pct = math.copysign(1, self.size) * (self.exit_price / self.entry_price - 1)
+        return gross_pl_pct - self._commissions / (abs(self.size) * self.entry_price)
+
+
+class _Order:
+    # A pending order: CLOSE `size` units of the open trade, ENTRY on `side` (with its stop price
+    # when stops are placed as orders), or the open trade's STOP order
+    __slots__ = ('kind', 'size', 'side', 'stop')
+
+    def __init__(self, kind, size=0, side=0, stop=None):
+        self.kind = kind
+        self.size = size
+        self.side = side
+        self.stop = stop
+
+
+
+class FastBacktest:
+    """
+    Array backend for the rule-based strategies
+    -------------------------------------------
+    Runs a strategy built on strategies/rules.py without backtesting.py's
+    per-bar machinery. The strategy's init() still computes its indicators
+    (through the indicator cache), entry signals for all bars come from one
+    vectorized RuleSet.entry_signals() call, and a plain loop over price lists
+    applies the fills the way backtesting.py's broker does with
+    exclusive_orders=True: market orders at the next bar's open, entries sized
+    to all available margin, partial closes rounded to whole units and a
+    relative commission on both legs. run() returns the same stats Series as
+    Backtest.run(), including _trades and _equity_curve, so sweeps can use
+    it in place of Backtest.
+
+    commission is a relative fee or a commission(order_size, price) callable,
+    such as execution.ExecutionModel.commission_function(). Strategies run
+    with intrabar_stops=True get their stop orders mirrored as well: placed
+    with the entry, moved with the ladder's stop, checked against each bar's
+    High/Low from the entry bar on and filled at the stop or the gapped open.
+    """
+
+    def __init__(self, data, strategy, cash=config.initial_balance, commission=config.commission):
+        # Backtest validates and normalises the data the same way for both backends
+        self._backtest = Backtest(data, strategy, cash=cash, commission=commission, exclusive_orders=True)
+        self.cash = cash
+        self.commission = commission
+        if callable(commission):
+            self._commission = commission
+        else:
+            self._commission = lambda size, price: abs(size) * price * commission
+
+    def run(self, **params):
+        frame = self._backtest._data
+        strategy = self._backtest._strategy(None, _Data(frame.copy(deep=False)), params)
+        strategy.init()
+        if not isinstance(getattr(strategy, 'rules', None), rules.RuleSet):
+            raise TypeError(f"{type(strategy).__name__} does not define its rules with strategies.rules.RuleSet")
+
+        index = frame.index
+        opens = frame['Open'].to_numpy(np.float64).tolist()
+        highs = frame['High'].to_numpy(np.float64).tolist()
+        lows = frame['Low'].to_numpy(np.float64).tolist()
+        closes = frame['Close'].to_numpy(np.float64).tolist()
+        times = index.as_unit('ns').asi8.tolist()
+        long_signals, short_signals = strategy.rules.entry_signals(*rules.series_values(strategy))
+        entry_sides = np.where(long_signals, rules.LONG, np.where(short_signals, rules.SHORT, 0)).tolist()
+        step = strategy.rules.step
+        open_position = strategy.rules.open
+        intrabar_stops = getattr(strategy, 'intrabar_stops', False)
+        commission_of = self._commission
+        state = rules.ExitState()
+
+        n = len(closes)
+        start = 1 + _indicator_warmup_nbars(strategy)
+        equity = np.full(n, np.nan)
+        cash = self.cash
+        closed = []
+        size = 0                # open trade, at most one with exclusive orders
+        entry_price = 0.0
+        entry_bar = 0
+        stop_order = None       # the open trade's stop order, when stops are placed as orders
+        orders = []             # pending _Orders in queue order
+
+        for i in range(start, n):
+            price = opens[i]
+            last_price = closes[i]
+
+            # Fill the orders placed on the previous bar at this bar's open. A stop order added by an
+            # entry is checked against the same bar, as backtesting.py reprocesses the queue.
+            reprocess = bool(orders)
+            while reprocess:
+                reprocess = False
+                for order in list(orders):
+                    if order not in orders:
+                        continue
+                    if order.kind == STOP:
+                        if not (highs[i] >= order.stop if order.size > 0 else lows[i] <= order.stop):
+                            continue
+                        fill_price = max(price, order.stop) if order.size > 0 else min(price, order.stop)
+                        commission = commission_of(size, fill_price)
+                        cash += size * (fill_price - entry_price) - commission
+                        closed.append(_ClosedTrade(size, entry_price, entry_bar, fill_price, i, index,
+                                                   commission + commission_of(size, entry_price), order.stop))
+                        orders.remove(order)
+                        size, stop_order = 0, None
+                        continue
+                    orders.remove(order)
+                    if order.kind == CLOSE:
+                        if not size:
+                            continue
+                        fill = math.copysign(min(abs(size), abs(order.size)), order.size)
+                        size_left = size + fill
+                        closed_size = size if not size_left else -fill
+                        commission = commission_of(closed_size, price)
+                        cash += closed_size * (price - entry_price) - commission
+                        closed.append(_ClosedTrade(closed_size, entry_price, entry_bar, price, i, index,
+                                                   commission + commission_of(closed_size, entry_price),
+                                                   None if size_left or stop_order is None else stop_order.stop))
+                        size = size_left
+                        if not size and stop_order is not None:
+                            orders.remove(stop_order)
+                            stop_order = None
+                    else:
+                        order_size = order.side * FULL_EQUITY
+                        adjusted_price_plus_commission = price + commission_of(order_size, price) / abs(order_size)
+                        margin_available = max(0, cash + ((last_price * int(size) - size * entry_price) if size else 0.0)
+                                               - (abs(size) * last_price if size else 0))
+                        units = int(math.copysign(int((margin_available * 1.0 * abs(order_size))
+                                                      // adjusted_price_plus_commission), order_size))
+                        if not units or size or abs(units) * adjusted_price_plus_commission > margin_available:
+                            continue
+                        size, entry_price, entry_bar = units, price, i
+                        cash -= commission_of(units, price)
+                        if order.stop is not None:
+                            stop_order = _Order(STOP, -units, stop=order.stop)
+                            orders.insert(0, stop_order)
+                            reprocess = True
+
+            value = cash + ((last_price * int(size) - size * entry_price) if size else 0.0)
+            equity[i] = value
+            if value <= 0:
+                # Out of money: close at this close and stop, as backtesting.py does
+                if size:
+                    commission = commission_of(size, last_price)
+                    closed.append(_ClosedTrade(size, entry_price, entry_bar, last_price, i, index,
+                                               commission + commission_of(size, entry_price),
+                                               None if stop_order is None else stop_order.stop))
+                cash = 0
+                equity[i:] = 0
+                break
+
+            # The strategy's next(): exit ladder of the open position, then the entry signal
+            if size:
+                if not state.side:
+                    open_position(state, rules.LONG if size > 0 else rules.SHORT, last_price, times[i])
+                portion = step(state, last_price, times[i])
+                if portion is not None:
+                    orders.insert(0, _Order(CLOSE, math.copysign(max(1, int(round(abs(size) * portion))), -size)))
+                if intrabar_stops and state.side and (stop_order is None or stop_order.stop != state.stop):
+                    if stop_order is not None:
+                        orders.remove(stop_order)
+                    stop_order = _Order(STOP, -size, stop=state.stop)
+                    orders.insert(0, stop_order)
+            side = entry_sides[i]
+            if side:
+                if size:
+                    orders.insert(0, _Order(CLOSE, math.copysign(max(1, int(round(abs(size)))), -size)))
+                open_position(state, side, last_price, times[i])
+                orders.append(_Order(ENTRY, side=side, stop=state.stop if intrabar_stops else None))
+
+        equity = pd.Series(equity).bfill().fillna(cash).to_numpy()
+        with np.errstate(invalid='ignore'):
+            return compute_stats(trades=closed, equity=equity, ohlc_data=frame, strategy_instance=strategy,
+                                 risk_free_rate=0.0)
+
+
+def run_backtest(data, strategy, backend='backtesting', execution=None, **params):
+    # Backtest.run() or FastBacktest.run() with the repo's cash, commission and order settings.
+    # An execution.ExecutionModel adds its fill costs to the commission and, with intrabar_stops,
+    # places the strategy's stops as stop orders.
+    commission = config.commission if execution is None else execution.commission_function()
+    params = run_params(strategy, execution, **params)
+    if backend == 'fast':
+        return FastBacktest(data, strategy, commission=commission).run(**params)
+    bt = Backtest(data, strategy, cash=config.initial_balance, commission=commission, exclusive_orders=True)
+    return bt.run(**params)
+
+
+def run_params(strategy, execution=None, **params):
+    # The parameters run_backtest() passes to the strategy: the given ones, plus intrabar stops
+    # when the execution model places them and the strategy supports them
+    if execution is not None and execution.intrabar_stops and hasattr(strategy, 'intrabar_stops'):
+        params.setdefault('intrabar_stops', True)
+    return params
+
+
+def strategy_params(strategy, execution=None, **params):
+    # Every parameter a run_backtest() run uses: the strategy's class defaults with the run's overrides
+    values = {name: value for name, value in inspect.getmembers(strategy)
+              if not name.startswith('_') and not callable(value) and not isinstance(value, property)}
+    values.update(run_params(strategy, execution, **params))
+    return values
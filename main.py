@@ -1,13 +1,31 @@
+import time
+STARTED = time.perf_counter()
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-from datetime import datetime
-from backtesting import Backtest
-from data_ingestion import process_data
+import sys
+import argparse
+import importlib
 import config
-from strategies.strategy1 import BollingerKeltnerChaikinSMAStrategy
-from strategies.strategy2 import LongOnlyBollingerKeltnerChaikinSMAStrategy
+
+# Strategy name -> module defining it; strategy modules pull in backtesting.py and are imported on use
+STRATEGIES = {
+    'BollingerKeltnerChaikinSMAStrategy': 'strategies.strategy1',
+    'LongOnlyBollingerKeltnerChaikinSMAStrategy': 'strategies.strategy2',
+}
+# results_store.DEFAULT_RESULTS_PATH, repeated so that --help and argument errors need no pandas
+DEFAULT_RESULTS_PATH = os.path.join('backtesting_results', 'results.sqlite')
+# Seconds spent importing modules, the top-level imports included
+timings = {'imports': time.perf_counter() - STARTED}
+
+
+def import_module(name):
+    # Import a heavy module on first use, counting the time towards the import total
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    timings['imports'] += time.perf_counter() - started
+    return module
+
+def load_strategy(strategy_name):
+    return getattr(import_module(STRATEGIES[strategy_name]), strategy_name)
 
 def load_list_from_file(filename):
     # Load options or tickers from a file
@@ -36,114 +54,132 @@ def get_user_selection(options, prompt):
         return None
     return options[choice]
 
-def process_selected_data(ticker, option, start_date, end_date):
-    # Fetch and process data for the selected ticker and option
-    filename = process_data(ticker, option, start_date, end_date)
-    data = pd.read_csv(filename, index_col='Date', parse_dates=True)
-    return data
-
-def save_backtesting_results(performance, trade_history, metrics, filename):
-    # Save backtesting results to a CSV file
-    trade_history_df = pd.DataFrame(trade_history)
-    metrics_df = pd.DataFrame(list(metrics.items()), columns=['Metric', 'Value'])
-    metrics_df['date'] = None
-    combined_df = pd.concat([trade_history_df, metrics_df], axis=0, ignore_index=True)
-    combined_df.to_csv(filename, index=False)
-    print(f"Backtesting results saved to {filename}")
-
-def plot_equity_curve(performance):
-    # Plot the equity curve of the strategy
-    plt.figure(figsize=(10, 6))
-    plt.plot(performance.index, performance['Equity'], label='Equity')
-    plt.axhline(100000, color='green', linestyle='--', label=f'Starting Balance: {100000}')
-    z = np.polyfit(performance.index.astype(int), performance['Equity'], 1)
-    p = np.poly1d(z)
-    plt.plot(performance.index, p(performance.index.astype(int)), color='blue', linestyle='--', label='Trend Line')
-    plt.title('Equity Curve')
-    plt.xlabel('Date')
-    plt.ylabel('Equity')
-    plt.xlim([datetime(2020, 1, 1), datetime(2024, 12, 31)])
-    plt.ylim([performance['Equity'].min() * 0.9, performance['Equity'].max() * 1.1])
-    plt.legend()
-    plt.show()
-
-def plot_drawdown(performance):
-    # Plot the drawdown of the strategy
-    running_max = performance['Equity'].cummax()
-    drawdown = performance['Equity'] / running_max - 1
-
-    plt.figure(figsize=(10, 6))
-    plt.plot(performance.index, drawdown, label='Drawdown')
-
-    # Adding a horizontal line at 0
-    plt.axhline(0, color='green', linestyle='--', label='Zero Line')
-
-    # Adding a trend line
-    z = np.polyfit(performance.index.astype(int), drawdown, 1)
-    p = np.poly1d(z)
-    plt.plot(performance.index, p(performance.index.astype(int)), color='blue', linestyle='--', label='Trend Line')
-
-    plt.title('Drawdown')
-    plt.xlabel('Date')
-    plt.ylabel('Drawdown')
-    plt.xlim([datetime(2018, 1, 1), datetime(2024, 12, 31)])
-    plt.ylim([drawdown.min() * 1.3, 0.03])
-    plt.legend()
-    plt.show()
-
-def main():
-    # Load options and tickers from files
-    options = load_list_from_file('./stocks/options.txt')
+def process_selected_data(ticker, start_date, end_date, store=None):
+    # Load data for the selected ticker from the local store, fetching only missing dates
+    return import_module('data_ingestion').load_data(ticker, start_date, end_date, store)
+
+def save_backtesting_results(performance, trade_history, metrics, filename, ticker=None, strategy=None):
+    # Append the run to the SQLite results store: metrics, trades and equity curve in typed tables
+    pd = import_module('pandas')
+    ResultsStore = import_module('results_store').ResultsStore
+    output = {key: value for key, value in metrics.items() if not key.startswith('_')}
+    output['_equity_curve'] = performance
+    output['_trades'] = pd.DataFrame(trade_history)
+    with ResultsStore(filename) as store:
+        run_id = store.save_run(ticker or '', strategy or type(metrics.get('_strategy')).__name__, output,
+                                getattr(metrics.get('_strategy'), '_params', None),
+                                performance.index[0] if len(performance) else None,
+                                performance.index[-1] if len(performance) else None)
+    print(f"Backtesting results saved to {filename} (run {run_id})")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Backtest one ticker with one strategy. Without arguments, asks for the ticker and strategy.")
+    parser.add_argument('--ticker', help="Ticker to backtest, as in stocks/tickers.txt (asked for when omitted)")
+    parser.add_argument('--strategy', choices=list(STRATEGIES), help="Strategy to run (asked for when omitted)")
+    parser.add_argument('--start', default="2018-01-01")
+    parser.add_argument('--end', default="2024-12-31")
+    parser.add_argument('--source', choices=['yfinance', 'csv'], default='yfinance',
+                        help="Where the store fetches missing bars from; 'csv' uses the files in data/")
+    parser.add_argument('--results-db', default=DEFAULT_RESULTS_PATH, help="SQLite results store to append the run to")
+    parser.add_argument('--reports', default=config.report_dir, metavar='DIR', help="Directory for the charts")
+    parser.add_argument('--no-plot', action='store_true', help="Skip the equity and drawdown charts")
+    parser.add_argument('--no-cache', action='store_true', help="Always run the backtest instead of using the run cache")
+    parser.add_argument('--refresh', action='store_true', help="Rerun and overwrite the run cache entry")
+    parser.add_argument('--execution', action='store_true',
+                        help="Fill with the ticker's spread, slippage and intrabar stops (execution.py)")
+    parser.add_argument('--quiet', action='store_true', help="Print the metrics only, not the equity curve and trades")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Load tickers from file
     tickers = load_list_from_file('./stocks/tickers.txt')
 
-    # Get user's ticker selection
-    ticker = get_user_selection(tickers, "Please select a stock or forex option by entering the corresponding number:")
+    # Get user's ticker selection unless given on the command line
+    ticker = args.ticker
     if ticker is None:
-        return
-    option = options[tickers.index(ticker)]
-
-    # Define available strategies
-    strategies = {
-        'BollingerKeltnerChaikinSMAStrategy': BollingerKeltnerChaikinSMAStrategy,
-        'LongOnlyBollingerKeltnerChaikinSMAStrategy': LongOnlyBollingerKeltnerChaikinSMAStrategy,
-    }
+        ticker = get_user_selection(tickers, "Please select a stock or forex option by entering the corresponding number:")
+        if ticker is None:
+            return
 
-    # Get user's strategy selection
-    strategy_name = get_user_selection(list(strategies.keys()), "Please select a strategy by entering the corresponding number:")
+    # Get user's strategy selection unless given on the command line
+    strategy_name = args.strategy
     if strategy_name is None:
-        return
-
-    start_date = "2018-01-01"
-    end_date = "2024-12-31"
-
-    # Process data for the selected ticker and option
-    data = process_selected_data(ticker, option, start_date, end_date)
-
-    # Set up and run the backtest
-    bt = Backtest(data, strategies[strategy_name], cash=config.initial_balance, commission=config.commission, exclusive_orders=True)
-    output = bt.run()
-    bt.plot()
+        strategy_name = get_user_selection(list(STRATEGIES), "Please select a strategy by entering the corresponding number:")
+        if strategy_name is None:
+            return
+
+    # Process data for the selected ticker
+    store = None
+    if args.source == 'csv':
+        data_store = import_module('data_store')
+        store = data_store.MarketDataStore(
+            source=data_store.CSVSource.from_lists('./stocks/options.txt', './stocks/tickers.txt', './data'))
+    data = process_selected_data(ticker, args.start, args.end, store)
+    execution = import_module('execution').model_for(ticker) if args.execution else None
+    timings['startup'] = time.perf_counter() - STARTED
+
+    # Set up and run the backtest; a run with unchanged data, code, parameters and config comes from the
+    # run cache without importing backtesting.py or the strategy. Profiling and the interactive plot need
+    # a live run, so they bypass it.
+    strategy_path = f"{STRATEGIES[strategy_name]}.{strategy_name}"
+    if config.run_cache and not args.no_cache and not config.profile_strategies and not config.interactive_plot:
+        output, hit = import_module('run_cache').RunCache.from_config().run(data, strategy_path, refresh=args.refresh,
+                                                                            execution=execution)
+        if hit:
+            print("Loaded the results of an identical earlier run from the run cache.")
+    else:
+        params = {}
+        commission = config.commission
+        if execution is not None:
+            commission = execution.commission_function()
+            if execution.intrabar_stops:
+                params['intrabar_stops'] = True
+        Backtest = import_module('backtesting').Backtest
+        bt = Backtest(data, load_strategy(strategy_name), cash=config.initial_balance, commission=commission,
+                      exclusive_orders=True)
+        if config.profile_strategies:
+            profiler = import_module('profiling').StrategyProfiler()
+            output = profiler.profile_run(bt, **params)
+        else:
+            output = bt.run(**params)
+        if config.interactive_plot:
+            bt.plot(filename=os.path.join('HTML', f"{strategy_name}.html"), open_browser=False)
+    timings['backtest'] = time.perf_counter() - STARTED - timings['startup']
 
     # Get the performance and trade history
     performance = output['_equity_curve']
     trade_history = output['_trades']
 
+    # Render the equity curve and drawdown charts in the background while the results are saved
+    reports = None
+    if config.plot_results and not args.no_plot:
+        reports = import_module('reporting').ReportWriter(args.reports, config.report_max_points)
+        report = reports.submit(f"{ticker}_{strategy_name}", performance)
+
     # Save backtesting results
-    results_dir = "backtesting_results"
-    if not os.path.exists(results_dir):
-        os.makedirs(results_dir)
+    save_backtesting_results(performance, trade_history, output, args.results_db, ticker, strategy_name)
 
-    results_filename = os.path.join(results_dir, f"{ticker}_{strategy_name}_backtesting_results.csv")
-    save_backtesting_results(performance, trade_history, output, results_filename)
+    # Save the per-bar profile next to the results when profiling is enabled
+    if config.profile_strategies:
+        json_path, folded_path = profiler.save(config.profile_dir, f"{ticker}_{strategy_name}")
+        print(f"Strategy profile saved to {json_path} and {folded_path}")
 
     # Print summary and results
+    pd = import_module('pandas')
+    np = import_module('numpy')
     print("Backtesting complete.")
-    print("Performance Summary:")
-    print(performance)
-    print("Trade History:")
-    print(trade_history)
+    if not args.quiet:
+        print("Performance Summary:")
+        print(performance)
+        print("Trade History:")
+        print(trade_history)
     print("Metrics:")
     for metric, value in output.items():
+        if args.quiet and metric.startswith('_'):
+            continue
         if isinstance(value, (pd.Timedelta, np.timedelta64)):
             print(f"{metric}: {value}")
         elif isinstance(value, (int, float)):
@@ -151,9 +187,12 @@ def main():
         else:
             print(f"{metric}: {value}")
 
-    # Plot the equity curve and drawdown
-    plot_equity_curve(performance)
-    plot_drawdown(performance)
+    # Wait for the charts
+    if reports is not None:
+        reports.close()
+        print(f"Charts saved to {', '.join(report.result())}")
+    print(f"Imports {timings['imports']:.2f}s, startup {timings['startup']:.2f}s, "
+          f"backtest {timings['backtest']:.2f}s, total {time.perf_counter() - STARTED:.2f}s")
 
 if __name__ == "__main__":
     main()
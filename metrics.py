@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+RISK_FREE_RATE = 0.02
+
+
+def drawdown(equity):
+    # Drawdown from the running peak at every bar: equity / peak - 1, for an array or a Series
+    values = np.asarray(equity, dtype=np.float64)
+    result = values / np.maximum.accumulate(values) - 1
+    if isinstance(equity, pd.Series):
+        return pd.Series(result, index=equity.index, name='Drawdown')
+    return result
+
+
+class EquityRecorder:
+    """
+    Preallocated equity curve
+    -------------------------
+    Records one (date, value) pair per bar in two growable arrays, nanosecond
+    timestamps and float64 values, instead of one dict per bar. Capacity
+    doubles when full, so append() and extend() are amortised O(1) per bar,
+    and dates / values are views of the recorded part without copying.
+    frame() builds the DataFrame only when a caller asks for one.
+
+    Reading it like the list of {'date': ..., 'balance': ...} dicts it
+    replaces still works: iteration and indexing return those dicts.
+    """
+
+    def __init__(self, capacity=1024, column='balance', index_name='date'):
+        self.column = column
+        self.index_name = index_name
+        self._times = np.empty(capacity, dtype=np.int64)
+        self._values = np.empty(capacity, dtype=np.float64)
+        self._size = 0
+        self.tz = None
+
+    def _reserve(self, count):
+        # Grow the buffers to hold `count` more bars
+        needed = self._size + count
+        if needed <= len(self._values):
+            return
+        capacity = max(needed, 2 * len(self._values))
+        self._times = np.resize(self._times, capacity)
+        self._values = np.resize(self._values, capacity)
+
+    def append(self, date, value):
+        if self._size == len(self._values):
+            self._reserve(1)
+        date = pd.Timestamp(date)
+        if not self._size:
+            self.tz = date.tz
+        self._times[self._size] = date.as_unit('ns').value
+        self._values[self._size] = value
+        self._size += 1
+
+    def extend(self, dates, values):
+        dates = pd.DatetimeIndex(dates)
+        count = len(dates)
+        if not count:
+            return
+        self._reserve(count)
+        if not self._size:
+            self.tz = dates.tz
+        self._times[self._size:self._size + count] = dates.as_unit('ns').asi8
+        self._values[self._size:self._size + count] = values
+        self._size += count
+
+    def clear(self):
+        # Forget the recorded bars and keep the buffers
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _date(self, ns):
+        return pd.Timestamp(ns) if self.tz is None else pd.Timestamp(ns, tz='UTC').tz_convert(self.tz)
+
+    def __getitem__(self, position):
+        # One recorded bar as a {'date': ..., 'balance': ...} dict
+        if position < 0:
+            position += self._size
+        if not 0 <= position < self._size:
+            raise IndexError('equity curve index out of range')
+        return {self.index_name: self._date(self._times[position]), self.column: float(self._values[position])}
+
+    def __iter__(self):
+        for date, value in zip(self.dates, self.values.tolist()):
+            yield {self.index_name: date, self.column: value}
+
+    @property
+    def values(self):
+        return self._values[:self._size]
+
+    @property
+    def dates(self):
+        index = pd.DatetimeIndex(self._times[:self._size].view('datetime64[ns]'))
+        return index if self.tz is None else index.tz_localize('UTC').tz_convert(self.tz)
+
+    def frame(self):
+        # The recorded curve as a DataFrame indexed by date, with one value column
+        return pd.DataFrame({self.column: self.values.copy()}, index=self.dates.rename(self.index_name))
+
+
+class OnlineMetrics:
+    """
+    Incremental performance metrics
+    -------------------------------
+    Accumulates the statistics of Strategy1Backtesting.calculate_metrics as
+    bars arrive: bar returns (the first bar's counts as 0, as pct_change
+    filled with 0) go into a running count, mean and sum of squared
+    deviations (Welford), and the running peak gives the current and maximum
+    drawdown. metrics() is O(1) at any bar, so results need no equity
+    DataFrame. update_many() folds in a whole array of bars at once, merging
+    its moments with Chan's parallel formula. Trades are counted by type.
+    """
+
+    def __init__(self, initial_balance):
+        self.initial_balance = initial_balance
+        self.bars = 0
+        self.last = None
+        self.peak = None
+        self.max_drawdown = 0.0
+        self.return_mean = 0.0
+        self.return_m2 = 0.0
+        self.trades = {}
+
+    def update(self, value):
+        # Add one bar's equity value
+        ret = value / self.last - 1 if self.bars else 0.0
+        self.bars += 1
+        delta = ret - self.return_mean
+        self.return_mean += delta / self.bars
+        self.return_m2 += delta * (ret - self.return_mean)
+        if self.peak is None or value > self.peak:
+            self.peak = value
+        self.max_drawdown = min(self.max_drawdown, value / self.peak - 1)
+        self.last = value
+
+    def update_many(self, values):
+        # Add an array of consecutive bars
+        values = np.asarray(values, dtype=np.float64)
+        count = len(values)
+        if not count:
+            return
+        previous = np.concatenate([[self.last if self.bars else values[0]], values[:-1]])
+        returns = values / previous - 1
+        mean = returns.mean()
+        m2 = ((returns - mean) ** 2).sum()
+        total = self.bars + count
+        delta = mean - self.return_mean
+        self.return_mean += delta * count / total
+        self.return_m2 += m2 + delta ** 2 * self.bars * count / total
+        peaks = np.maximum.accumulate(values if self.peak is None else np.maximum(values, self.peak))
+        self.max_drawdown = min(self.max_drawdown, float((values / peaks - 1).min()))
+        self.peak = float(peaks[-1])
+        self.last = float(values[-1])
+        self.bars = total
+
+    def record_trade(self, kind):
+        self.trades[kind] = self.trades.get(kind, 0) + 1
+
+    @property
+    def drawdown(self):
+        # Drawdown of the last bar from the running peak
+        return self.last / self.peak - 1 if self.bars else 0.0
+
+    @property
+    def volatility(self):
+        # Sample standard deviation (ddof=1) of the bar returns
+        return np.sqrt(self.return_m2 / (self.bars - 1)) if self.bars > 1 else np.nan
+
+    def metrics(self):
+        if not self.bars:
+            return {'Total Return': np.nan, 'Annualized Return': np.nan, 'Annualized Volatility': np.nan,
+                    'Max Drawdown': np.nan, 'Sharpe Ratio': np.nan}
+        total_return = (self.last - self.initial_balance) / self.initial_balance
+        annualized_return = (1 + total_return) ** (365 / self.bars) - 1
+        annualized_volatility = np.float64(self.volatility) * np.sqrt(TRADING_DAYS)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe_ratio = (annualized_return - RISK_FREE_RATE) / annualized_volatility
+        return {
+            'Total Return': total_return,
+            'Annualized Return': annualized_return,
+            'Annualized Volatility': annualized_volatility,
+            'Max Drawdown': self.max_drawdown,
+            'Sharpe Ratio': sharpe_ratio,
+        }
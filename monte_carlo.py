@@ -0,0 +1,178 @@
+import os
+import io
+import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import config
+from data_store import MarketDataStore, CSVSource, YFinanceSource
+
+METHODS = ['trades', 'shuffle', 'blocks']
+DEFAULT_BATCH_PATHS = 5_000
+# Mean over sample standard deviation (ddof=1) of the path's returns, annualised by sqrt(periods_per_year)
+# for daily returns. backtesting.py's 'Sharpe Ratio' is built from the geometric annual return and
+# volatility instead, so the two are not comparable; the label says which one this is.
+SHARPE = 'Sharpe Ratio (mean/std)'
+# Shuffling only reorders the same trades, so the total return and Sharpe ratio are identical on
+# every path (zero-width intervals); only path-dependent statistics vary
+SHUFFLE_METRICS = ['Max Drawdown']
+
+
+def trade_returns(output):
+    # Per-trade returns of a backtesting.py run
+    return output['_trades']['ReturnPct'].to_numpy(np.float64)
+
+
+def daily_returns(output):
+    # Bar-to-bar returns of a backtesting.py equity curve
+    return output['_equity_curve']['Equity'].pct_change().dropna().to_numpy(np.float64)
+
+
+def resample_trades(returns, n_paths, rng):
+    # (n_paths, n_trades) matrix of trade returns drawn with replacement
+    return returns[rng.integers(0, len(returns), size=(n_paths, len(returns)))]
+
+
+def shuffle_trades(returns, n_paths, rng):
+    # (n_paths, n_trades) matrix holding the same trades in a random order per path
+    return rng.permuted(np.broadcast_to(returns, (n_paths, len(returns))), axis=1)
+
+
+def block_bootstrap(returns, n_paths, rng, block_length=20):
+    # (n_paths, n_bars) matrix built from circular blocks of consecutive returns, which keeps
+    # the short-range autocorrelation and volatility clustering of the series
+    n = len(returns)
+    n_blocks = -(-n // block_length)
+    starts = rng.integers(0, n, size=(n_paths, n_blocks, 1))
+    rows = (starts + np.arange(block_length)) % n
+    return returns[rows.reshape(n_paths, -1)[:, :n]]
+
+
+def path_metrics(returns, periods_per_year=None, metrics=None):
+    # Total return, Sharpe ratio and max drawdown of every row of a return matrix at once,
+    # or only the named ones
+    equity = np.cumprod(1 + returns, axis=1)
+    peaks = np.maximum.accumulate(np.maximum(equity, 1.0), axis=1)
+    std = returns.std(axis=1, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = returns.mean(axis=1) / std
+    if periods_per_year:
+        sharpe = sharpe * np.sqrt(periods_per_year)
+    results = {
+        'Total Return': equity[:, -1] - 1,
+        SHARPE: sharpe,
+        'Max Drawdown': (equity / peaks - 1).min(axis=1),
+    }
+    return results if metrics is None else {metric: results[metric] for metric in metrics}
+
+
+def simulate_batch(task):
+    # One batch of paths as a single matrix; the seed makes each batch reproducible
+    returns, method, n_paths, block_length, periods_per_year, seed = task
+    rng = np.random.default_rng(seed)
+    if method == 'trades':
+        paths = resample_trades(returns, n_paths, rng)
+    elif method == 'shuffle':
+        return path_metrics(shuffle_trades(returns, n_paths, rng), periods_per_year, SHUFFLE_METRICS)
+    else:
+        paths = block_bootstrap(returns, n_paths, rng, block_length)
+    return path_metrics(paths, periods_per_year)
+
+
+def simulate(returns, method='trades', n_paths=100_000, block_length=20, periods_per_year=None,
+             batch_paths=DEFAULT_BATCH_PATHS, processes=None, seed=None):
+    # {metric: array of n_paths simulated values}; batches are spread over a process pool.
+    # The shuffle method reports SHUFFLE_METRICS only.
+    returns = np.asarray(returns, dtype=np.float64)
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method}; expected one of {METHODS}.")
+    if len(returns) < 2:
+        raise ValueError("At least two returns are needed to resample.")
+    sizes = [batch_paths] * (n_paths // batch_paths) + ([n_paths % batch_paths] if n_paths % batch_paths else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(returns, method, size, block_length, periods_per_year, batch_seed) for size, batch_seed in zip(sizes, seeds)]
+    processes = processes or os.cpu_count()
+    if processes == 1 or len(tasks) == 1:
+        batches = [simulate_batch(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            batches = list(executor.map(simulate_batch, tasks))
+    return {metric: np.concatenate([batch[metric] for batch in batches]) for metric in batches[0]}
+
+
+def confidence_intervals(samples, observed=None, level=0.95):
+    # One row per metric: the observed value, the simulated mean and median, and the two-sided interval
+    tail = (1 - level) / 2 * 100
+    rows = []
+    for metric, values in samples.items():
+        values = values[np.isfinite(values)]
+        row = {'Metric': metric}
+        if observed is not None:
+            row['Observed'] = observed[metric]
+        row.update({
+            'Mean': values.mean(),
+            'Median': np.median(values),
+            f'Lower {level:.0%}': np.percentile(values, tail),
+            f'Upper {level:.0%}': np.percentile(values, 100 - tail),
+        })
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def observed_metrics(returns, periods_per_year=None):
+    return {metric: values[0] for metric, values in path_metrics(np.asarray(returns)[None, :], periods_per_year).items()}
+
+
+def main():
+    from backtesting import Backtest
+    from batch_runner import load_strategies, STRATEGY_NAMES
+    parser = argparse.ArgumentParser(description="Confidence intervals for a backtest by resampling its results.")
+    parser.add_argument('--ticker', default='SPY')
+    parser.add_argument('--strategy', default=STRATEGY_NAMES[0], choices=STRATEGY_NAMES)
+    parser.add_argument('--start', default="2018-01-01")
+    parser.add_argument('--end', default="2024-12-31")
+    parser.add_argument('--method', choices=METHODS, default='blocks',
+                        help="trades: resample trades; shuffle: reorder trades (max drawdown only); "
+                             "blocks: block-bootstrap daily returns")
+    parser.add_argument('--paths', type=int, default=100_000)
+    parser.add_argument('--block-length', type=int, default=20)
+    parser.add_argument('--batch-paths', type=int, default=DEFAULT_BATCH_PATHS)
+    parser.add_argument('--level', type=float, default=0.95)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--source', choices=['yfinance', 'csv'], default='yfinance')
+    parser.add_argument('--output', default=None, help="CSV file for the interval table")
+    args = parser.parse_args()
+
+    if args.source == 'csv':
+        source = CSVSource.from_lists('./stocks/options.txt', './stocks/tickers.txt', './data')
+    else:
+        source = YFinanceSource()
+    store = MarketDataStore(source=source)
+    store.update(args.ticker, args.start, args.end)
+    with contextlib.redirect_stdout(io.StringIO()):
+        bt = Backtest(store.frame(args.ticker, args.start, args.end), load_strategies()[args.strategy],
+                      cash=config.initial_balance, commission=config.commission, exclusive_orders=True)
+        output = bt.run()
+
+    if args.method == 'blocks':
+        returns, periods_per_year = daily_returns(output), 252
+    else:
+        returns, periods_per_year = trade_returns(output), None
+    started = time.perf_counter()
+    samples = simulate(returns, args.method, args.paths, args.block_length, periods_per_year,
+                       args.batch_paths, args.processes, args.seed)
+    elapsed = time.perf_counter() - started
+    table = confidence_intervals(samples, observed_metrics(returns, periods_per_year), args.level)
+    print(f"{args.paths} {args.method} paths over {len(returns)} returns in {elapsed:.2f}s")
+    print(table.to_string(index=False))
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        table.to_csv(args.output, index=False)
+        print(f"Confidence intervals saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import os
+import io
+import time
+import random
+import argparse
+import itertools
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import config
+import batch_runner
+from data_store import MarketDataStore, CSVSource, YFinanceSource
+
+# Default search space over the strategy class parameters
+PARAM_SPACE = {
+    'bb_length': [10, 20, 30],
+    'bb_std': [1.5, 2.0, 2.5],
+    'kc_length': [10, 20, 30],
+    'kc_scalar': [1.5, 2.0, 2.5],
+    'adosc_fast': [3, 5],
+    'adosc_slow': [10, 20],
+    'sma_length': [50, 100, 200],
+    'stop_loss_pct': [0.03, config.stop_loss, 0.08],
+}
+METRICS = ['Sharpe Ratio', 'Return [%]', 'Sortino Ratio', 'Calmar Ratio', 'Equity Final [$]']
+
+
+def valid_params(params):
+    # The fast Chaikin EMA must be shorter than the slow one
+    return params.get('adosc_fast', 3) < params.get('adosc_slow', 10)
+
+
+def grid_candidates(param_space):
+    # Every combination, ordered so that neighbouring candidates share indicator parameters
+    names = list(param_space)
+    combos = (dict(zip(names, values)) for values in itertools.product(*param_space.values()))
+    return [params for params in combos if valid_params(params)]
+
+
+def random_candidates(param_space, n_iter, seed=None):
+    # n_iter distinct combinations sampled uniformly from the space
+    rng = random.Random(seed)
+    candidates, seen = [], set()
+    attempts = 0
+    while len(candidates) < n_iter and attempts < n_iter * 50:
+        attempts += 1
+        params = {name: rng.choice(values) for name, values in param_space.items()}
+        key = tuple(params.values())
+        if key not in seen and valid_params(params):
+            seen.add(key)
+            candidates.append(params)
+    return sorted(candidates, key=lambda params: tuple(params.values()))
+
+
+def evaluate(task):
+    # Backtest one parameter set on one ticker inside a worker and return a result row
+    from fast_backtest import run_backtest
+    ticker, strategy_name, params, start_date, end_date = task
+    frame = batch_runner._worker_frames[ticker]
+    data = frame.loc[(frame.index >= pd.Timestamp(start_date)) & (frame.index < pd.Timestamp(end_date))]
+    row = {'Ticker': ticker, 'Strategy': strategy_name}
+    row.update(params)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            output = run_backtest(data, batch_runner._worker_strategies[strategy_name],
+                                  batch_runner._worker_settings.backend, **params)
+    except Exception as error:
+        row['Error'] = f"{type(error).__name__}: {error}"
+    else:
+        row.update({metric: output[metric] for metric in METRICS})
+        row['# Trades'] = output['# Trades']
+    return row
+
+
+def rank_results(results, metric='Sharpe Ratio'):
+    # Best first; runs without a value for the metric (e.g. no trades) go last
+    ranked = results.sort_values(metric, ascending=False, na_position='last', kind='stable')
+    ranked = ranked.reset_index(drop=True)
+    ranked.insert(0, 'Rank', np.arange(1, len(ranked) + 1))
+    return ranked
+
+
+class Optimizer:
+    """
+    Parameter sweep over the Bollinger-Keltner Chaikin SMA strategies
+    -----------------------------------------------------------------
+    Runs grid, random or successive-halving searches for one or more tickers over
+    a process pool. Each worker loads the data once, and the strategies look their
+    indicators up in strategies.indicator_cache, so candidates that share e.g.
+    the Bollinger parameters compute those bands once per (ticker, parameters)
+    in that worker. Candidates are handed out in parameter order and in chunks to
+    keep such neighbours on the same worker. backend='fast' evaluates them on
+    fast_backtest.FastBacktest, which gives the same results in less time.
+    """
+
+    def __init__(self, tickers, strategy_name='BollingerKeltnerChaikinSMAStrategy',
+                 start_date="2018-01-01", end_date="2024-12-31", processes=None, store=None, backend='backtesting'):
+        self.tickers = list(tickers)
+        self.strategy_name = strategy_name
+        self.start_date = start_date
+        self.end_date = end_date
+        self.processes = processes or os.cpu_count()
+        self.store = store if store is not None else MarketDataStore()
+        self.backend = backend
+        for ticker in self.tickers:
+            self.store.update(ticker, start_date, end_date)
+
+    def _run(self, candidates, end_dates=None):
+        # Evaluate candidates x tickers; end_dates optionally shortens the window per candidate
+        end_dates = end_dates or [self.end_date] * len(candidates)
+        tasks = [(ticker, self.strategy_name, params, self.start_date, end_date)
+                 for params, end_date in zip(candidates, end_dates) for ticker in self.tickers]
+        chunksize = max(1, len(tasks) // (self.processes * 4))
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=batch_runner._init_worker,
+                                 initargs=(self.store.root, self.tickers, self.start_date, self.end_date,
+                                           batch_runner.BatchSettings(self.backend))) as executor:
+            rows = list(executor.map(evaluate, tasks, chunksize=chunksize))
+        return pd.DataFrame(rows)
+
+    def _aggregate(self, results, candidates):
+        # Average each metric over tickers so every candidate gets one row
+        names = list(candidates[0])
+        metrics = [column for column in METRICS + ['# Trades'] if column in results]
+        return results.groupby(names, sort=False, dropna=False)[metrics].mean().reset_index()
+
+    def grid_search(self, param_space=PARAM_SPACE, metric='Sharpe Ratio'):
+        candidates = grid_candidates(param_space)
+        return rank_results(self._aggregate(self._run(candidates), candidates), metric)
+
+    def random_search(self, param_space=PARAM_SPACE, n_iter=50, metric='Sharpe Ratio', seed=None):
+        candidates = random_candidates(param_space, n_iter, seed)
+        return rank_results(self._aggregate(self._run(candidates), candidates), metric)
+
+    def successive_halving(self, param_space=PARAM_SPACE, n_candidates=81, eta=3, min_fraction=1 / 9,
+                           metric='Sharpe Ratio', seed=None):
+        # Score many candidates on a short prefix of the history, keep the best 1/eta and
+        # give the survivors eta times more history, until the full window is reached
+        candidates = random_candidates(param_space, n_candidates, seed)
+        start, end = pd.Timestamp(self.start_date), pd.Timestamp(self.end_date)
+        fraction = min_fraction
+        rung = 0
+        while True:
+            fraction = min(fraction, 1.0)
+            rung_end = (start + (end - start) * fraction).strftime('%Y-%m-%d')
+            results = self._aggregate(self._run(candidates, [rung_end] * len(candidates)), candidates)
+            ranked = rank_results(results, metric)
+            ranked.insert(1, 'Rung', rung)
+            if fraction >= 1.0 or len(candidates) <= 1:
+                return ranked
+            keep = max(1, len(candidates) // eta)
+            names = list(candidates[0])
+            candidates = [dict(zip(names, values)) for values in ranked[names].head(keep).itertuples(index=False)]
+            candidates.sort(key=lambda params: tuple(params.values()))
+            fraction *= eta
+            rung += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimize strategy parameters.")
+    parser.add_argument('--tickers', nargs='+', default=['SPY'])
+    parser.add_argument('--strategy', default=batch_runner.STRATEGY_NAMES[0], choices=batch_runner.STRATEGY_NAMES)
+    parser.add_argument('--method', choices=['grid', 'random', 'halving'], default='random')
+    parser.add_argument('--metric', default='Sharpe Ratio', choices=METRICS)
+    parser.add_argument('--n-iter', type=int, default=50, help="Candidates for random and halving search")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--start', default="2018-01-01")
+    parser.add_argument('--end', default="2024-12-31")
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--source', choices=['yfinance', 'csv'], default='yfinance')
+    parser.add_argument('--backend', choices=['backtesting', 'fast'], default='backtesting',
+                        help="'fast' runs the same rules on the array engine in fast_backtest.py")
+    parser.add_argument('--output', default=os.path.join('backtesting_results', 'optimization_results.csv'))
+    args = parser.parse_args()
+
+    if args.source == 'csv':
+        source = CSVSource.from_lists('./stocks/options.txt', './stocks/tickers.txt', './data')
+    else:
+        source = YFinanceSource()
+    optimizer = Optimizer(args.tickers, args.strategy, args.start, args.end, args.processes,
+                          MarketDataStore(source=source), args.backend)
+
+    started = time.perf_counter()
+    if args.method == 'grid':
+        results = optimizer.grid_search(metric=args.metric)
+    elif args.method == 'random':
+        results = optimizer.random_search(n_iter=args.n_iter, metric=args.metric, seed=args.seed)
+    else:
+        results = optimizer.successive_halving(n_candidates=args.n_iter, metric=args.metric, seed=args.seed)
+    print(f"Optimization finished in {time.perf_counter() - started:.2f}s")
+    print(results.head(10).to_string(index=False))
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    results.to_csv(args.output, index=False)
+    print(f"Optimization results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
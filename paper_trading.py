@@ -0,0 +1,304 @@
+import os
+import json
+import time
+import math
+import heapq
+import asyncio
+import argparse
+import numpy as np
+import pandas as pd
+import config
+from data_store import CSVSource
+from strategies import rules
+from strategies.streaming import StreamingSignalEngine
+
+STRATEGY_LONG_ONLY = {
+    'BollingerKeltnerChaikinSMAStrategy': False,
+    'LongOnlyBollingerKeltnerChaikinSMAStrategy': True,
+}
+BAR_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+# Size of an entry: all available cash, as Strategy.buy() / sell() without a size
+FULL_EQUITY = 1 - np.finfo(float).eps
+
+
+class ReplayServer:
+    """
+    Local market-data replay server
+    -------------------------------
+    Streams the bars of CSV files (the data/*.csv layout) to every client that
+    connects, merged across instruments in date order, as newline-delimited
+    JSON: one {"ticker", "Date", "Open", "High", "Low", "Close", "Volume",
+    "sent"} object per bar and a final {"type": "end"}. `sent` is the wall
+    clock time the bar left the server, so clients can measure end-to-end
+    latency. speed is in bars per second; 0 replays as fast as the client
+    reads.
+    """
+
+    def __init__(self, paths, speed=0.0, start_date=None, end_date=None, host='127.0.0.1', port=0):
+        self.paths = dict(paths)
+        self.speed = speed
+        self.start_date = start_date
+        self.end_date = end_date
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def _rows(self, ticker):
+        # (date, ticker, bar) for one file, oldest first
+        frame = pd.read_csv(self.paths[ticker], index_col='Date', parse_dates=True, usecols=['Date'] + BAR_FIELDS)
+        frame = frame.dropna(subset=['Close'])
+        if self.start_date is not None:
+            frame = frame.loc[frame.index >= pd.Timestamp(self.start_date)]
+        if self.end_date is not None:
+            frame = frame.loc[frame.index < pd.Timestamp(self.end_date)]
+        for date, open_, high, low, close, volume in frame[BAR_FIELDS].itertuples():
+            yield date, ticker, {'ticker': ticker, 'Date': date.isoformat(), 'Open': open_, 'High': high,
+                                 'Low': low, 'Close': close, 'Volume': volume}
+
+    def bars(self):
+        # Every instrument's bars merged by date
+        for _, _, bar in heapq.merge(*(self._rows(ticker) for ticker in self.paths)):
+            yield bar
+
+    async def _handle(self, reader, writer):
+        started = time.perf_counter()
+        try:
+            for i, bar in enumerate(self.bars()):
+                if self.speed:
+                    delay = started + i / self.speed - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                bar['sent'] = time.time()
+                writer.write((json.dumps(bar) + '\n').encode())
+                await writer.drain()
+            writer.write(b'{"type": "end"}\n')
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        # Listen for clients; returns the bound (host, port), useful with port=0
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+
+
+class PaperAccount:
+    """
+    Paper-traded position in one instrument
+    ---------------------------------------
+    Evaluates the strategies' entry rules with StreamingSignalEngine and their
+    exit ladder with strategies/rules.py as each bar arrives. Orders fill the
+    way the backtests fill them: placed on a bar's close and executed at the
+    next bar's open, entries sized to all available cash, a new entry closing
+    the open position first, and commission on both legs (or the fill costs
+    of an execution.ExecutionModel). The signal log, trade log and equity curve
+    are kept in the format of the files under signals/.
+    """
+
+    def __init__(self, ticker, long_only=False, cash=config.initial_balance, commission=config.commission):
+        self.ticker = ticker
+        self.engine = StreamingSignalEngine(long_only=long_only)
+        self.rules = rules.RuleSet(stop_loss=config.stop_loss, long_only=long_only)
+        self.state = rules.ExitState()
+        self.cash = cash
+        if callable(commission):
+            self._commission = commission
+        else:
+            self._commission = lambda size, price: abs(size) * price * commission
+        self.size = 0
+        self.entry_price = 0.0
+        self.orders = []        # ('close', size) or ('entry', side), in queue order
+        self.signals = []
+        self.trades = []
+        self.equity = []
+
+    def _trade(self, date, size, price):
+        self.trades.append({'Date': date, 'Type': 'BUY' if size > 0 else 'SELL', 'Price': price, 'Shares': abs(size)})
+
+    def _fill(self, date, price):
+        # Execute the queued orders at this bar's open
+        for kind, value in self.orders:
+            if kind == 'close':
+                if not self.size:
+                    continue
+                fill = math.copysign(min(abs(self.size), abs(value)), value)
+                size_left = self.size + fill
+                closed_size = self.size if not size_left else -fill
+                self.cash += closed_size * (price - self.entry_price) - self._commission(closed_size, price)
+                self._trade(date, -closed_size, price)
+                self.size = size_left
+            elif not self.size:
+                order_size = value * FULL_EQUITY
+                unit_price = price + self._commission(order_size, price) / abs(order_size)
+                units = int(math.copysign((max(0, self.cash) * abs(order_size)) // unit_price, order_size))
+                if units:
+                    self.size, self.entry_price = units, price
+                    self.cash -= self._commission(units, price)
+                    self._trade(date, units, price)
+        self.orders = []
+
+    def on_bar(self, bar):
+        # Process one bar: fills at its open, exits and entries on its close; returns 'buy', 'sell' or None
+        date = pd.Timestamp(bar['Date'])
+        close = bar['Close']
+        if self.orders:
+            self._fill(date, bar['Open'])
+        self.equity.append({'Date': date, 'Equity': self.cash + ((close * int(self.size) - self.size * self.entry_price)
+                                                                 if self.size else 0.0)})
+
+        if self.size:
+            if not self.state.side:
+                self.rules.open(self.state, rules.LONG if self.size > 0 else rules.SHORT, close, date.value)
+            portion = self.rules.step(self.state, close, date.value)
+            if portion is not None:
+                self.orders.insert(0, ('close', math.copysign(max(1, int(round(abs(self.size) * portion))), -self.size)))
+
+        signal = self.engine.update(bar)
+        if signal is not None:
+            self.signals.append((signal, date, close))
+            side = rules.LONG if signal == 'buy' else rules.SHORT
+            if self.size:
+                self.orders.insert(0, ('close', math.copysign(max(1, int(round(abs(self.size)))), -self.size)))
+            self.orders.append(('entry', side))
+            self.rules.open(self.state, side, close, date.value)
+        return signal
+
+    def save(self, directory, name):
+        # <name>_signals.csv, <name>_trade_log.csv and <name>_equity_curve.csv
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, name)
+        with open(f"{base}_signals.csv", 'w') as file:
+            for title, action in (('Buy Signals:', 'buy'), ('Sell Signals:', 'sell')):
+                if action == 'sell':
+                    file.write('\n')
+                file.write(f"{title}\n")
+                rows = [(date, close) for signal, date, close in self.signals if signal == action]
+                pd.DataFrame(rows, columns=['Date', 'Close']).to_csv(file, index=False)
+        pd.DataFrame(self.trades, columns=['Date', 'Type', 'Price', 'Shares']).to_csv(f"{base}_trade_log.csv")
+        pd.DataFrame(self.equity, columns=['Date', 'Equity']).to_csv(f"{base}_equity_curve.csv")
+
+
+class PaperTrader:
+    # Feed client: one PaperAccount per instrument, with end-to-end latency and throughput counters
+    def __init__(self, tickers, strategy_name='BollingerKeltnerChaikinSMAStrategy', execution=False):
+        from execution import model_for
+        long_only = STRATEGY_LONG_ONLY[strategy_name]
+        self.strategy_name = strategy_name
+        self.accounts = {}
+        for ticker in tickers:
+            commission = model_for(ticker).commission_function() if execution else config.commission
+            self.accounts[ticker] = PaperAccount(ticker, long_only, commission=commission)
+        self.latencies = []
+        self.first_bar = None
+        self.last_bar = None
+
+    def on_bar(self, bar):
+        signal = self.accounts[bar['ticker']].on_bar(bar)
+        now = time.time()
+        self.latencies.append(now - bar['sent'])
+        if self.first_bar is None:
+            self.first_bar = now
+        self.last_bar = now
+        return signal
+
+    async def run(self, host, port):
+        # Consume the feed until the server sends its end message
+        reader, writer = await asyncio.open_connection(host, port, limit=2 ** 20)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                bar = json.loads(line)
+                if bar.get('type') == 'end':
+                    break
+                if bar['ticker'] in self.accounts:
+                    self.on_bar(bar)
+        finally:
+            writer.close()
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1000
+        elapsed = (self.last_bar - self.first_bar) if self.latencies else 0.0
+        return {
+            'bars': len(latencies),
+            'signals': sum(len(account.signals) for account in self.accounts.values()),
+            'trades': sum(len(account.trades) for account in self.accounts.values()),
+            'throughput [bars/s]': len(latencies) / elapsed if elapsed > 0 else float('nan'),
+            'latency mean [ms]': float(latencies.mean()) if len(latencies) else float('nan'),
+            'latency p50 [ms]': float(np.percentile(latencies, 50)) if len(latencies) else float('nan'),
+            'latency p99 [ms]': float(np.percentile(latencies, 99)) if len(latencies) else float('nan'),
+            'latency max [ms]': float(latencies.max()) if len(latencies) else float('nan'),
+        }
+
+    def save(self, directory, names):
+        for ticker, account in self.accounts.items():
+            account.save(directory, names.get(ticker, ticker).lower().replace(' ', '_'))
+
+
+async def run_paper_trading(paths, trader, speed=0.0, start_date=None, end_date=None):
+    # Bundled mode: the replay server and the trader in one event loop, over a local socket
+    server = ReplayServer(paths, speed, start_date, end_date)
+    host, port = await server.start()
+    try:
+        await trader.run(host, port)
+    finally:
+        server.close()
+    return trader
+
+
+def main():
+    from batch_runner import load_universe
+    parser = argparse.ArgumentParser(description="Paper-trade the strategies on a replayed bar feed.")
+    parser.add_argument('--tickers', nargs='+', help="Tickers to trade (default: all of stocks/tickers.txt)")
+    parser.add_argument('--strategy', default='BollingerKeltnerChaikinSMAStrategy', choices=list(STRATEGY_LONG_ONLY))
+    parser.add_argument('--start', default=None)
+    parser.add_argument('--end', default=None)
+    parser.add_argument('--speed', type=float, default=0.0, help="Replay speed in bars per second (0: as fast as possible)")
+    parser.add_argument('--serve', metavar='HOST:PORT', default=None, help="Only run the replay server on HOST:PORT")
+    parser.add_argument('--connect', metavar='HOST:PORT', default=None, help="Only run the trader against a running server")
+    parser.add_argument('--execution', action='store_true', help="Fill with per-asset spread and slippage (execution.py)")
+    parser.add_argument('--output', default=None, help="Directory for the logs (default: signals/<strategy>/paper)")
+    args = parser.parse_args()
+
+    universe = load_universe()
+    tickers = args.tickers or list(universe)
+    paths = {ticker: path for ticker, path in
+             CSVSource.from_lists('./stocks/options.txt', './stocks/tickers.txt', './data').paths.items()
+             if ticker in tickers}
+
+    if args.serve:
+        host, port = args.serve.rsplit(':', 1)
+        server = ReplayServer(paths, args.speed, args.start, args.end, host, int(port))
+        print(f"Replaying {len(paths)} instruments on {host}:{port}")
+        asyncio.run(server.serve_forever())
+        return
+
+    trader = PaperTrader(tickers, args.strategy, args.execution)
+    if args.connect:
+        host, port = args.connect.rsplit(':', 1)
+        asyncio.run(trader.run(host, int(port)))
+    else:
+        asyncio.run(run_paper_trading(paths, trader, args.speed, args.start, args.end))
+
+    output = args.output or os.path.join('signals', args.strategy, 'paper')
+    trader.save(output, {ticker: universe.get(ticker, ticker) for ticker in tickers})
+    for metric, value in trader.stats().items():
+        print(f"{metric}: {value:,.3f}" if isinstance(value, float) else f"{metric}: {value}")
+    print(f"Signals, trade logs and equity curves saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import config
+from data_store import MarketDataStore, CSVSource, YFinanceSource
+from strategies import indicators, rules
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class AlignedData:
+    # OHLCV for many instruments on one union calendar: each field is an (n_bars, n_assets) array,
+    # NaN where an instrument has no bar, and `valid` marks the bars that exist
+    def __init__(self, index, tickers, fields, valid):
+        self.index = index
+        self.tickers = list(tickers)
+        self.fields = fields
+        self.valid = valid
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+    @property
+    def shape(self):
+        return self.valid.shape
+
+
+def align_frames(frames):
+    # Put {ticker: OHLCV frame} on the union of their calendars without filling gaps
+    tickers = list(frames)
+    index = pd.DatetimeIndex(sorted(set().union(*(frame.index for frame in frames.values()))), name='Date')
+    fields = {field: np.full((len(index), len(tickers)), np.nan) for field in FIELDS}
+    for column, ticker in enumerate(tickers):
+        frame = frames[ticker]
+        rows = index.get_indexer(frame.index)
+        for field in FIELDS:
+            fields[field][rows, column] = frame[field].to_numpy(np.float64)
+    valid = np.isfinite(fields['Close'])
+    return AlignedData(index, tickers, fields, valid)
+
+
+def _compact_order(valid):
+    # Row order that moves each column's own bars to the bottom, oldest first, and its gaps to the top
+    return np.argsort(valid, axis=0, kind='stable')
+
+
+def _compact(values, order):
+    return np.take_along_axis(values, order, axis=0)
+
+
+def _expand(values, order, valid):
+    # Inverse of _compact; rows without a bar come back as NaN / False
+    result = np.empty_like(values)
+    np.put_along_axis(result, order, values, axis=0)
+    return np.where(valid, result, np.nan if values.dtype.kind == 'f' else False)
+
+
+def compute_signals(data, bb_length=20, bb_std=2.0, kc_length=20, kc_scalar=2.0,
+                    adosc_fast=3, adosc_slow=10, sma_length=100, long_only=False):
+    # Entry signals for every instrument in one batch, from the strategies' entry rules (strategies/rules.py).
+    # Each column is compacted to its own bars first, so indicators and the 'prev_' operands of the rules
+    # see each calendar as the strategies do.
+    order = _compact_order(data.valid)
+    high, low, close, volume = (_compact(data[field], order) for field in ('High', 'Low', 'Close', 'Volume'))
+    bb_lower, _, bb_upper = indicators.bbands(close, bb_length, bb_std)
+    kc_lower, _, kc_upper = indicators.kc(high, low, close, kc_length, kc_scalar)
+    chaikin = indicators.adosc(high, low, close, volume, adosc_fast, adosc_slow)
+    sma = indicators.sma(close, sma_length)
+
+    current = {'bb_upper': bb_upper, 'bb_lower': bb_lower, 'kc_upper': kc_upper, 'kc_lower': kc_lower,
+               'chaikin': chaikin, 'sma': sma}
+    long_signals, short_signals = rules.RuleSet(long_only=long_only).entry_signals(current, rules.shifted(current))
+    return _expand(long_signals, order, data.valid), _expand(short_signals, order, data.valid)
+
+
+class PortfolioBacktest:
+    """
+    Multi-asset backtest with one shared cash balance
+    -------------------------------------------------
+    All instruments sit on one aligned calendar and are simulated together: the
+    loop runs over bars only, and every rule is a NumPy operation across all
+    assets. Each new position is sized at config.position_size of current
+    equity, scaled down pro rata when the cash left cannot fund every entry on
+    a bar. Exits are BollingerKeltnerChaikinSMAStrategy's rules.RuleSet ladders
+    (config.ladder_*), stepped for all assets at once with step_many(). Orders
+    fill at the bar's close and pay config.commission on the traded value.
+    Instruments are valued at their last close on days they do not trade;
+    prices are taken as quoted, without currency conversion.
+    """
+
+    def __init__(self, data, long_signals, short_signals, cash=config.initial_balance,
+                 position_size=config.position_size, stop_loss=config.stop_loss,
+                 commission=config.commission, long_only=False):
+        self.data = data
+        self.long_signals = np.asarray(long_signals, dtype=bool)
+        self.short_signals = np.zeros_like(self.long_signals) if long_only else np.asarray(short_signals, dtype=bool)
+        self.initial_cash = cash
+        self.position_size = position_size
+        self.stop_loss = stop_loss
+        self.commission = commission
+        self.rules = rules.RuleSet(stop_loss=stop_loss)
+
+    def run(self):
+        close = self.data['Close']
+        valid = self.data.valid
+        n, k = close.shape
+        times = self.data.index.as_unit('ns').asi8
+        last_price = pd.DataFrame(close).ffill().to_numpy()
+
+        states = rules.ExitStates(k)
+        side = states.side          # rules.LONG, rules.SHORT or 0 when flat
+        entry_price = states.entry_price
+        quantity = np.zeros(k)
+        cash = self.initial_cash
+
+        equity = np.empty(n)
+        trade_rows, trade_assets, trade_kinds, trade_quantities, trade_prices = [], [], [], [], []
+
+        def record(bar, assets, kind, quantities, prices):
+            trade_rows.append(np.full(len(assets), bar))
+            trade_assets.append(assets)
+            trade_kinds.append(np.full(len(assets), kind))
+            trade_quantities.append(quantities)
+            trade_prices.append(prices)
+
+        for bar in range(n):
+            price = close[bar]
+            active = (side != 0) & valid[bar]
+
+            # Exit management: the portion of each open position the ladder closes on this bar
+            position_side = side.copy()
+            portions = self.rules.step_many(states, active, price, times[bar])
+
+            assets = np.flatnonzero(portions < 1)
+            if len(assets):
+                sold = quantity[assets] * portions[assets]
+                value = sold * (entry_price[assets] + position_side[assets] * (price[assets] - entry_price[assets]))
+                cash += value.sum() - (sold * price[assets]).sum() * self.commission
+                quantity[assets] -= sold
+                record(bar, assets, 'partial_exit', sold, price[assets])
+
+            assets = np.flatnonzero(portions >= 1)
+            if len(assets):
+                value = quantity[assets] * (entry_price[assets] + position_side[assets] * (price[assets] - entry_price[assets]))
+                cash += value.sum() - (quantity[assets] * price[assets]).sum() * self.commission
+                record(bar, assets, 'full_exit', quantity[assets].copy(), price[assets])
+                quantity[assets] = 0
+
+            # Entries for flat instruments with a signal, sized on current equity and funded from shared cash
+            open_value = quantity * (entry_price + side * (np.nan_to_num(last_price[bar]) - entry_price))
+            current_equity = cash + open_value.sum()
+            wants_long = self.long_signals[bar] & (side == 0)
+            wants_short = self.short_signals[bar] & (side == 0) & ~wants_long
+            assets = np.flatnonzero(wants_long | wants_short)
+            if len(assets) and cash > 0:
+                budget = np.full(len(assets), current_equity * self.position_size)
+                needed = budget.sum() * (1 + self.commission)
+                if needed > cash:
+                    budget *= cash / needed
+                fill = price[assets]
+                quantity[assets] = budget / fill
+                sides = np.where(wants_long, rules.LONG, np.where(wants_short, rules.SHORT, 0))
+                self.rules.open_many(states, sides, price, times[bar])
+                cash -= budget.sum() * (1 + self.commission)
+                record(bar, assets, 'entry', quantity[assets].copy(), fill)
+
+            open_value = quantity * (entry_price + side * (np.nan_to_num(last_price[bar]) - entry_price))
+            equity[bar] = cash + open_value.sum()
+
+        self.cash = cash
+        self.equity_curve = pd.Series(equity, index=self.data.index, name='Equity')
+        self.trades = self._trade_frame(trade_rows, trade_assets, trade_kinds, trade_quantities, trade_prices)
+        return self
+
+    def _trade_frame(self, rows, assets, kinds, quantities, prices):
+        if not rows:
+            return pd.DataFrame(columns=['date', 'ticker', 'type', 'quantity', 'price'])
+        rows, assets = np.concatenate(rows), np.concatenate(assets)
+        return pd.DataFrame({
+            'date': self.data.index[rows],
+            'ticker': np.asarray(self.data.tickers, dtype=object)[assets],
+            'type': np.concatenate(kinds),
+            'quantity': np.concatenate(quantities),
+            'price': np.concatenate(prices),
+        })
+
+    def metrics(self):
+        # Same definitions as Strategy1Backtesting.calculate_metrics, on the portfolio equity
+        equity = self.equity_curve
+        returns = equity.pct_change().fillna(0)
+        total_return = (equity.iloc[-1] - self.initial_cash) / self.initial_cash
+        annualized_return = (1 + total_return) ** (365 / len(equity)) - 1
+        annualized_volatility = returns.std() * np.sqrt(252)
+        return {
+            'Total Return': float(total_return),
+            'Annualized Return': float(annualized_return),
+            'Annualized Volatility': float(annualized_volatility),
+            'Max Drawdown': float((equity / equity.cummax() - 1).min()),
+            'Sharpe Ratio': float((annualized_return - 0.02) / annualized_volatility),
+            'Trades': int((self.trades['type'] == 'entry').sum()),
+            'Instruments': len(self.data.tickers),
+        }
+
+
+def load_frames(tickers, start_date, end_date, store=None):
+    store = store if store is not None else MarketDataStore()
+    frames = {}
+    for ticker in tickers:
+        store.update(ticker, start_date, end_date)
+        frames[ticker] = store.frame(ticker, start_date, end_date, columns=FIELDS)
+    return frames
+
+
+def main():
+    from batch_runner import load_universe
+    parser = argparse.ArgumentParser(description="Backtest the whole universe from one shared account.")
+    parser.add_argument('--tickers', nargs='+', help="Tickers (default: all of stocks/tickers.txt)")
+    parser.add_argument('--start', default="2018-01-01")
+    parser.add_argument('--end', default="2024-12-31")
+    parser.add_argument('--long-only', action='store_true')
+    parser.add_argument('--source', choices=['yfinance', 'csv'], default='yfinance')
+    parser.add_argument('--output', default=os.path.join('backtesting_results', 'portfolio'))
+    args = parser.parse_args()
+
+    if args.source == 'csv':
+        source = CSVSource.from_lists('./stocks/options.txt', './stocks/tickers.txt', './data')
+    else:
+        source = YFinanceSource()
+    tickers = args.tickers or list(load_universe())
+
+    started = time.perf_counter()
+    data = align_frames(load_frames(tickers, args.start, args.end, MarketDataStore(source=source)))
+    long_signals, short_signals = compute_signals(data)
+    backtest = PortfolioBacktest(data, long_signals, short_signals, long_only=args.long_only).run()
+    print(f"Portfolio of {len(tickers)} instruments over {len(data.index)} bars in {time.perf_counter() - started:.2f}s")
+    for metric, value in backtest.metrics().items():
+        print(f"{metric}: {value:.4f}" if isinstance(value, float) else f"{metric}: {value}")
+
+    os.makedirs(args.output, exist_ok=True)
+    backtest.equity_curve.to_csv(os.path.join(args.output, 'portfolio_equity_curve.csv'))
+    backtest.trades.to_csv(os.path.join(args.output, 'portfolio_trade_log.csv'), index=False)
+    print(f"Portfolio results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
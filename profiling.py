@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import contextlib
+import numpy as np
+
+# Strategy attributes holding indicator arrays, counted when profiling
+INDICATOR_ATTRIBUTES = ['bb_upper', 'bb_lower', 'kc_upper', 'kc_lower', 'chaikin', 'sma_100']
+# Bar data fields counted when profiling
+DATA_ATTRIBUTES = ['Open', 'High', 'Low', 'Close', 'Volume', 'index']
+PHASES = ['manage_position', 'check_entries']
+
+
+class _CountingArray:
+    # Stands in for an indicator or data array during one next() call and counts element lookups
+    __slots__ = ('_array', '_name', '_profiler')
+
+    def __init__(self, array, name, profiler):
+        self._array = array
+        self._name = name
+        self._profiler = profiler
+
+    def __getitem__(self, key):
+        self._profiler._count_access(self._name)
+        return self._array[key]
+
+    def __len__(self):
+        return len(self._array)
+
+    def __getattr__(self, name):
+        return getattr(self._array, name)
+
+
+class _CountingData:
+    # Stands in for strategy.data during one next() call so data.Close[-1] etc. are counted
+    __slots__ = ('_data', '_profiler')
+
+    def __init__(self, data, profiler):
+        self._data = data
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        value = getattr(self._data, name)
+        if name in DATA_ATTRIBUTES:
+            return _CountingArray(value, f'data.{name}', self._profiler)
+        return value
+
+
+class StrategyProfiler:
+    """
+    Opt-in per-bar profiler for the backtesting.py strategies
+    ---------------------------------------------------------
+    instrument(strategy_cls) temporarily wraps the class's init, next,
+    manage_position and check_entries methods to record time and call counts
+    per phase, the duration of every next() call, and how often each indicator
+    and data field is read in each phase. Outside that context the class is
+    untouched, so profiling costs nothing when it is not enabled.
+
+    profile_run() wraps a whole Backtest.run so the time spent in backtesting.py
+    itself (order handling, bookkeeping) is reported as the 'broker' phase.
+    Reports are written as JSON and as collapsed stacks for flamegraph.pl or
+    speedscope.
+    """
+
+    def __init__(self):
+        self.phase_ns = {}
+        self.phase_calls = {}
+        self.accesses = {}
+        self.bar_ns = []
+        self.run_ns = 0
+        self._phase = 'next'
+
+    def _record(self, phase, elapsed):
+        self.phase_ns[phase] = self.phase_ns.get(phase, 0) + elapsed
+        self.phase_calls[phase] = self.phase_calls.get(phase, 0) + 1
+
+    def _count_access(self, name):
+        key = (self._phase, name)
+        self.accesses[key] = self.accesses.get(key, 0) + 1
+
+    def _wrap_phase(self, method, phase):
+        profiler = self
+
+        def timed(strategy, *args, **kwargs):
+            outer = profiler._phase
+            profiler._phase = phase
+            started = time.perf_counter_ns()
+            try:
+                return method(strategy, *args, **kwargs)
+            finally:
+                profiler._record(phase, time.perf_counter_ns() - started)
+                profiler._phase = outer
+        return timed
+
+    def _wrap_next(self, method):
+        profiler = self
+
+        def timed_next(strategy):
+            # Swap in counting views of this bar's arrays, then put the originals back
+            originals = {name: strategy.__dict__[name] for name in INDICATOR_ATTRIBUTES if name in strategy.__dict__}
+            for name, array in originals.items():
+                strategy.__dict__[name] = _CountingArray(array, name, profiler)
+            data = strategy._data
+            strategy._data = _CountingData(data, profiler)
+            profiler._phase = 'next'
+            started = time.perf_counter_ns()
+            try:
+                return method(strategy)
+            finally:
+                elapsed = time.perf_counter_ns() - started
+                strategy._data = data
+                strategy.__dict__.update(originals)
+                profiler._record('next', elapsed)
+                profiler.bar_ns.append(elapsed)
+        return timed_next
+
+    @contextlib.contextmanager
+    def instrument(self, strategy_cls):
+        # Patch the strategy class for the duration of the block
+        patched = {'init': self._wrap_phase(strategy_cls.init, 'init'), 'next': self._wrap_next(strategy_cls.next)}
+        for phase in PHASES:
+            if hasattr(strategy_cls, phase):
+                patched[phase] = self._wrap_phase(getattr(strategy_cls, phase), phase)
+        saved = {name: strategy_cls.__dict__[name] for name in patched if name in strategy_cls.__dict__}
+        for name, method in patched.items():
+            setattr(strategy_cls, name, method)
+        try:
+            yield self
+        finally:
+            for name in patched:
+                if name in saved:
+                    setattr(strategy_cls, name, saved[name])
+                else:
+                    delattr(strategy_cls, name)
+
+    def profile_run(self, bt, **params):
+        # Run a Backtest under instrumentation and time the whole run
+        with self.instrument(bt._strategy):
+            started = time.perf_counter_ns()
+            output = bt.run(**params)
+            self.run_ns += time.perf_counter_ns() - started
+        return output
+
+    def report(self):
+        # Summary dict: per-phase totals, per-bar distribution and access counts
+        bars = np.asarray(self.bar_ns, dtype=np.float64)
+        phases = {phase: {'calls': self.phase_calls[phase], 'total_ms': self.phase_ns[phase] / 1e6,
+                          'mean_us': self.phase_ns[phase] / self.phase_calls[phase] / 1e3}
+                  for phase in self.phase_ns}
+        accesses = {}
+        for (phase, name), count in sorted(self.accesses.items()):
+            accesses.setdefault(phase, {})[name] = count
+        report = {'phases': phases, 'accesses': accesses, 'bars': len(bars)}
+        if len(bars):
+            report['next_us'] = {
+                'mean': bars.mean() / 1e3,
+                'p50': float(np.percentile(bars, 50)) / 1e3,
+                'p99': float(np.percentile(bars, 99)) / 1e3,
+                'max': bars.max() / 1e3,
+            }
+        if self.run_ns:
+            report['run_ms'] = self.run_ns / 1e6
+            report['phases']['broker'] = {'calls': 1, 'total_ms': self._broker_ns() / 1e6}
+        return report
+
+    def _broker_ns(self):
+        return max(self.run_ns - self.phase_ns.get('init', 0) - self.phase_ns.get('next', 0), 0)
+
+    def collapsed_stacks(self):
+        # Lines of "frame;frame value" in microseconds, the input format of flamegraph.pl
+        next_ns = self.phase_ns.get('next', 0)
+        inner = sum(self.phase_ns.get(phase, 0) for phase in PHASES)
+        stacks = {
+            'run;init': self.phase_ns.get('init', 0),
+            'run;next': max(next_ns - inner, 0),
+        }
+        for phase in PHASES:
+            stacks[f'run;next;{phase}'] = self.phase_ns.get(phase, 0)
+        if self.run_ns:
+            stacks['run;broker'] = self._broker_ns()
+        return [f"{stack} {value // 1000}" for stack, value in stacks.items() if value]
+
+    def save(self, directory, name):
+        # Write <name>_profile.json and <name>_profile.folded; returns both paths
+        os.makedirs(directory, exist_ok=True)
+        json_path = os.path.join(directory, f"{name}_profile.json")
+        folded_path = os.path.join(directory, f"{name}_profile.folded")
+        with open(json_path, 'w') as file:
+            json.dump(self.report(), file, indent=2, default=float)
+        with open(folded_path, 'w') as file:
+            file.write('\n'.join(self.collapsed_stacks()) + '\n')
+        return json_path, folded_path
@@ -0,0 +1,144 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import config
+import metrics
+
+DEFAULT_REPORT_DIR = 'reports'
+DEFAULT_MAX_POINTS = 2000
+
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the visual shape
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_start, next_stop = stop, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        # Average of the next bucket is the third corner of every candidate triangle
+        mean_x = x[next_start:next_stop].mean()
+        mean_y = y[next_start:next_stop].mean()
+        area = np.abs((x[previous] - mean_x) * (y[start:stop] - y[previous])
+                      - (x[previous] - x[start:stop]) * (mean_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax_decimate(y, buckets):
+    # Indices of the minimum and maximum of each of `buckets` equal slices, in time order;
+    # keeps every spike, e.g. the bottom of each drawdown
+    n = len(y)
+    if 2 * buckets >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    size = n // buckets
+    body = y[:size * buckets].reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    picks = np.concatenate([offsets + np.nanargmin(body, axis=1), offsets + np.nanargmax(body, axis=1),
+                            np.arange(size * buckets, n), [0, n - 1]])
+    return np.unique(picks)
+
+
+def downsample(series, max_points=DEFAULT_MAX_POINTS, method='lttb'):
+    # Reduce a time series to about max_points points before drawing
+    if max_points is None or len(series) <= max_points:
+        return series
+    if method == 'minmax':
+        keep = minmax_decimate(series.to_numpy(), max_points // 2)
+    else:
+        keep = lttb(series.index.as_unit('ns').asi8, series.to_numpy(), max_points)
+    return series.iloc[keep]
+
+
+def _trend(series):
+    # Straight-line fit over the plotted points, evaluated at the same dates
+    x = series.index.as_unit('ns').asi8.astype(np.float64)
+    return np.poly1d(np.polyfit(x, series.to_numpy(), 1))(x)
+
+
+def plot_equity_curve(ax, equity, initial_balance=config.initial_balance):
+    ax.plot(equity.index, equity, label='Equity')
+    ax.axhline(initial_balance, color='green', linestyle='--', label=f'Starting Balance: {initial_balance}')
+    ax.plot(equity.index, _trend(equity), color='blue', linestyle='--', label='Trend Line')
+    ax.set_title('Equity Curve')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Equity')
+    ax.set_xlim([equity.index[0], equity.index[-1]])
+    ax.set_ylim([equity.min() * 0.9, equity.max() * 1.1])
+    ax.legend()
+
+
+def plot_drawdown(ax, drawdown):
+    ax.plot(drawdown.index, drawdown, label='Drawdown')
+    ax.axhline(0, color='green', linestyle='--', label='Zero Line')
+    ax.plot(drawdown.index, _trend(drawdown), color='blue', linestyle='--', label='Trend Line')
+    ax.set_title('Drawdown')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Drawdown')
+    ax.set_xlim([drawdown.index[0], drawdown.index[-1]])
+    ax.set_ylim([drawdown.min() * 1.3, 0.03])
+    ax.legend()
+
+
+def render_report(performance, directory, name, max_points=DEFAULT_MAX_POINTS, method='lttb'):
+    # Write <name>_equity_curve.png and <name>_drawdown.png for one equity curve; returns the paths.
+    # Figures are drawn with the Agg canvas directly, so this is safe off the main thread.
+    equity = performance['Equity']
+    if 'DrawdownPct' in performance:
+        # Backtest results carry the drawdown already (as 1 - equity / peak)
+        drawdown = -performance['DrawdownPct']
+    else:
+        drawdown = metrics.drawdown(equity)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for suffix, series, draw in (('equity_curve', downsample(equity, max_points, method), plot_equity_curve),
+                                 ('drawdown', downsample(drawdown, max_points, 'minmax'), plot_drawdown)):
+        figure = Figure(figsize=(10, 6))
+        FigureCanvasAgg(figure)
+        draw(figure.add_subplot(), series)
+        path = os.path.join(directory, f"{name}_{suffix}.png")
+        figure.savefig(path)
+        paths.append(path)
+    return paths
+
+
+class ReportWriter:
+    """
+    Background report renderer
+    --------------------------
+    submit() hands an equity curve to a worker thread and returns immediately
+    with a Future of the written file paths, so plotting overlaps with the
+    next backtest instead of blocking it. Series are downsampled to
+    max_points before drawing (LTTB for the equity curve, min/max decimation
+    for the drawdown so its troughs survive). close() waits for pending reports.
+    """
+
+    def __init__(self, directory=DEFAULT_REPORT_DIR, max_points=DEFAULT_MAX_POINTS, method='lttb', workers=1):
+        self.directory = directory
+        self.max_points = max_points
+        self.method = method
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report')
+
+    def submit(self, name, performance):
+        performance = pd.DataFrame({'Equity': performance['Equity']})
+        return self._executor.submit(render_report, performance, self.directory, name, self.max_points, self.method)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,213 @@
+import os
+import json
+import sqlite3
+import numpy as np
+import pandas as pd
+
+DEFAULT_RESULTS_PATH = os.path.join('backtesting_results', 'results.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    created TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    params TEXT NOT NULL,
+    start_date TEXT,
+    end_date TEXT
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    metric TEXT NOT NULL,
+    value REAL,
+    text TEXT
+);
+CREATE TABLE IF NOT EXISTS trades (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    size REAL,
+    entry_bar INTEGER,
+    exit_bar INTEGER,
+    entry_price REAL,
+    exit_price REAL,
+    sl REAL,
+    tp REAL,
+    pnl REAL,
+    commission REAL,
+    return_pct REAL,
+    entry_time TEXT,
+    exit_time TEXT,
+    duration_days REAL
+);
+CREATE TABLE IF NOT EXISTS equity (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    date TEXT NOT NULL,
+    equity REAL NOT NULL,
+    drawdown_pct REAL
+);
+CREATE INDEX IF NOT EXISTS runs_ticker_strategy ON runs(ticker, strategy);
+CREATE INDEX IF NOT EXISTS metrics_run ON metrics(run_id);
+CREATE INDEX IF NOT EXISTS metrics_metric ON metrics(metric, value);
+CREATE INDEX IF NOT EXISTS trades_run ON trades(run_id);
+CREATE INDEX IF NOT EXISTS equity_run ON equity(run_id);
+"""
+
+# backtesting.py trade columns and the trades table columns they are stored in
+TRADE_COLUMNS = {
+    'Size': 'size', 'EntryBar': 'entry_bar', 'ExitBar': 'exit_bar', 'EntryPrice': 'entry_price',
+    'ExitPrice': 'exit_price', 'SL': 'sl', 'TP': 'tp', 'PnL': 'pnl', 'Commission': 'commission',
+    'ReturnPct': 'return_pct', 'EntryTime': 'entry_time', 'ExitTime': 'exit_time', 'Duration': 'duration_days',
+}
+NS_PER_DAY = 86_400_000_000_000
+
+
+def _metric_row(run_id, metric, value):
+    # Numbers go in `value`; timestamps in `text`; durations in both (days and their text form)
+    if isinstance(value, (pd.Timedelta, np.timedelta64)):
+        value = pd.Timedelta(value)
+        return run_id, metric, value.value / NS_PER_DAY, str(value)
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return run_id, metric, None, pd.Timestamp(value).isoformat()
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        value = float(value)
+        return run_id, metric, None if np.isnan(value) else value, None
+    return run_id, metric, None, str(value)
+
+
+def _iso(values):
+    values = pd.DatetimeIndex(values)
+    return np.where(values.isna(), None, values.strftime('%Y-%m-%d %H:%M:%S')).tolist()
+
+
+def _trade_rows(run_id, trades):
+    # Column-wise conversion to plain Python values for executemany
+    if trades is None or len(trades) == 0:
+        return []
+    trades = trades.reindex(columns=list(TRADE_COLUMNS))
+    columns = [np.full(len(trades), run_id).tolist()]
+    for column in TRADE_COLUMNS:
+        values = trades[column]
+        if column in ('EntryTime', 'ExitTime'):
+            columns.append(_iso(values))
+        elif column == 'Duration':
+            columns.append((pd.to_timedelta(values).dt.total_seconds() / 86400).tolist())
+        else:
+            values = pd.to_numeric(values, errors='coerce').astype(np.float64)
+            columns.append(np.where(values.isna(), None, values).tolist())
+    return list(zip(*columns))
+
+
+def _equity_rows(run_id, equity_curve):
+    if equity_curve is None or len(equity_curve) == 0:
+        return []
+    drawdown = equity_curve['DrawdownPct'] if 'DrawdownPct' in equity_curve else pd.Series(np.nan, index=equity_curve.index)
+    return list(zip(np.full(len(equity_curve), run_id).tolist(), _iso(equity_curve.index),
+                    equity_curve['Equity'].astype(np.float64).tolist(),
+                    np.where(drawdown.isna(), None, drawdown.astype(np.float64)).tolist()))
+
+
+class ResultsStore:
+    """
+    SQLite store for backtest results
+    ---------------------------------
+    Every backtest becomes one row in `runs` (ticker, strategy, parameters as
+    JSON and the date window) plus typed rows in three tables keyed by run_id:
+    `metrics` (one row per statistic), `trades` (backtesting.py's trade columns,
+    without the per-strategy indicator snapshots) and `equity` (the equity curve
+    and drawdown). Writes are append-only and go through executemany in one
+    transaction per call, so save_runs() can persist a whole batch at once.
+    The query helpers return DataFrames; metrics() pivots one column per metric
+    for comparing thousands of runs.
+    """
+
+    def __init__(self, path=DEFAULT_RESULTS_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    def save_run(self, ticker, strategy, output, params=None, start_date=None, end_date=None):
+        # Persist one backtesting.py output Series; returns its run_id
+        return self.save_runs([(ticker, strategy, output, params, start_date, end_date)])[0]
+
+    def save_runs(self, runs):
+        # runs: iterable of (ticker, strategy, output, params, start_date, end_date) where output is a
+        # backtesting.py stats Series or a dict with the same keys; returns the new run_ids
+        created = pd.Timestamp.now().isoformat(timespec='seconds')
+        run_ids, metric_rows, trade_rows, equity_rows = [], [], [], []
+        with self.connection:
+            for ticker, strategy, output, params, start_date, end_date in runs:
+                if params is None:
+                    params = getattr(output.get('_strategy'), '_params', None) or {}
+                cursor = self.connection.execute(
+                    'INSERT INTO runs (created, ticker, strategy, params, start_date, end_date) VALUES (?, ?, ?, ?, ?, ?)',
+                    (created, ticker, strategy, json.dumps(params, sort_keys=True, default=str),
+                     None if start_date is None else str(start_date), None if end_date is None else str(end_date)))
+                run_id = cursor.lastrowid
+                run_ids.append(run_id)
+                metric_rows.extend(_metric_row(run_id, metric, value) for metric, value in output.items()
+                                   if not metric.startswith('_'))
+                trade_rows.extend(_trade_rows(run_id, output.get('_trades')))
+                equity_rows.extend(_equity_rows(run_id, output.get('_equity_curve')))
+            self.connection.executemany('INSERT INTO metrics VALUES (?, ?, ?, ?)', metric_rows)
+            self.connection.executemany(f'INSERT INTO trades VALUES ({", ".join("?" * 14)})', trade_rows)
+            self.connection.executemany('INSERT INTO equity VALUES (?, ?, ?, ?)', equity_rows)
+        return run_ids
+
+    def _where(self, ticker=None, strategy=None, run_ids=None):
+        clauses, values = [], []
+        if ticker is not None:
+            clauses.append('runs.ticker = ?')
+            values.append(ticker)
+        if strategy is not None:
+            clauses.append('runs.strategy = ?')
+            values.append(strategy)
+        if run_ids is not None:
+            run_ids = list(run_ids)
+            clauses.append(f'runs.run_id IN ({", ".join("?" * len(run_ids))})')
+            values.extend(run_ids)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', values
+
+    def runs(self, ticker=None, strategy=None):
+        where, values = self._where(ticker, strategy)
+        return pd.read_sql_query(f'SELECT * FROM runs{where} ORDER BY run_id', self.connection, params=values)
+
+    def metrics(self, metrics=None, ticker=None, strategy=None):
+        # One row per run, one column per metric (numeric value, or the text for timestamps)
+        where, values = self._where(ticker, strategy)
+        query = ('SELECT runs.run_id, runs.ticker, runs.strategy, runs.params, metrics.metric, '
+                 'COALESCE(metrics.value, metrics.text) AS value FROM metrics JOIN runs USING (run_id)' + where)
+        if metrics is not None:
+            metrics = list(metrics)
+            query += (' AND ' if where else ' WHERE ') + f'metrics.metric IN ({", ".join("?" * len(metrics))})'
+            values = values + metrics
+        long = pd.read_sql_query(query, self.connection, params=values)
+        wide = long.pivot(index=['run_id', 'ticker', 'strategy', 'params'], columns='metric', values='value')
+        wide.columns.name = None
+        for column in wide.columns:
+            try:
+                wide[column] = pd.to_numeric(wide[column])
+            except (TypeError, ValueError):
+                pass
+        return wide.reset_index()
+
+    def trades(self, run_ids=None, ticker=None, strategy=None):
+        where, values = self._where(ticker, strategy, run_ids)
+        frame = pd.read_sql_query(f'SELECT trades.* FROM trades JOIN runs USING (run_id){where}',
+                                  self.connection, params=values, parse_dates=['entry_time', 'exit_time'])
+        return frame
+
+    def equity(self, run_id):
+        return pd.read_sql_query('SELECT date, equity, drawdown_pct FROM equity WHERE run_id = ? ORDER BY date',
+                                 self.connection, params=[run_id], parse_dates=['date'], index_col='date')
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
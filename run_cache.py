@@ -0,0 +1,228 @@
+import os
+import sys
+import time
+import json
+import pickle
+import inspect
+import importlib
+import importlib.util
+import importlib.metadata
+import hashlib
+import numpy as np
+import pandas as pd
+import config
+from strategies.indicator_cache import fingerprint
+
+DEFAULT_RUN_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.run_cache')
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+# Modules whose source decides what a strategy does, besides the strategy's own module
+# (strategies.strategy1 holds the code of the long-only subclass too)
+STRATEGY_MODULES = ['strategies.strategy1', 'strategies.indicators', 'strategies.rules']
+# Modules that run the backtest and fill its orders, for either backend
+ENGINE_MODULES = ['fast_backtest', 'execution']
+# config values that change how results are shown or stored, not the results themselves
+IGNORED_CONFIG = {
+    'profile_strategies', 'profile_dir', 'plot_results', 'report_dir', 'report_max_points', 'interactive_plot',
+    'run_cache', 'run_cache_dir', 'run_cache_max_bytes', 'run_cache_max_entries', 'run_cache_max_age_days',
+}
+
+
+def data_fingerprint(data):
+    # Hash of the bar dates and OHLCV values
+    columns = [data[column].to_numpy(np.float64) for column in ('Open', 'High', 'Low', 'Close', 'Volume')]
+    return fingerprint(pd.DatetimeIndex(data.index).as_unit('ns').asi8, *columns)
+
+
+def strategy_path(strategy):
+    # (module, qualified name) of a strategy class, or of its dotted path 'module.ClassName'
+    if isinstance(strategy, str):
+        module, _, qualname = strategy.rpartition('.')
+        return module, qualname
+    return strategy.__module__, strategy.__qualname__
+
+
+def load_strategy(strategy):
+    # The strategy class, importing it when given as a dotted path
+    if not isinstance(strategy, str):
+        return strategy
+    module, qualname = strategy_path(strategy)
+    return getattr(importlib.import_module(module), qualname)
+
+
+def module_source(name):
+    # Source of a module; read from its file when it is not imported yet, so keys need no imports
+    if name in sys.modules:
+        return inspect.getsource(sys.modules[name])
+    with open(importlib.util.find_spec(name).origin, encoding='utf-8') as file:
+        return file.read()
+
+
+def strategy_source(strategy):
+    # Source of the strategy's module and of the modules its rules and indicators come from
+    return '\n'.join(module_source(name) for name in [strategy_path(strategy)[0]] + STRATEGY_MODULES)
+
+
+def config_values():
+    # The config settings that can change a backtest's results
+    return {name: value for name, value in sorted(vars(config).items())
+            if not name.startswith('_') and name not in IGNORED_CONFIG
+            and isinstance(value, (bool, int, float, str, list, tuple, type(None)))}
+
+
+def plain_columns(frame):
+    # The frame with ndarray subclasses (backtesting.py's indicator arrays in _trades) as plain arrays,
+    # so that loading it does not import the library that defined them
+    frame = frame.copy()
+    for column in frame.columns:
+        values = frame[column].to_numpy()
+        if isinstance(values, np.ndarray) and type(values) is not np.ndarray:
+            frame[column] = np.array(values)
+    return frame
+
+
+def run_key(data, strategy, params=None, execution=None, backend='backtesting'):
+    # Content address of one backtest: same data, code, parameters, settings, execution model and backend give the
+    # same key. strategy is a Strategy class or its dotted path; neither it nor backtesting.py is imported.
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(data_fingerprint(data).encode())
+    digest.update(strategy_path(strategy)[1].encode())
+    digest.update(strategy_source(strategy).encode())
+    digest.update('\n'.join(module_source(name) for name in ENGINE_MODULES).encode())
+    digest.update(backend.encode())
+    digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+    digest.update(json.dumps(config_values(), default=str).encode())
+    digest.update(repr(execution).encode())
+    digest.update(importlib.metadata.version('backtesting').encode())
+    return digest.hexdigest()
+
+
+class RunCache:
+    """
+    Content-addressed backtest cache
+    --------------------------------
+    Stores each run's stats, trades and equity curve under run_key(), a hash
+    of the bar data, the strategy source (with strategies/rules.py and
+    indicators.py), the engine source (fast_backtest.py and execution.py), the
+    parameters, the config values that affect results, the execution model, the
+    backend and the backtesting.py version. Changing any of them is a
+    miss, so stale results are never returned. A hit returns the stats Series
+    of the original run, with _strategy replaced by its description.
+
+    Entries are files under `directory`. The least recently used are evicted
+    beyond max_bytes or max_entries, and entries unused for max_age_days are
+    dropped; None disables a limit. Pass refresh=True to run() to force a rerun
+    and overwrite the entry.
+    """
+
+    def __init__(self, directory=DEFAULT_RUN_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_entries=None,
+                 max_age_days=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls):
+        return cls(config.run_cache_dir, config.run_cache_max_bytes, config.run_cache_max_entries,
+                   config.run_cache_max_age_days)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.pkl")
+
+    def get(self, key):
+        # The cached stats, or None
+        path = self._path(key)
+        try:
+            if self.max_age_days is not None and time.time() - os.path.getmtime(path) > self.max_age_days * 86400:
+                os.remove(path)
+        except OSError:
+            return None
+        try:
+            stats = pd.read_pickle(path)
+            os.utime(path)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+        return stats
+
+    def put(self, key, stats):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stats = stats.copy()
+        if '_strategy' in stats:
+            stats['_strategy'] = str(stats['_strategy'])
+        if isinstance(stats.get('_trades'), pd.DataFrame):
+            stats['_trades'] = plain_columns(stats['_trades'])
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        stats.to_pickle(temp_path)
+        os.replace(temp_path, path)
+        self.evict()
+
+    def run(self, data, strategy, params=None, backend='backtesting', refresh=False, execution=None):
+        # (stats, hit): the cached run for these inputs, or a fresh backtest that is then cached.
+        # A strategy given as a dotted path, and backtesting.py, are only imported on a miss.
+        params = params or {}
+        key = run_key(data, strategy, params, execution, backend)
+        if not refresh:
+            stats = self.get(key)
+            if stats is not None:
+                self.hits += 1
+                return stats, True
+        self.misses += 1
+        from fast_backtest import run_backtest
+        stats = run_backtest(data, load_strategy(strategy), backend, execution, **params)
+        self.put(key, stats)
+        return stats, False
+
+    def _files(self):
+        # (path, size, last use) for every entry
+        files = []
+        if not os.path.isdir(self.directory):
+            return files
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.pkl'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue    # removed by another process
+                    files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def evict(self):
+        # Drop expired entries, then the least recently used until within max_bytes and max_entries
+        files = sorted(self._files(), key=lambda item: item[2])
+        now = time.time()
+        total = sum(size for _, size, _ in files)
+        count = len(files)
+        for path, size, used in files:
+            expired = self.max_age_days is not None and now - used > self.max_age_days * 86400
+            over = ((self.max_bytes is not None and total > self.max_bytes)
+                    or (self.max_entries is not None and count > self.max_entries))
+            if not expired and not over:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            count -= 1
+
+    def clear(self):
+        for path, _, _ in self._files():
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+    def stats(self):
+        files = self._files()
+        return {
+            'entries': len(files),
+            'bytes': sum(size for _, size, _ in files),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,94 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from data_store import MarketDataStore, CSVSource, YFinanceSource
+from portfolio import align_frames, compute_signals, load_frames
+
+STRATEGY_SIDES = {
+    'BollingerKeltnerChaikinSMAStrategy': ('BUY', 'SELL'),
+    'LongOnlyBollingerKeltnerChaikinSMAStrategy': ('BUY', None),
+}
+
+
+def screen(data, strategy_name='BollingerKeltnerChaikinSMAStrategy', **params):
+    # {ticker: DataFrame of Date, Action, Price} for every bar where the entry conditions hold,
+    # evaluated for all instruments at once with portfolio.compute_signals. There are no fills,
+    # so the Size, Cash and Portfolio Value columns of position-tracking signal files are left out.
+    long_action, short_action = STRATEGY_SIDES[strategy_name]
+    long_signals, short_signals = compute_signals(data, **params)
+    close = data['Close']
+    signals = {}
+    for column, ticker in enumerate(data.tickers):
+        rows = [(long_action, np.flatnonzero(long_signals[:, column]))]
+        if short_action is not None:
+            rows.append((short_action, np.flatnonzero(short_signals[:, column])))
+        frame = pd.concat([pd.DataFrame({'Date': data.index[bars], 'Action': action, 'Price': close[bars, column]})
+                           for action, bars in rows], ignore_index=True)
+        signals[ticker] = frame.sort_values('Date', kind='stable').reset_index(drop=True)
+    return signals
+
+
+def fires_today(data, signals):
+    # One row per instrument: its last bar and whether a signal fires on it, plus its latest signal
+    last_rows = data.shape[0] - 1 - np.argmax(data.valid[::-1], axis=0)
+    rows = []
+    for column, ticker in enumerate(data.tickers):
+        frame = signals[ticker]
+        last_date = data.index[last_rows[column]]
+        latest = frame.iloc[-1] if len(frame) else None
+        rows.append({
+            'Ticker': ticker,
+            'Last Date': last_date,
+            'Close': data['Close'][last_rows[column], column],
+            'Fires': latest['Action'] if latest is not None and latest['Date'] == last_date else '',
+            'Last Signal': latest['Action'] if latest is not None else '',
+            'Last Signal Date': latest['Date'] if latest is not None else pd.NaT,
+        })
+    return pd.DataFrame(rows)
+
+
+def write_signals(signals, names, directory):
+    # <option>_signals.csv per instrument, named like the data/ files
+    os.makedirs(directory, exist_ok=True)
+    for ticker, frame in signals.items():
+        frame.to_csv(os.path.join(directory, f"{names[ticker].lower().replace(' ', '_')}_signals.csv"), index=False)
+
+
+def main():
+    from batch_runner import load_universe
+    parser = argparse.ArgumentParser(description="Scan the universe for entry signals without running backtests.")
+    parser.add_argument('--tickers', nargs='+', help="Tickers to scan (default: all of stocks/tickers.txt)")
+    parser.add_argument('--strategy', default='BollingerKeltnerChaikinSMAStrategy', choices=list(STRATEGY_SIDES))
+    parser.add_argument('--start', default="2018-01-01")
+    parser.add_argument('--end', default="2024-12-31")
+    parser.add_argument('--source', choices=['yfinance', 'csv'], default='yfinance')
+    parser.add_argument('--output', default=None, help="Directory for the signal files (default: signals/<strategy>/screener)")
+    args = parser.parse_args()
+
+    if args.source == 'csv':
+        source = CSVSource.from_lists('./stocks/options.txt', './stocks/tickers.txt', './data')
+    else:
+        source = YFinanceSource()
+    universe = load_universe()
+    tickers = args.tickers or list(universe)
+    names = {ticker: universe.get(ticker, ticker) for ticker in tickers}
+    output = args.output or os.path.join('signals', args.strategy, 'screener')
+
+    frames = load_frames(tickers, args.start, args.end, MarketDataStore(source=source))
+    started = time.perf_counter()
+    data = align_frames(frames)
+    signals = screen(data, args.strategy)
+    summary = fires_today(data, signals)
+    elapsed = time.perf_counter() - started
+
+    write_signals(signals, names, output)
+    summary.to_csv(os.path.join(output, 'fires_today.csv'), index=False)
+    print(f"Screened {len(tickers)} instruments over {data.shape[0]} bars in {elapsed * 1000:.1f}ms")
+    print(summary.to_string(index=False))
+    print(f"Signal files saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
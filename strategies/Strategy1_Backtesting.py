@@ -1,8 +1,16 @@
 import pandas as pd
 import numpy as np
+from metrics import EquityRecorder, OnlineMetrics
+from strategies import rules
+
+# Field layout of the array-backed position state used by apply_signals_vectorized
+POS_OPEN, POS_TYPE, POS_ENTRY_PRICE, POS_QUANTITY, POS_STOP_LOSS, POS_DATE, POS_INITIAL_INVESTMENT, POS_TARGET1, POS_TARGET2, POS_ENTRY_BAR = range(10)
+POS_FIELDS = 10
+LONG, SHORT = 1.0, -1.0
+NS_PER_DAY = 86_400_000_000_000
 
 class Strategy1Backtesting:
-    def __init__(self, initial_balance, position_size, stop_loss, profit_target1, partial_sell1, profit_target2, partial_sell2, days_threshold, price_threshold):
+    def __init__(self, initial_balance, position_size, stop_loss, profit_target1, partial_sell1, profit_target2, partial_sell2, days_threshold, price_threshold, holding_bars=None, execution=None):
         self.initial_balance = initial_balance
         self.balance = initial_balance
         self.position_size = position_size
@@ -13,16 +21,211 @@ class Strategy1Backtesting:
         self.partial_sell2 = partial_sell2
         self.days_threshold = days_threshold
         self.price_threshold = price_threshold
+        # days_threshold is a number of days or a pd.Timedelta (e.g. for minute bars);
+        # holding_bars, when set, replaces it with a bar count in the array-based engine
+        self.holding_bars = holding_bars
+        # execution.ExecutionModel: when set, fills pay its spread, slippage and commission and stops
+        # trigger on the bar's High/Low; without it everything fills at the close without costs
+        self.execution = execution
+        # Exit rules of each side (strategies/rules.py), shared by both engines
+        self.exits = {side: rules.ValueLadder.from_targets(side, stop_loss, profit_target1, partial_sell1,
+                                                           profit_target2, partial_sell2, price_threshold)
+                      for side in (LONG, SHORT)}
+        self.bars_processed = 0
         self.positions = []
         self.trade_history = []
-        self.equity_curve = []
+        self.equity_curve = EquityRecorder()
+        self.metrics = OnlineMetrics(initial_balance)
+        self.position_state = np.zeros(POS_FIELDS)
+
+    def apply_signals(self, data, long_signals, short_signals, vectorized=False):
+        if self.execution is not None:
+            # Fill costs and intrabar stops are only modelled by the array-based engine
+            return self.apply_signals_vectorized(data.index, data['Close'].to_numpy(), long_signals, short_signals,
+                                                 data['Open'].to_numpy(), data['High'].to_numpy(), data['Low'].to_numpy())
+        if vectorized:
+            return self.apply_signals_vectorized(data.index, data['Close'].to_numpy(), long_signals, short_signals)
 
-    def apply_signals(self, data, long_signals, short_signals):
         data['long_signal'] = long_signals
         data['short_signal'] = short_signals
 
+        start = len(self.equity_curve)
         for index, row in data.iterrows():
             self.apply_trading_rules(row)
+        # The bars go into the metrics in one update_many() call, as in apply_signals_vectorized,
+        # so both engines give bit-identical calculate_metrics() results
+        self.metrics.update_many(self.equity_curve.values[start:])
+
+    def _holding_ns(self):
+        # The time stop in nanoseconds; whole days compare like the .days check of the row-based rules
+        if isinstance(self.days_threshold, pd.Timedelta):
+            return self.days_threshold.value
+        return int(np.ceil(self.days_threshold)) * NS_PER_DAY
+
+    def _hold_expired(self, position, row):
+        if self.holding_bars is not None:
+            return self.bars_processed - position['entry_bar'] >= self.holding_bars
+        elapsed = row.name - position['date']
+        if isinstance(self.days_threshold, pd.Timedelta):
+            return elapsed >= self.days_threshold
+        return elapsed.days >= self.days_threshold
+
+    def apply_signals_vectorized(self, dates, close, long_signals, short_signals, open_prices=None, high=None, low=None):
+        # Same rules as apply_signals, run over plain arrays instead of one pandas Series per bar.
+        # Flat stretches are skipped with a search over the entry bars and the balance is
+        # forward-filled between events, so only bars with an open position are visited.
+        # With an execution model, buy and sell fill prices are computed for all bars up front
+        # and, given open/high/low, stops are checked intrabar from the bar after the entry.
+        dates = pd.DatetimeIndex(dates)
+        close = np.asarray(close, dtype=np.float64)
+        long_signals = np.asarray(long_signals, dtype=bool)
+        short_signals = np.asarray(short_signals, dtype=bool)
+        n = len(close)
+
+        prices = close.tolist()
+        execution = self.execution
+        if execution is None:
+            buy_prices = sell_prices = prices
+            fee_rate = 0.0
+        else:
+            buy_prices = execution.fill_prices(close, 1).tolist()
+            sell_prices = execution.fill_prices(close, -1).tolist()
+            fee_rate = execution.commission
+        intrabar_stops = execution is not None and execution.intrabar_stops and high is not None
+        if intrabar_stops:
+            opens = np.asarray(open_prices, dtype=np.float64).tolist()
+            highs = np.asarray(high, dtype=np.float64).tolist()
+            lows = np.asarray(low, dtype=np.float64).tolist()
+        day_ns = dates.as_unit('ns').asi8.tolist()
+        entry_bars = np.flatnonzero(long_signals | short_signals)
+        balances = np.empty(n)
+        holding_ns = self._holding_ns()
+        holding_bars = self.holding_bars
+        bar_offset = self.bars_processed
+
+        self._load_position_state()
+        state = self.position_state
+        is_open = state[POS_OPEN] == 1.0
+        side, entry_price, quantity, stop_loss, entry_ns, investment, target1, target2, entry_bar = state[1:].tolist()
+        rung = int(target1 + target2)
+        entry_ns = int(entry_ns)
+        entry_bar = int(entry_bar)
+        balance = self.balance
+        trades = self.trade_history
+        first_trade = len(trades)
+
+        i = 0
+        while i < n:
+            if not is_open:
+                k = np.searchsorted(entry_bars, i)
+                if k == len(entry_bars):
+                    balances[i:] = balance
+                    break
+                j = int(entry_bars[k])
+                balances[i:j] = balance
+                i = j
+
+                # Enter a new position; stops are set from the quote, quantity from the fill
+                price = prices[i]
+                side = LONG if long_signals[i] else SHORT
+                fill = buy_prices[i] if side == LONG else sell_prices[i]
+                investment = balance * self.position_size
+                quantity = investment / fill
+                stop_loss = self.exits[side].initial_stop(price)
+                entry_price = fill
+                entry_ns = day_ns[i]
+                entry_bar = bar_offset + i
+                rung = 0
+                is_open = True
+                balance -= investment + investment * fee_rate
+                trades.append({'type': 'long' if side == LONG else 'short', 'price': fill, 'quantity': quantity, 'date': dates[i], 'balance': balance})
+
+            # Manage the open position on this bar
+            price = prices[i]
+            current_value = quantity * price
+            if holding_bars is None:
+                held = day_ns[i] - entry_ns >= holding_ns
+            else:
+                held = bar_offset + i - entry_bar >= holding_bars
+            sell_fraction = None
+            full_exit = False
+            fill = sell_prices[i] if side == LONG else buy_prices[i]
+            stopped = False
+            if intrabar_stops and bar_offset + i > entry_bar:
+                stopped, stop_price = execution.stop_hits(stop_loss, side, opens[i], highs[i], lows[i])
+            if stopped:
+                # The stop traded during the bar: filled there, or at the open when the bar gapped through it
+                full_exit = True
+                fill = execution.fill_prices(stop_price, -side)
+            else:
+                portion, stop_loss, reached = self.exits[side].step(rung, stop_loss, entry_price, price, current_value,
+                                                                     investment, held)
+                if reached > rung:
+                    sell_fraction = portion
+                    rung = reached
+                elif portion is not None:
+                    full_exit = True
+
+            if sell_fraction is not None:
+                sell_quantity = quantity * sell_fraction
+                balance += sell_quantity * fill - sell_quantity * fill * fee_rate
+                quantity -= sell_quantity
+                trades.append({'type': 'partial_exit', 'price': fill, 'quantity': sell_quantity, 'date': dates[i], 'balance': balance})
+                if quantity == 0:
+                    is_open = False
+            elif full_exit:
+                balance += quantity * fill - quantity * fill * fee_rate
+                trades.append({'type': 'full_exit', 'price': fill, 'quantity': quantity, 'date': dates[i], 'balance': balance})
+                is_open = False
+
+            balances[i] = balance
+            i += 1
+
+        self.balance = balance
+        self.bars_processed += n
+        state[:] = (float(is_open), side, entry_price, quantity, stop_loss, entry_ns, investment, float(rung >= 1), float(rung >= 2), entry_bar)
+        self._store_position_state(dates)
+        self.equity_curve.extend(dates, balances)
+        self.metrics.update_many(balances)
+        for trade in trades[first_trade:]:
+            self.metrics.record_trade(trade['type'])
+
+    def _load_position_state(self):
+        # Copy an open position left by apply_signals into the array-backed state
+        if not self.positions:
+            self.position_state[POS_OPEN] = 0.0
+            return
+        position = self.positions[0]
+        self.position_state[:] = (
+            1.0,
+            LONG if position['type'] == 'long' else SHORT,
+            position['entry_price'],
+            position['quantity'],
+            position['stop_loss'],
+            pd.Timestamp(position['date']).value,
+            position['initial_investment'],
+            float(position['target1_reached']),
+            float(position['target2_reached']),
+            position['entry_bar'],
+        )
+
+    def _store_position_state(self, dates):
+        # Mirror the array-backed state back into the dict positions used by apply_signals
+        state = self.position_state
+        self.positions = []
+        if state[POS_OPEN] != 1.0:
+            return
+        self.positions.append({
+            'type': 'long' if state[POS_TYPE] == LONG else 'short',
+            'entry_price': state[POS_ENTRY_PRICE],
+            'quantity': state[POS_QUANTITY],
+            'stop_loss': state[POS_STOP_LOSS],
+            'date': pd.Timestamp(int(state[POS_DATE]), tz=dates.tz),
+            'initial_investment': state[POS_INITIAL_INVESTMENT],
+            'target1_reached': bool(state[POS_TARGET1]),
+            'target2_reached': bool(state[POS_TARGET2]),
+            'entry_bar': int(state[POS_ENTRY_BAR])
+        })
 
     def apply_trading_rules(self, row):
         if row['long_signal'] and not self.positions:
@@ -31,12 +234,13 @@ class Strategy1Backtesting:
             self.enter_short(row)
 
         self.update_positions(row)
-        self.equity_curve.append({'date': row.name, 'balance': self.balance})
+        self.equity_curve.append(row.name, self.balance)
+        self.bars_processed += 1
 
     def enter_long(self, row):
         position_size = self.balance * self.position_size
         quantity = position_size / row['Close']
-        stop_loss_price = row['Close'] * (1 - self.stop_loss)
+        stop_loss_price = self.exits[LONG].initial_stop(row['Close'])
         self.positions.append({
             'type': 'long',
             'entry_price': row['Close'],
@@ -45,15 +249,17 @@ class Strategy1Backtesting:
             'date': row.name,
             'initial_investment': position_size,
             'target1_reached': False,
-            'target2_reached': False
+            'target2_reached': False,
+            'entry_bar': self.bars_processed
         })
         self.balance -= position_size
         self.trade_history.append({'type': 'long', 'price': row['Close'], 'quantity': quantity, 'date': row.name, 'balance': self.balance})
+        self.metrics.record_trade('long')
 
     def enter_short(self, row):
         position_size = self.balance * self.position_size
         quantity = position_size / row['Close']
-        stop_loss_price = row['Close'] * (1 + self.stop_loss)
+        stop_loss_price = self.exits[SHORT].initial_stop(row['Close'])
         self.positions.append({
             'type': 'short',
             'entry_price': row['Close'],
@@ -62,50 +268,30 @@ class Strategy1Backtesting:
             'date': row.name,
             'initial_investment': position_size,
             'target1_reached': False,
-            'target2_reached': False
+            'target2_reached': False,
+            'entry_bar': self.bars_processed
         })
         self.balance -= position_size
         self.trade_history.append({'type': 'short', 'price': row['Close'], 'quantity': quantity, 'date': row.name, 'balance': self.balance})
+        self.metrics.record_trade('short')
 
     def update_positions(self, row):
         for position in self.positions.copy():
-            if position['type'] == 'long':
-                self.check_exit_long(position, row)
-            elif position['type'] == 'short':
-                self.check_exit_short(position, row)
-
-    def check_exit_long(self, position, row):
-        current_value = position['quantity'] * row['Close']
-        if not position['target1_reached'] and current_value >= position['initial_investment'] * (1 + self.profit_target1):
-            self.partial_exit(position, row, self.partial_sell1)
-            position['stop_loss'] = position['entry_price'] * 1.2
-            position['target1_reached'] = True
-        elif position['target1_reached'] and not position['target2_reached'] and current_value >= position['initial_investment'] * (1 + self.profit_target2):
-            self.partial_exit(position, row, self.partial_sell2)
-            position['stop_loss'] = position['entry_price'] * 1.2
-            position['target2_reached'] = True
-        elif current_value >= position['initial_investment'] * 3:
-            self.full_exit(position, row)
-        elif (row.name - position['date']).days >= self.days_threshold and (current_value - position['initial_investment']) / position['initial_investment'] <= self.price_threshold:
-            self.full_exit(position, row)
-        elif row['Close'] < position['stop_loss']:
-            self.full_exit(position, row)
+            self.check_exit(position, row)
 
-    def check_exit_short(self, position, row):
+    def check_exit(self, position, row):
+        ladder = self.exits[LONG if position['type'] == 'long' else SHORT]
+        rung = position['target1_reached'] + position['target2_reached']
         current_value = position['quantity'] * row['Close']
-        if not position['target1_reached'] and current_value <= position['initial_investment'] * (1 - self.profit_target1):
-            self.partial_exit(position, row, self.partial_sell1)
-            position['stop_loss'] = position['entry_price'] * 0.8
-            position['target1_reached'] = True
-        elif position['target1_reached'] and not position['target2_reached'] and current_value <= position['initial_investment'] * (1 - self.profit_target2):
-            self.partial_exit(position, row, self.partial_sell2)
-            position['stop_loss'] = position['entry_price'] * 0.8
-            position['target2_reached'] = True
-        elif current_value <= position['initial_investment'] * 0.5:
-            self.full_exit(position, row)
-        elif (row.name - position['date']).days >= self.days_threshold and (position['initial_investment'] - current_value) / position['initial_investment'] <= self.price_threshold:
-            self.full_exit(position, row)
-        elif row['Close'] > position['stop_loss']:
+        portion, position['stop_loss'], reached = ladder.step(rung, position['stop_loss'], position['entry_price'],
+                                                              row['Close'], current_value,
+                                                              position['initial_investment'],
+                                                              self._hold_expired(position, row))
+        if reached > rung:
+            position['target1_reached'] = reached >= 1
+            position['target2_reached'] = reached >= 2
+            self.partial_exit(position, row, portion)
+        elif portion is not None:
             self.full_exit(position, row)
 
     def partial_exit(self, position, row, sell_fraction):
@@ -113,34 +299,22 @@ class Strategy1Backtesting:
         self.balance += sell_quantity * row['Close']
         position['quantity'] -= sell_quantity
         self.trade_history.append({'type': 'partial_exit', 'price': row['Close'], 'quantity': sell_quantity, 'date': row.name, 'balance': self.balance})
+        self.metrics.record_trade('partial_exit')
         if position['quantity'] == 0:
             self.positions.remove(position)
 
     def full_exit(self, position, row):
         self.balance += position['quantity'] * row['Close']
         self.trade_history.append({'type': 'full_exit', 'price': row['Close'], 'quantity': position['quantity'], 'date': row.name, 'balance': self.balance})
+        self.metrics.record_trade('full_exit')
         self.positions.remove(position)
 
     def get_performance(self):
-        return pd.DataFrame(self.equity_curve).set_index('date')
+        return self.equity_curve.frame()
 
     def get_trade_history(self):
         return pd.DataFrame(self.trade_history)
 
     def calculate_metrics(self):
-        df = pd.DataFrame(self.equity_curve).set_index('date')
-        df['returns'] = df['balance'].pct_change().fillna(0)
-        total_return = (df['balance'].iloc[-1] - self.initial_balance) / self.initial_balance
-        annualized_return = (1 + total_return) ** (365 / len(df)) - 1
-        daily_volatility = df['returns'].std()
-        annualized_volatility = daily_volatility * np.sqrt(252)
-        max_drawdown = (df['balance'] / df['balance'].cummax() - 1).min()
-        sharpe_ratio = (annualized_return - 0.02) / annualized_volatility
-        metrics = {
-            'Total Return': total_return,
-            'Annualized Return': annualized_return,
-            'Annualized Volatility': annualized_volatility,
-            'Max Drawdown': max_drawdown,
-            'Sharpe Ratio': sharpe_ratio
-        }
-        return metrics
+        # Accumulated in self.metrics as the signals are applied, so this is O(1) and needs no equity DataFrame
+        return self.metrics.metrics()
@@ -0,0 +1,228 @@
+import os
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.indicator_cache')
+DEFAULT_MEMORY_BYTES = 256 * 1024 ** 2
+DEFAULT_DISK_BYTES = 2 * 1024 ** 3
+INDICATORS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'indicators.py')
+# Registered histories kept for resolve(); the least recently used is dropped beyond this
+MAX_HISTORIES = 32
+
+
+def fingerprint(*arrays):
+    # Hash the raw bytes of the input arrays so identical data maps to the same key.
+    # A changed data file therefore yields new keys and never hits stale entries.
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.shape, array.dtype.str)).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def source_version(path=INDICATORS_PATH):
+    # Hash of the code that computes the indicators, so entries computed by an older version are never hit
+    with open(path, 'rb') as file:
+        return hashlib.blake2b(file.read(), digest_size=8).hexdigest()
+
+
+class IndicatorCache:
+    """
+    Two-level indicator cache
+    -------------------------
+    Computed indicator arrays are keyed by (data fingerprint, indicator name,
+    parameters, version), where version hashes strategies/indicators.py, so a
+    change to the indicator code never returns values it computed. Lookups go to an in-memory LRU first, then to .npy files on disk,
+    and only compute on a miss in both. Both layers are bounded by size: the
+    memory layer drops its least recently used arrays and the disk layer removes
+    its oldest files once the byte limits are exceeded.
+
+    Cached arrays are returned read-only because they are shared between runs.
+    Set directory to None for a memory-only cache.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_memory_bytes=DEFAULT_MEMORY_BYTES, max_disk_bytes=DEFAULT_DISK_BYTES,
+                 version=None):
+        self.directory = directory
+        self.version = version if version is not None else source_version()
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        data_key, name, params, version = key
+        filename = '_'.join([name] + [str(param) for param in params] + [version]) + '.npy'
+        return os.path.join(self.directory, data_key, filename)
+
+    def get(self, data_key, name, params, compute):
+        # Return the cached indicator, computing and storing it on the first request
+        key = (data_key, name, tuple(params), self.version)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        values = self._load(key)
+        if values is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            values = np.asarray(compute(), dtype=np.float64)
+            self._save(key, values)
+        values.setflags(write=False)
+        self._remember(key, values)
+        return values
+
+    def _remember(self, key, values):
+        self._entries[key] = values
+        self._memory_bytes += values.nbytes
+        while self._memory_bytes > self.max_memory_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            values = np.load(path)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        return values
+
+    def _save(self, key, values):
+        if self.directory is None:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file:
+            np.save(file, values)
+        os.replace(temp_path, path)
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+        else:
+            self._disk_bytes += os.path.getsize(path)
+        if self._disk_bytes > self.max_disk_bytes:
+            self._evict_disk()
+
+    def _disk_files(self):
+        # (path, size, last use) for every cached file
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.npy'):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _evict_disk(self):
+        # Delete the least recently used files until the disk layer is back under 80% of its limit
+        files = sorted(self._disk_files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total <= self.max_disk_bytes * 0.8:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._disk_bytes = total
+
+    def invalidate(self, data_key):
+        # Drop every indicator computed from one dataset, in memory and on disk
+        for key in [key for key in self._entries if key[0] == data_key]:
+            self._memory_bytes -= self._entries.pop(key).nbytes
+        if self.directory is not None:
+            directory = os.path.join(self.directory, data_key)
+            if os.path.isdir(directory):
+                for name in os.listdir(directory):
+                    os.remove(os.path.join(directory, name))
+                os.rmdir(directory)
+            self._disk_bytes = None
+
+    def clear(self, disk=False):
+        self._entries.clear()
+        self._memory_bytes = 0
+        if disk and self.directory is not None and os.path.isdir(self.directory):
+            for data_key in os.listdir(self.directory):
+                self.invalidate(data_key)
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'memory_bytes': self._memory_bytes,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+        }
+
+
+# Process-wide cache used by the strategies
+default_cache = IndicatorCache()
+
+# Full price histories that backtests on sub-windows may compute their indicators on, least
+# recently used first: {fingerprint: (dates as int64 ns, (high, low, close, volume))}
+_histories = OrderedDict()
+
+
+def register_history(dates, high, low, close, volume):
+    # Make windows of this history share one set of indicators computed on the whole of it
+    arrays = tuple(np.asarray(array, dtype=np.float64) for array in (high, low, close, volume))
+    dates = np.asarray(pd.DatetimeIndex(dates).as_unit('ns').asi8)
+    data_key = fingerprint(*arrays)
+    _histories[data_key] = (dates, arrays)
+    _histories.move_to_end(data_key)
+    while len(_histories) > MAX_HISTORIES:
+        _histories.popitem(last=False)
+    return data_key
+
+
+def clear_histories():
+    _histories.clear()
+
+
+def resolve(dates, high, low, close, volume):
+    # (data key, (high, low, close, volume), window) for a backtest's data. When the data is a
+    # contiguous window of a registered history, indicators are computed on that history and
+    # `window` slices them back to the backtest's bars; the warm-up then comes from the bars
+    # before the window. Otherwise the data is used as it is. Histories are ruled out on the window's
+    # first and last bars before any whole-array comparison, so only a matching one costs O(bars).
+    arrays = (high, low, close, volume)
+    if _histories and len(close):
+        dates = np.asarray(pd.DatetimeIndex(dates).as_unit('ns').asi8)
+        for data_key, (history_dates, history) in list(_histories.items()):
+            start = np.searchsorted(history_dates, dates[0])
+            stop = start + len(dates)
+            if (stop <= len(history_dates) and history_dates[start] == dates[0]
+                    and history_dates[stop - 1] == dates[-1]
+                    and all(_same_bar(part, array, start, stop) for part, array in zip(history, arrays))
+                    and all(np.array_equal(part[start:stop], array, equal_nan=True) for part, array in zip(history, arrays))):
+                _histories.move_to_end(data_key)
+                return data_key, history, slice(start, stop)
+    return fingerprint(*arrays), arrays, slice(None)
+
+
+def _same_bar(part, array, start, stop):
+    # Whether a history's values on the window's first and last bars are the window's
+    return all(part[i] == array[j] or (part[i] != part[i] and array[j] != array[j])
+               for i, j in ((start, 0), (stop - 1, -1)))
+
+
+def get(data_key, name, params, compute):
+    return default_cache.get(data_key, name, params, compute)
+
+
+def clear(disk=False):
+    default_cache.clear(disk)
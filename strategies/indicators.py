@@ -0,0 +1,131 @@
+import sys
+import numpy as np
+import pandas as pd
+
+# NumPy implementations of the indicators used by the strategies.
+#
+# Every function takes float arrays with time on axis 0: either one series of
+# shape (n,) or many tickers at once as shape (n, k), one column per ticker.
+# Results have the same shape and match pandas_ta (bbands, kc, adosc, sma with
+# their default options), including its NaN warm-up periods.
+
+# Rolling windows evaluated at once by stdev(); bounds its temporary memory
+WINDOW_BLOCK = 1 << 16
+
+
+def _as_2d(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values.reshape(len(values), -1), values.ndim == 1
+
+
+def _restore(values, squeeze):
+    return values[:, 0] if squeeze else values
+
+
+def _first_valid(values):
+    # Row of the first finite value in each column (len(values) if there is none)
+    finite = np.isfinite(values)
+    return np.where(finite.any(axis=0), finite.argmax(axis=0), len(values))
+
+
+def _rolling(values, length):
+    # Per-window rolling view over time (axis 0); a window with a missing value is NaN
+    return pd.DataFrame(values).rolling(length, min_periods=length)
+
+
+def _non_zero_range(high, low):
+    # high - low, with zero ranges replaced by machine epsilon bar by bar. pandas_ta adds epsilon to
+    # the whole column when any bar has a zero range, which moves the other ranges by at most epsilon
+    # but makes earlier values depend on later bars.
+    diff = high - low
+    return np.where(diff == 0, sys.float_info.epsilon, diff)
+
+
+def sma(close, length=10):
+    values, squeeze = _as_2d(close)
+    return _restore(_rolling(values, length).mean().to_numpy(), squeeze)
+
+
+def stdev(close, length=20, ddof=0):
+    # Rolling standard deviation, two-pass within each window: deviations are taken from the window's
+    # own mean, so the result does not lose precision on long or trending series. Windows are
+    # processed in blocks to bound the temporary memory.
+    values, squeeze = _as_2d(close)
+    result = np.full(values.shape, np.nan)
+    windows = np.lib.stride_tricks.sliding_window_view(values, length, axis=0) if len(values) >= length else values[:0]
+    for lo in range(0, len(windows), WINDOW_BLOCK):
+        block = windows[lo:lo + WINDOW_BLOCK]
+        deviations = block - block.mean(axis=-1, keepdims=True)
+        squares = np.einsum('ijk,ijk->ij', deviations, deviations)
+        result[lo + length - 1:lo + length - 1 + len(block)] = np.sqrt(squares / (length - ddof))
+    return _restore(result, squeeze)
+
+
+def ema(close, length=10, start=None):
+    # EMA seeded with the SMA of the first `length` values, like pandas_ta's default.
+    # start gives the row where each column's series begins (its first finite value by default).
+    values, squeeze = _as_2d(close)
+    n, k = values.shape
+    start = _first_valid(values) if start is None else np.broadcast_to(np.asarray(start), (k,))
+    seeded = values.copy()
+    rows = np.arange(n)[:, None]
+    seed_row = start + length - 1
+    window = (rows >= start) & (rows <= seed_row) & np.isfinite(values)
+    counts = window.sum(axis=0)
+    seeds = np.where(window, values, 0.0).sum(axis=0) / np.maximum(counts, 1)
+    seeded[rows < seed_row] = np.nan
+    valid = (seed_row < n) & (counts > 0)
+    seeded[seed_row[valid], np.flatnonzero(valid)] = seeds[valid]
+    result = pd.DataFrame(seeded).ewm(span=length, adjust=False).mean().to_numpy()
+    return _restore(result, squeeze)
+
+
+def bbands(close, length=20, std=2.0):
+    # (lower, mid, upper) Bollinger Bands with a population standard deviation
+    mid = sma(close, length)
+    deviations = std * stdev(close, length, ddof=0)
+    return mid - deviations, mid, mid + deviations
+
+
+def true_range(high, low, close):
+    # Largest of high - low and the gaps to the previous close; undefined on each series' first bar
+    high, squeeze = _as_2d(high)
+    low, _ = _as_2d(low)
+    close, _ = _as_2d(close)
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    ranges = np.fmax(np.abs(_non_zero_range(high, low)), np.abs(high - prev_close))
+    ranges = np.fmax(ranges, np.abs(prev_close - low))
+    start = _first_valid(close)
+    inside = start < len(close)
+    ranges[start[inside], np.flatnonzero(inside)] = np.nan
+    return _restore(ranges, squeeze)
+
+
+def kc(high, low, close, length=20, scalar=2.0):
+    # (lower, basis, upper) Keltner Channels: EMA of close +/- scalar * EMA of the true range
+    close_2d, squeeze = _as_2d(close)
+    start = _first_valid(close_2d)
+    basis = ema(close_2d, length, start)
+    band = ema(true_range(_as_2d(high)[0], _as_2d(low)[0], close_2d), length, start)
+    lower, upper = basis - scalar * band, basis + scalar * band
+    return _restore(lower, squeeze), _restore(basis, squeeze), _restore(upper, squeeze)
+
+
+def ad(high, low, close, volume):
+    # Accumulation/Distribution line
+    high, squeeze = _as_2d(high)
+    low, _ = _as_2d(low)
+    close, _ = _as_2d(close)
+    volume, _ = _as_2d(volume)
+    flow = (2 * close - (high + low)) * (volume / _non_zero_range(high, low))
+    result = np.cumsum(np.where(np.isnan(flow), 0.0, flow), axis=0)
+    result[np.isnan(flow)] = np.nan
+    return _restore(result, squeeze)
+
+
+def adosc(high, low, close, volume, fast=3, slow=10):
+    # Chaikin Oscillator: fast EMA minus slow EMA of the A/D line
+    line = ad(high, low, close, volume)
+    return ema(line, fast) - ema(line, slow)
@@ -0,0 +1,318 @@
+import operator
+import numpy as np
+import config
+
+NS_PER_DAY = 86_400_000_000_000
+LONG, SHORT = 1, -1
+
+# Entry conditions as (left, comparison, right) triples that must all hold on the signal bar.
+# Operands name a series from ENTRY_SERIES, 'prev_<name>' is that series one bar earlier,
+# and numbers are constants.
+LONG_ENTRY = [
+    ('bb_upper', '<', 'kc_upper'),
+    ('bb_lower', '>', 'kc_lower'),
+    ('prev_chaikin', '<', 0),
+    ('chaikin', '>', 0),
+    ('sma', '>', 'prev_sma'),
+]
+SHORT_ENTRY = [
+    ('bb_upper', '<', 'kc_upper'),
+    ('bb_lower', '>', 'kc_lower'),
+    ('prev_chaikin', '>', 0),
+    ('chaikin', '<', 0),
+    ('sma', '<', 'prev_sma'),
+]
+# Series name -> strategy attribute holding the indicator
+ENTRY_SERIES = {
+    'bb_upper': 'bb_upper',
+    'bb_lower': 'bb_lower',
+    'kc_upper': 'kc_upper',
+    'kc_lower': 'kc_lower',
+    'chaikin': 'chaikin',
+    'sma': 'sma_100',
+}
+COMPARISONS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+
+def _operand(token, current, previous):
+    if not isinstance(token, str):
+        return token
+    if token.startswith('prev_'):
+        return previous[token[len('prev_'):]]
+    return current[token]
+
+
+def check(conditions, current, previous):
+    # Whether every condition holds. `current` and `previous` map series names to their values on the
+    # signal bar and the bar before: scalars for one bar, or aligned arrays to evaluate all bars at once.
+    result = True
+    for left, comparison, right in conditions:
+        result = result & COMPARISONS[comparison](_operand(left, current, previous),
+                                                  _operand(right, current, previous))
+    return result
+
+
+def bar_values(strategy, offset=-1):
+    # Values of the entry series on one bar of a running backtesting.py strategy
+    return {name: getattr(strategy, attribute)[offset] for name, attribute in ENTRY_SERIES.items()}
+
+
+def series_values(strategy):
+    # Whole entry series of an initialised strategy, and the same series shifted one bar later
+    current = {name: np.asarray(getattr(strategy, attribute), dtype=np.float64)
+               for name, attribute in ENTRY_SERIES.items()}
+    return current, shifted(current)
+
+
+def shifted(current, last=None):
+    # Entry series one bar later along axis 0, for evaluating every bar at once. The first bar's previous
+    # values come from `last` (the series' values before this block, e.g. the previous chunk's) or are NaN.
+    previous = {}
+    for name, values in current.items():
+        values = np.asarray(values, dtype=np.float64)
+        first = np.full((1,) + values.shape[1:], np.nan if last is None else last[name])
+        previous[name] = np.concatenate([first, values[:-1]])
+    return previous
+
+
+class ExitState:
+    # Bookkeeping of the open position that the exit rules need; side 0 means nothing is tracked
+    __slots__ = ('side', 'entry_price', 'entry_time', 'stop', 'rung', 'base')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.side = 0
+        self.entry_price = None
+        self.entry_time = None
+        self.stop = None
+        self.rung = 0
+        self.base = None
+
+
+class ExitStates:
+    # ExitState for many positions at once: one array element per position (e.g. per instrument)
+    def __init__(self, count):
+        self.side = np.zeros(count, dtype=np.int64)
+        self.entry_price = np.zeros(count)
+        self.entry_time = np.zeros(count, dtype=np.int64)
+        self.stop = np.zeros(count)
+        self.rung = np.zeros(count, dtype=np.int64)
+        self.base = np.zeros(count)
+
+    def reset(self, mask):
+        self.side[mask] = 0
+        self.rung[mask] = 0
+
+
+class ExitLadder:
+    """
+    Exit rules for one side of a position
+    -------------------------------------
+    targets are price multiples of the entry price (below 1 for shorts).
+    When the price reaches the next target, portions[rung] of the position is
+    closed; a portion of 1 closes the rest. After a partial close the stop
+    moves to stop_step times the entry price for the first rung, and to
+    stop_step times the previous rung's fill price after that.
+
+    time_stop_days calendar days after the entry the position is closed unless
+    it has gained more than time_stop_gain; from then on the time stop takes the
+    place of the stop loss. The rules are checked in this order and at most one
+    fires per bar.
+    """
+
+    def __init__(self, side, stop_loss, targets, portions, stop_step, time_stop_days, time_stop_gain):
+        self.side = side
+        self.stop_loss = stop_loss
+        self.targets = list(targets)
+        self.portions = list(portions)
+        self.stop_step = stop_step
+        self.time_stop_days = time_stop_days
+        self.time_stop_gain = time_stop_gain
+
+    @classmethod
+    def from_config(cls, side, stop_loss=config.stop_loss):
+        if side == LONG:
+            return cls(LONG, stop_loss, config.ladder_targets, config.ladder_portions, config.ladder_stop_step,
+                       config.time_stop_days, config.time_stop_gain)
+        return cls(SHORT, stop_loss, config.short_ladder_targets, config.ladder_portions,
+                   config.short_ladder_stop_step, config.time_stop_days, config.time_stop_gain)
+
+    def open(self, state, price, time_ns):
+        # Start tracking a position entered at `price` on the bar at time_ns (nanoseconds)
+        state.reset()
+        state.side = self.side
+        state.entry_price = price
+        state.entry_time = time_ns
+        state.stop = price * (1 - self.stop_loss if self.side == LONG else 1 + self.stop_loss)
+        state.base = price
+
+    def step(self, state, price, time_ns):
+        # Apply the rules to one bar's close; returns the portion of the position to close, or None
+        long = self.side == LONG
+        rung = state.rung
+        if rung < len(self.targets) and (price >= self.targets[rung] * state.entry_price if long
+                                         else price <= self.targets[rung] * state.entry_price):
+            portion = self.portions[rung]
+            if portion >= 1:
+                state.reset()
+                return 1.0
+            state.stop = state.base * self.stop_step
+            state.base = price
+            state.rung = rung + 1
+            return portion
+
+        if (time_ns - state.entry_time) // NS_PER_DAY >= self.time_stop_days:
+            gain = price / state.entry_price if long else state.entry_price / price
+            if gain <= 1 + self.time_stop_gain:
+                state.reset()
+                return 1.0
+            return None
+
+        if price < state.stop if long else price > state.stop:
+            state.reset()
+            return 1.0
+        return None
+
+    def open_many(self, states, mask, price, time_ns):
+        # open() for the positions selected by the boolean mask, at their prices
+        states.side[mask] = self.side
+        states.entry_price[mask] = price[mask]
+        states.entry_time[mask] = time_ns
+        states.stop[mask] = price[mask] * (1 - self.stop_loss if self.side == LONG else 1 + self.stop_loss)
+        states.rung[mask] = 0
+        states.base[mask] = price[mask]
+
+    def step_many(self, states, mask, price, time_ns):
+        # step() for the positions selected by mask, all at once; returns the portion to close per
+        # position (NaN where no rule fires)
+        long = self.side == LONG
+        portions = np.full(len(states.side), np.nan)
+        rung = states.rung
+        entry_price = states.entry_price
+        targets = np.append(np.asarray(self.targets, dtype=np.float64), np.nan)[np.minimum(rung, len(self.targets))]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            hit = mask & (price >= targets * entry_price if long else price <= targets * entry_price)
+            portion = np.append(np.asarray(self.portions, dtype=np.float64), np.nan)[np.minimum(rung, len(self.targets))]
+            partial = hit & (portion < 1)
+            full = hit & (portion >= 1)
+            rest = mask & ~hit
+            elapsed = rest & ((time_ns - states.entry_time) // NS_PER_DAY >= self.time_stop_days)
+            gain = price / entry_price if long else entry_price / price
+            full |= elapsed & (gain <= 1 + self.time_stop_gain)
+            full |= rest & ~elapsed & (price < states.stop if long else price > states.stop)
+
+        portions[partial] = portion[partial]
+        states.stop[partial] = states.base[partial] * self.stop_step
+        states.base[partial] = price[partial]
+        states.rung[partial] += 1
+        portions[full] = 1.0
+        states.reset(full)
+        return portions
+
+
+class ValueLadder:
+    """
+    Exit rules of Strategy1Backtesting for one side of a position
+    -------------------------------------------------------------
+    These rules look at the position's value (quantity times the close)
+    against the amount invested rather than at price multiples. Reaching
+    targets[rung] times the investment closes portions[rung] of the position
+    and moves the stop to stop_step times the entry price; full_target times
+    the investment closes the rest. Once the position has been held long
+    enough it is closed unless it has gained more than time_stop_gain of the
+    investment, and the stop loss keeps applying. At most one rule fires per
+    bar, in that order.
+    """
+
+    def __init__(self, side, stop_loss, targets, portions, stop_step, full_target, time_stop_gain):
+        self.side = side
+        self.stop_loss = stop_loss
+        self.targets = list(targets)
+        self.portions = list(portions)
+        self.stop_step = stop_step
+        self.full_target = full_target
+        self.time_stop_gain = time_stop_gain
+
+    @classmethod
+    def from_targets(cls, side, stop_loss, profit_target1, partial_sell1, profit_target2, partial_sell2, price_threshold):
+        # The ladder of Strategy1Backtesting's constructor parameters
+        if side == LONG:
+            return cls(LONG, stop_loss, [1 + profit_target1, 1 + profit_target2], [partial_sell1, partial_sell2],
+                       1.2, 3, price_threshold)
+        return cls(SHORT, stop_loss, [1 - profit_target1, 1 - profit_target2], [partial_sell1, partial_sell2],
+                   0.8, 0.5, price_threshold)
+
+    def initial_stop(self, price):
+        return price * (1 - self.stop_loss) if self.side == LONG else price * (1 + self.stop_loss)
+
+    def step(self, rung, stop, entry_price, price, value, investment, held):
+        # (portion of the position to close or None, stop, rung) after one bar's close
+        long = self.side == LONG
+        if rung < len(self.targets) and (value >= investment * self.targets[rung] if long
+                                         else value <= investment * self.targets[rung]):
+            return self.portions[rung], entry_price * self.stop_step, rung + 1
+        if value >= investment * self.full_target if long else value <= investment * self.full_target:
+            return 1.0, stop, rung
+        if held and ((value - investment) if long else (investment - value)) / investment <= self.time_stop_gain:
+            return 1.0, stop, rung
+        if price < stop if long else price > stop:
+            return 1.0, stop, rung
+        return None, stop, rung
+
+
+class RuleSet:
+    """
+    Declarative rules of the Bollinger-Keltner Chaikin SMA strategies
+    -----------------------------------------------------------------
+    Entry conditions (LONG_ENTRY / SHORT_ENTRY) and one ExitLadder per side,
+    read from config.py. The same rules drive both backends: the
+    backtesting.py strategies call entry() and the ladders' step() from
+    next(), and fast_backtest.py evaluates entry_signals() over whole arrays
+    and steps the ladders in a plain loop, so both produce the same trades.
+    """
+
+    def __init__(self, long_entry=LONG_ENTRY, short_entry=SHORT_ENTRY, stop_loss=config.stop_loss, long_only=False):
+        self.long_entry = long_entry
+        self.short_entry = short_entry
+        self.long_only = long_only
+        self.exits = {LONG: ExitLadder.from_config(LONG, stop_loss), SHORT: ExitLadder.from_config(SHORT, stop_loss)}
+
+    def entry(self, current, previous):
+        # LONG, SHORT or 0 for one bar
+        if check(self.long_entry, current, previous):
+            return LONG
+        if not self.long_only and check(self.short_entry, current, previous):
+            return SHORT
+        return 0
+
+    def entry_signals(self, current, previous):
+        # (long, short) boolean arrays over every bar
+        long_signals = np.asarray(check(self.long_entry, current, previous), dtype=bool)
+        if self.long_only:
+            short_signals = np.zeros_like(long_signals)
+        else:
+            short_signals = np.asarray(check(self.short_entry, current, previous), dtype=bool) & ~long_signals
+        return long_signals, short_signals
+
+    def open(self, state, side, price, time_ns):
+        self.exits[side].open(state, price, time_ns)
+
+    def step(self, state, price, time_ns):
+        return self.exits[state.side].step(state, price, time_ns)
+
+    def open_many(self, states, sides, price, time_ns):
+        # Open positions on the instruments where sides is LONG or SHORT
+        for side, ladder in self.exits.items():
+            ladder.open_many(states, sides == side, price, time_ns)
+
+    def step_many(self, states, mask, price, time_ns):
+        # Exit portions for every tracked position selected by mask (NaN where none)
+        portions = np.full(len(states.side), np.nan)
+        for side, ladder in self.exits.items():
+            selected = mask & (states.side == side)
+            if selected.any():
+                fired = ladder.step_many(states, selected, price, time_ns)
+                portions[selected] = fired[selected]
+        return portions
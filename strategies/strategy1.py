@@ -1,8 +1,8 @@
 import pandas as pd
 import numpy as np
-import pandas_ta as ta
 from backtesting import Strategy
 import config
+from strategies import indicator_cache, indicators, rules
 
 class BollingerKeltnerChaikinSMAStrategy(Strategy):
     """
@@ -20,153 +20,89 @@ class BollingerKeltnerChaikinSMAStrategy(Strategy):
     zero, and the 100-period SMA is falling.
     """
 
+    # Tunable parameters; Backtest.run(**params) overrides them per run
+    bb_length = 20
+    bb_std = 2.0
+    kc_length = 20
+    kc_scalar = 2.0
+    adosc_fast = 3
+    adosc_slow = 10
+    sma_length = 100
+    stop_loss_pct = config.stop_loss
+    # Place the stop as a stop order that triggers intrabar on the High/Low (execution.py),
+    # instead of checking it against the close
+    intrabar_stops = False
+    # Trade the long entries only (LongOnlyBollingerKeltnerChaikinSMAStrategy)
+    long_only = False
+
     def init(self):
-        # Debugging: Print data before applying indicators
-        print("Initializing strategy...")
-        print(self.data.df.head())
+        # Indicators come from the shared cache, keyed by the price data and parameters,
+        # and are computed straight from the backtest's float arrays. When the data is a window of a
+        # registered history (walk-forward runs), they are computed on that history and sliced.
+        data_key, (high, low, close, volume), window = indicator_cache.resolve(
+            self.data.index, self.data.High, self.data.Low, self.data.Close, self.data.Volume)
 
         # Apply Bollinger Bands
-        close_prices = pd.Series(self.data.Close)
-        print("Close prices:")
-        print(close_prices.head())
+        def bollinger_bands():
+            lower, _, upper = indicators.bbands(close, length=self.bb_length, std=self.bb_std)
+            return np.vstack([upper, lower])
 
-        bb = ta.bbands(close_prices, length=20)
-        if bb is not None:
-            print("Bollinger Bands calculated:")
-            print(bb.head(25))  # Print first 25 values to see the NaNs and valid data
-            self.bb_upper = self.I(lambda x: bb['BBU_20_2.0'].values, self.data.Close)
-            self.bb_lower = self.I(lambda x: bb['BBL_20_2.0'].values, self.data.Close)
-        else:
-            raise ValueError("Bollinger Bands calculation returned None")
+        bb = indicator_cache.get(data_key, 'bbands', (self.bb_length, self.bb_std), bollinger_bands)
+        self.bb_upper = self.I(lambda: bb[0, window], name='BBU')
+        self.bb_lower = self.I(lambda: bb[1, window], name='BBL')
 
         # Apply Keltner Channels
-        high_prices = pd.Series(self.data.High)
-        low_prices = pd.Series(self.data.Low)
-        kc = ta.kc(high_prices, low_prices, close_prices, length=20, scalar=2)
-        if kc is not None:
-            print("Keltner Channels calculated:")
-            print(kc.head(25))  # Print first 25 values to see the NaNs and valid data
-            self.kc_upper = self.I(lambda x: kc['KCUe_20_2.0'].values, self.data.Close)
-            self.kc_lower = self.I(lambda x: kc['KCLe_20_2.0'].values, self.data.Close)
-        else:
-            raise ValueError("Keltner Channels calculation returned None")
+        def keltner_channels():
+            lower, _, upper = indicators.kc(high, low, close, length=self.kc_length, scalar=self.kc_scalar)
+            return np.vstack([upper, lower])
 
-        # Apply Chaikin Oscillator
-        volume = pd.Series(self.data.Volume)
-        self.chaikin = self.I(ta.adosc, high_prices, low_prices, close_prices, volume, fast=3, slow=10)
+        kc = indicator_cache.get(data_key, 'kc', (self.kc_length, self.kc_scalar), keltner_channels)
+        self.kc_upper = self.I(lambda: kc[0, window], name='KCU')
+        self.kc_lower = self.I(lambda: kc[1, window], name='KCL')
 
-        # Apply 100-period SMA
-        self.sma_100 = self.I(ta.sma, close_prices, length=100)
+        # Apply Chaikin Oscillator
+        chaikin = indicator_cache.get(data_key, 'adosc', (self.adosc_fast, self.adosc_slow),
+                                      lambda: indicators.adosc(high, low, close, volume, fast=self.adosc_fast, slow=self.adosc_slow))
+        self.chaikin = self.I(lambda: chaikin[window], name='ADOSC')
+
+        # Apply the trend SMA (100 periods by default)
+        sma = indicator_cache.get(data_key, 'sma', (self.sma_length,),
+                                  lambda: indicators.sma(close, length=self.sma_length))
+        self.sma_100 = self.I(lambda: sma[window], name=f'SMA{self.sma_length}')
         
-        # Initialize stop-loss and tracking variables
-        self.stop_loss = None
-        self.entry_price = None
-        self.partial_sell_1 = None
-        self.partial_sell_2 = None
-        self.entry_time = None
+        # Entry and exit rules shared with the fast backend (strategies/rules.py)
+        self.rules = rules.RuleSet(stop_loss=self.stop_loss_pct, long_only=self.long_only)
+        self.exit_state = rules.ExitState()
 
     def next(self):
-        # Calculate stop-loss price if not already set
+        # Exit management for an open position, then the entry signals
         if self.position:
-            if self.stop_loss is None:
-                self.stop_loss = self.data.Close[-1] * (1 - config.stop_loss if self.position.is_long else 1 + config.stop_loss)
-                self.entry_price = self.data.Close[-1]
-                self.entry_time = self.data.index[-1]
-
-            # Partial Sell Conditions
-            current_price = self.data.Close[-1]
-            if self.position.is_long:
-                # If 2x position size is reached
-                if self.partial_sell_1 is None and current_price >= 2 * self.entry_price:
-                    self.position.close(portion=config.partial_sell1)
-                    self.stop_loss = self.entry_price * 1.2
-                    self.partial_sell_1 = current_price
-
-                # If 2.5x position size is reached
-                elif self.partial_sell_1 is not None and self.partial_sell_2 is None and current_price >= 2.5 * self.entry_price:
-                    self.position.close(portion=config.partial_sell2)
-                    self.stop_loss = self.partial_sell_1 * 1.2
-                    self.partial_sell_2 = current_price
-
-                # If 3x position size is reached
-                elif self.partial_sell_2 is not None and current_price >= 3 * self.entry_price:
-                    self.position.close()
-
-                # Exit if price increase is not > 5% after 10 days
-                elif self.entry_time is not None and (self.data.index[-1] - self.entry_time).days >= 10:
-                    if (current_price / self.entry_price) <= 1.05:
-                        self.position.close()
-                        self.stop_loss = None
-                        self.entry_price = None
-                        self.partial_sell_1 = None
-                        self.partial_sell_2 = None
-                        self.entry_time = None
-
-                # Stop-loss
-                elif current_price < self.stop_loss:
-                    self.position.close()
-                    self.stop_loss = None
-                    self.entry_price = None
-                    self.partial_sell_1 = None
-                    self.partial_sell_2 = None
-                    self.entry_time = None
-
-            elif self.position.is_short:
-                # If 2x position size is reached
-                if self.partial_sell_1 is None and current_price <= 0.5 * self.entry_price:
-                    self.position.close(portion=config.partial_sell1)
-                    self.stop_loss = self.entry_price * 0.8
-                    self.partial_sell_1 = current_price
-
-                # If 2.5x position size is reached
-                elif self.partial_sell_1 is not None and self.partial_sell_2 is None and current_price <= 0.4 * self.entry_price:
-                    self.position.close(portion=config.partial_sell2)
-                    self.stop_loss = self.partial_sell_1 * 0.8
-                    self.partial_sell_2 = current_price
-
-                # If 3x position size is reached
-                elif self.partial_sell_2 is not None and current_price <= 0.333 * self.entry_price:
-                    self.position.close()
-
-                # Exit if price decrease is not > 5% after 10 days
-                elif self.entry_time is not None and (self.data.index[-1] - self.entry_time).days >= 10:
-                    if (self.entry_price / current_price) <= 1.05:
-                        self.position.close()
-                        self.stop_loss = None
-                        self.entry_price = None
-                        self.partial_sell_1 = None
-                        self.partial_sell_2 = None
-                        self.entry_time = None
-
-                # Stop-loss
-                elif current_price > self.stop_loss:
-                    self.position.close()
-                    self.stop_loss = None
-                    self.entry_price = None
-                    self.partial_sell_1 = None
-                    self.partial_sell_2 = None
-                    self.entry_time = None
-
-        # Check if the 100 SMA is rising or falling
-        sma_rising = self.sma_100[-1] > self.sma_100[-2]
-        sma_falling = self.sma_100[-1] < self.sma_100[-2]
-
-        # Buy signal
-        if (self.bb_upper[-1] < self.kc_upper[-1] and
-            self.bb_lower[-1] > self.kc_lower[-1] and
-            self.chaikin[-2] < 0 and self.chaikin[-1] > 0 and  # Chaikin Oscillator crosses above zero
-            sma_rising):
-            self.buy()
-            self.stop_loss = self.data.Close[-1] * (1 - config.stop_loss)  # Set stop-loss for long position
-            self.entry_price = self.data.Close[-1]
-            self.entry_time = self.data.index[-1]
-
-        # Sell signal
-        if (self.bb_upper[-1] < self.kc_upper[-1] and
-            self.bb_lower[-1] > self.kc_lower[-1] and
-            self.chaikin[-2] > 0 and self.chaikin[-1] < 0 and  # Chaikin Oscillator crosses below zero
-            sma_falling):
-            self.sell()
-            self.stop_loss = self.data.Close[-1] * (1 + config.stop_loss)  # Set stop-loss for short position
-            self.entry_price = self.data.Close[-1]
-            self.entry_time = self.data.index[-1]
+            self.manage_position()
+        self.check_entries()
+
+    def manage_position(self):
+        # Track a position the entry rules did not open, then step its exit ladder on this close
+        # and keep the trade's stop order at the ladder's stop
+        price = self.data.Close[-1]
+        time_ns = self.data.index[-1].value
+        if not self.exit_state.side:
+            self.rules.open(self.exit_state, rules.LONG if self.position.is_long else rules.SHORT, price, time_ns)
+        portion = self.rules.step(self.exit_state, price, time_ns)
+        if portion is not None:
+            self.position.close(portion=portion)
+        if self.intrabar_stops and self.exit_state.side:
+            for trade in self.trades:
+                if trade.sl != self.exit_state.stop:
+                    trade.sl = self.exit_state.stop
+
+    def check_entries(self):
+        # Entry conditions on this bar against the previous one
+        side = self.rules.entry(rules.bar_values(self, -1), rules.bar_values(self, -2))
+        if not side:
+            return
+        self.rules.open(self.exit_state, side, self.data.Close[-1], self.data.index[-1].value)
+        stop = self.exit_state.stop if self.intrabar_stops else None
+        if side == rules.LONG:
+            self.buy(sl=stop)
+        else:
+            self.sell(sl=stop)
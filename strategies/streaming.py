@@ -0,0 +1,215 @@
+import sys
+import math
+import pandas as pd
+from strategies.strategy_base import Strategy
+from strategies import rules
+
+# Incremental versions of the indicators in strategies/indicators.py. Each update()
+# consumes one value or bar in O(1) time and constant memory and returns the
+# indicator value for that bar (NaN during warm-up), matching the batch results.
+
+
+class StreamingSMA:
+    # Simple moving average over a ring buffer. While a NaN is in the window the average is NaN,
+    # and the running total is rebuilt from the buffer once the last NaN has left it.
+    def __init__(self, length):
+        self.length = length
+        self.buffer = [0.0] * length
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+        self.nans = 0
+
+    def update(self, value):
+        old = self.buffer[self.index]
+        self.nans += math.isnan(value) - math.isnan(old)
+        if self.nans or math.isnan(old):
+            self.buffer[self.index] = value
+            if not self.nans:
+                self.total = math.fsum(self.buffer)
+        else:
+            self.total += value - old
+            self.buffer[self.index] = value
+        self.index = (self.index + 1) % self.length
+        self.count = min(self.count + 1, self.length)
+        if self.nans or self.count < self.length:
+            return math.nan
+        return self.total / self.length
+
+
+class StreamingBollinger:
+    # Bollinger Bands from a sliding-window running mean and sum of squared deviations.
+    # NaNs are handled as in StreamingSMA: the bands are NaN while one is in the window,
+    # and the mean and squared deviations are rebuilt from the buffer when the last leaves it.
+    def __init__(self, length=20, std=2.0):
+        self.length = length
+        self.std = std
+        self.buffer = [0.0] * length
+        self.index = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.nans = 0
+
+    def _rebuild(self):
+        # Mean and sum of squared deviations of the values in the window
+        values = self.buffer[:self.count]
+        self.mean = math.fsum(values) / self.count
+        self.m2 = math.fsum((value - self.mean) ** 2 for value in values)
+
+    def update(self, value):
+        old = self.buffer[self.index] if self.count == self.length else 0.0
+        self.nans += math.isnan(value) - math.isnan(old)
+        if self.nans or math.isnan(old):
+            self.buffer[self.index] = value
+            self.count = min(self.count + 1, self.length)
+            if not self.nans:
+                self._rebuild()
+        elif self.count < self.length:
+            # Welford update while the window is filling
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+            self.buffer[self.index] = value
+        else:
+            # Replace the oldest value in the window
+            old_mean = self.mean
+            self.mean += (value - old) / self.length
+            self.m2 += (value - old) * (value - self.mean + old - old_mean)
+            self.buffer[self.index] = value
+        self.index = (self.index + 1) % self.length
+        if self.nans or self.count < self.length:
+            return math.nan, math.nan, math.nan
+        deviation = self.std * math.sqrt(max(self.m2, 0.0) / self.length)
+        return self.mean - deviation, self.mean, self.mean + deviation
+
+
+class StreamingEMA:
+    # EMA seeded with the mean of the first `length` inputs (NaN inputs are skipped in the seed).
+    # After a NaN input the last value keeps its decayed weight, as in pandas' ewm(adjust=False).
+    def __init__(self, length):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.seen = 0
+        self.seed_total = 0.0
+        self.seed_count = 0
+        self.value = math.nan
+        self.weight = 1.0
+
+    def update(self, value):
+        if self.seen < self.length:
+            self.seen += 1
+            if not math.isnan(value):
+                self.seed_total += value
+                self.seed_count += 1
+            if self.seen == self.length and self.seed_count:
+                self.value = self.seed_total / self.seed_count
+            return self.value
+        if math.isnan(value):
+            self.weight *= 1 - self.alpha
+        elif math.isnan(self.value):
+            self.value = value
+        else:
+            weight = self.weight * (1 - self.alpha)
+            if weight == 1 - self.alpha:
+                self.value = self.alpha * value + weight * self.value
+            else:
+                # pandas gives the new value the remaining weight when alpha is 0.5 (com == 1)
+                new_weight = 1 - weight if self.alpha == 0.5 else self.alpha
+                self.value = (weight * self.value + new_weight * value) / (weight + new_weight)
+            self.weight = 1.0
+        return self.value
+
+
+class StreamingKeltner:
+    # Keltner Channels: EMA of close +/- scalar * EMA of the true range
+    def __init__(self, length=20, scalar=2.0):
+        self.scalar = scalar
+        self.basis = StreamingEMA(length)
+        self.band = StreamingEMA(length)
+        self.prev_close = math.nan
+
+    def update(self, high, low, close):
+        if math.isnan(self.prev_close):
+            true_range = math.nan
+        else:
+            true_range = max(abs(high - low), abs(high - self.prev_close), abs(self.prev_close - low))
+        self.prev_close = close
+        basis = self.basis.update(close)
+        band = self.band.update(true_range)
+        return basis - self.scalar * band, basis, basis + self.scalar * band
+
+
+class StreamingChaikin:
+    # Chaikin Oscillator from a running A/D line and its fast and slow EMAs
+    def __init__(self, fast=3, slow=10):
+        self.line = 0.0
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+
+    def update(self, high, low, close, volume):
+        high_low = (high - low) or sys.float_info.epsilon
+        flow = (2 * close - (high + low)) * (volume / high_low)
+        if math.isnan(flow):
+            # As in indicators.ad: NaN on this bar, while the running line carries on as if the flow were 0
+            return self.fast.update(math.nan) - self.slow.update(math.nan)
+        self.line += flow
+        return self.fast.update(self.line) - self.slow.update(self.line)
+
+
+class StreamingSignalEngine:
+    """
+    Bar-by-bar Bollinger-Keltner Chaikin SMA signals
+    ------------------------------------------------
+    Keeps O(1) incremental state for every indicator the strategies use and
+    evaluates their entry conditions as each OHLCV bar arrives, without
+    recomputing history, and applies the entry rules of strategies/rules.py to
+    them: 'buy' on a long entry, 'sell' on a short entry (unless long_only),
+    otherwise None.
+    """
+
+    def __init__(self, bb_length=20, bb_std=2.0, kc_length=20, kc_scalar=2.0,
+                 adosc_fast=3, adosc_slow=10, sma_length=100, long_only=False):
+        self.bollinger = StreamingBollinger(bb_length, bb_std)
+        self.keltner = StreamingKeltner(kc_length, kc_scalar)
+        self.chaikin = StreamingChaikin(adosc_fast, adosc_slow)
+        self.sma = StreamingSMA(sma_length)
+        self.rules = rules.RuleSet(long_only=long_only)
+        self.previous = dict.fromkeys(rules.ENTRY_SERIES, math.nan)
+        self.bars = 0
+
+    def update(self, bar):
+        # bar: mapping with High, Low, Close and Volume
+        high, low, close, volume = float(bar['High']), float(bar['Low']), float(bar['Close']), float(bar['Volume'])
+        bb_lower, _, bb_upper = self.bollinger.update(close)
+        kc_lower, _, kc_upper = self.keltner.update(high, low, close)
+        chaikin = self.chaikin.update(high, low, close, volume)
+        sma = self.sma.update(close)
+        current = {'bb_upper': bb_upper, 'bb_lower': bb_lower, 'kc_upper': kc_upper, 'kc_lower': kc_lower,
+                   'chaikin': chaikin, 'sma': sma}
+        side = self.rules.entry(current, self.previous)
+        self.previous = current
+        self.bars += 1
+        return {rules.LONG: 'buy', rules.SHORT: 'sell'}.get(side)
+
+
+class StreamingStrategy(Strategy):
+    # Adapter so the streaming engine can be registered with TradingFramework;
+    # execute() takes one bar and returns the decision for it
+    def __init__(self, **params):
+        self.engine = StreamingSignalEngine(**params)
+
+    def execute(self, data):
+        return self.engine.update(data)
+
+
+def replay_frame(frame):
+    # Yield the rows of an OHLCV frame as bar dicts, oldest first
+    for date, open_, high, low, close, volume in frame[['Open', 'High', 'Low', 'Close', 'Volume']].itertuples():
+        yield {'Date': date, 'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}
+
+
+def replay_csv(filename):
+    # Replay one of the data/*.csv files as a local bar feed
+    return replay_frame(pd.read_csv(filename, index_col='Date', parse_dates=True))
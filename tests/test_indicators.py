@@ -0,0 +1,117 @@
+import os
+import glob
+import numpy as np
+import pandas as pd
+import pytest
+from strategies import indicators
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# pandas_ta 0.3.14b output for SPY and TSLA, recorded from the indicator data of the baseline's
+# backtesting.py plots (BollingerKeltnerChaikinSMAStrategy.html and HTML/...), with the exact
+# OHLCV inputs it was computed from
+REFERENCES = sorted(glob.glob(os.path.join(ROOT, 'tests', 'data', 'pandas_ta_*.csv')))
+DATA_FILES = sorted(glob.glob(os.path.join(ROOT, 'data', '*.csv')))
+
+
+def assert_matches(actual, expected, rtol=1e-10):
+    # Same NaN warm-up, and values equal up to rtol of the series' scale
+    actual = np.asarray(actual, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    valid = ~np.isnan(expected)
+    scale = np.abs(expected[valid]).max() if valid.any() else 1.0
+    np.testing.assert_allclose(actual[valid], expected[valid], rtol=rtol, atol=rtol * scale)
+
+
+def ohlcv(frame):
+    return [frame[column].to_numpy(np.float64) for column in ('High', 'Low', 'Close', 'Volume')]
+
+
+def computed(frame):
+    high, low, close, volume = ohlcv(frame)
+    bb_lower, _, bb_upper = indicators.bbands(close, 20, 2.0)
+    kc_lower, _, kc_upper = indicators.kc(high, low, close, 20, 2.0)
+    return {
+        'BBU_20_2.0': bb_upper,
+        'BBL_20_2.0': bb_lower,
+        'KCUe_20_2.0': kc_upper,
+        'KCLe_20_2.0': kc_lower,
+        'ADOSC_3_10': indicators.adosc(high, low, close, volume, 3, 10),
+        'SMA_100': indicators.sma(close, 100),
+    }
+
+
+@pytest.mark.parametrize('path', REFERENCES, ids=os.path.basename)
+def test_matches_recorded_pandas_ta(path):
+    reference = pd.read_csv(path, float_precision='round_trip')
+    for column, values in computed(reference).items():
+        assert_matches(values, reference[column], rtol=1e-10)
+
+
+@pytest.mark.parametrize('path', DATA_FILES, ids=os.path.basename)
+def test_matches_pandas_ta(path):
+    ta = pytest.importorskip('pandas_ta')
+    frame = pd.read_csv(path, index_col='Date', parse_dates=True).dropna(subset=['Close'])
+    high, low, close, volume = (frame[column].astype(np.float64) for column in ('High', 'Low', 'Close', 'Volume'))
+    bb = ta.bbands(close, length=20, std=2.0)
+    kc = ta.kc(high, low, close, length=20, scalar=2)
+    expected = {
+        'BBU_20_2.0': bb['BBU_20_2.0'],
+        'BBL_20_2.0': bb['BBL_20_2.0'],
+        'KCUe_20_2.0': kc['KCUe_20_2.0'],
+        'KCLe_20_2.0': kc['KCLe_20_2.0'],
+        'ADOSC_3_10': ta.adosc(high, low, close, volume, fast=3, slow=10),
+        'SMA_100': ta.sma(close, length=100),
+    }
+    for column, values in computed(frame).items():
+        assert_matches(values, expected[column], rtol=1e-9)
+
+
+def test_batch_matches_single_series():
+    # Tickers stacked on a shared calendar get the same values as each series alone
+    frames = [pd.read_csv(path, float_precision='round_trip') for path in REFERENCES]
+    n = max(len(frame) for frame in frames) + 50
+    stacked = []
+    for column in ('High', 'Low', 'Close', 'Volume'):
+        values = np.full((n, len(frames)), np.nan)
+        for j, frame in enumerate(frames):
+            values[n - len(frame):, j] = frame[column].to_numpy(np.float64)
+        stacked.append(values)
+    high, low, close, volume = stacked
+    batch = {
+        'BBU_20_2.0': indicators.bbands(close, 20, 2.0)[2],
+        'KCLe_20_2.0': indicators.kc(high, low, close, 20, 2.0)[0],
+        'ADOSC_3_10': indicators.adosc(high, low, close, volume, 3, 10),
+        'SMA_100': indicators.sma(close, 100),
+    }
+    for j, frame in enumerate(frames):
+        single = computed(frame)
+        offset = n - len(frame)
+        for column, values in batch.items():
+            assert np.isnan(values[:offset, j]).all()
+            assert_matches(values[offset:, j], single[column], rtol=1e-12)
+
+
+def test_stdev_is_accurate_on_long_series():
+    # A long trending series: every window against a direct computation
+    rng = np.random.default_rng(0)
+    close = 1000 + np.cumsum(rng.normal(0, 1, 500_000))
+    result = indicators.stdev(close, 20)
+    expected = np.lib.stride_tricks.sliding_window_view(close, 20).std(axis=1)
+    assert np.isnan(result[:19]).all()
+    assert (result[19:] > 0).all()
+    np.testing.assert_allclose(result[19:], expected, rtol=1e-12)
+
+
+def test_values_do_not_depend_on_later_bars():
+    reference = pd.read_csv(REFERENCES[0], float_precision='round_trip')
+    high, low, close, volume = ohlcv(reference)
+    high = high.copy()
+    cut = len(close) // 2
+    # A later bar with a zero high-low range must not move earlier values
+    high[cut + 10] = low[cut + 10]
+    full = computed(pd.DataFrame({'High': high, 'Low': low, 'Close': close, 'Volume': volume}))
+    prefix = computed(pd.DataFrame({'High': high[:cut], 'Low': low[:cut], 'Close': close[:cut],
+                                    'Volume': volume[:cut]}))
+    for column, values in prefix.items():
+        np.testing.assert_array_equal(full[column][:cut], values)
@@ -0,0 +1,50 @@
+import os
+import glob
+import numpy as np
+import pandas as pd
+import pytest
+from strategies import indicators
+from strategies.streaming import StreamingBollinger, StreamingChaikin, StreamingEMA, StreamingSMA
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REFERENCES = sorted(glob.glob(os.path.join(ROOT, 'tests', 'data', 'pandas_ta_*.csv')))
+
+
+@pytest.mark.parametrize('length', [3, 4, 10])
+def test_ema_matches_batch_across_gaps(length):
+    values = np.cumsum(np.random.default_rng(0).normal(size=2000))
+    values[[3, 30, 31, 32, 500]] = np.nan
+    ema = StreamingEMA(length)
+    streamed = np.array([ema.update(value) for value in values])
+    expected = indicators.ema(values, length)
+    np.testing.assert_array_equal(np.isnan(streamed), np.isnan(expected))
+    np.testing.assert_allclose(streamed, expected, rtol=1e-12, equal_nan=True)
+
+
+def test_chaikin_recovers_from_nan_volume():
+    # A bar without volume is NaN in the A/D line but must not stop the oscillator
+    frame = pd.read_csv(REFERENCES[0], float_precision='round_trip')
+    high, low, close = (frame[column].to_numpy(np.float64) for column in ('High', 'Low', 'Close'))
+    volume = frame['Volume'].to_numpy(np.float64).copy()
+    volume[[5, 50, 51, 400]] = np.nan
+    chaikin = StreamingChaikin(3, 10)
+    streamed = np.array([chaikin.update(*bar) for bar in zip(high, low, close, volume)])
+    expected = indicators.adosc(high, low, close, volume, 3, 10)
+    assert np.isfinite(streamed[-100:]).all()
+    np.testing.assert_allclose(streamed, expected, rtol=1e-10, atol=1e-10 * np.nanmax(np.abs(expected)),
+                               equal_nan=True)
+
+
+@pytest.mark.parametrize('positions', [[10], [3], [30, 35, 500]])
+def test_sma_and_bollinger_recover_from_nan_close(positions):
+    # A NaN close makes the window NaN only until it has left the window
+    values = 100 + np.cumsum(np.random.default_rng(1).normal(size=1000))
+    values[positions] = np.nan
+    sma, bollinger = StreamingSMA(20), StreamingBollinger(20, 2.0)
+    streamed_sma = np.array([sma.update(value) for value in values])
+    streamed_bands = np.array([bollinger.update(value) for value in values]).T
+    np.testing.assert_array_equal(np.isnan(streamed_sma), np.isnan(indicators.sma(values, 20)))
+    np.testing.assert_allclose(streamed_sma, indicators.sma(values, 20), rtol=1e-10, equal_nan=True)
+    for streamed, expected in zip(streamed_bands, indicators.bbands(values, 20, 2.0)):
+        np.testing.assert_array_equal(np.isnan(streamed), np.isnan(expected))
+        np.testing.assert_allclose(streamed, expected, rtol=1e-10, equal_nan=True)
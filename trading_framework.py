@@ -1,19 +1,197 @@
-class TradingFramework:
+import time
+import asyncio
+import threading
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+
+class StrategyStats:
+    # Call, error and latency counters for one hosted strategy. Throughput is calls per second
+    # between the start of the first call and the end of the last one, so idle time before
+    # the first bar does not dilute it.
     def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_latency = 0.0
+        self.last_latency = 0.0
+        self.first_started = None
+        self.last_finished = None
+
+    def record(self, latency, failed=False):
+        finished = time.perf_counter()
+        with self._lock:
+            started = finished - latency
+            if self.first_started is None or started < self.first_started:
+                self.first_started = started
+            self.last_finished = finished if self.last_finished is None else max(self.last_finished, finished)
+            self.calls += 1
+            self.errors += int(failed)
+            self.total_time += latency
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def as_dict(self):
+        with self._lock:
+            elapsed = self.last_finished - self.first_started if self.calls else 0.0
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'mean_latency': self.total_time / self.calls if self.calls else 0.0,
+                'max_latency': self.max_latency,
+                'last_latency': self.last_latency,
+                'busy_time': self.total_time,
+                'throughput': self.calls / elapsed if elapsed > 0 else 0.0,
+            }
+
+
+class StrategyResult:
+    # Outcome of one strategy on one piece of data: its return value or the exception it raised
+    __slots__ = ('name', 'value', 'error', 'latency')
+
+    def __init__(self, name, value=None, error=None, latency=0.0):
+        self.name = name
+        self.value = value
+        self.error = error
+        self.latency = latency
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        outcome = f"error={self.error!r}" if self.error is not None else f"value={self.value!r}"
+        return f"StrategyResult({self.name!r}, {outcome}, latency={self.latency:.6f})"
+
+
+def _read_only(data):
+    # Hand the data to one strategy without copying it, but stop the strategy writing into what the others
+    # see: arrays become read-only views, dicts read-only mappings of their values, and DataFrames or Series
+    # shallow copies, which copy-on-write (the default since pandas 3) keeps apart from the original
+    if isinstance(data, np.ndarray):
+        if data.flags.writeable:
+            data = data.view()
+            data.flags.writeable = False
+        return data
+    if isinstance(data, dict):
+        return MappingProxyType({key: _read_only(value) for key, value in data.items()})
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        return data.copy(deep=False)
+    return data
+
+
+class TradingFramework:
+    """
+    Runtime hosting many strategies in one process
+    ----------------------------------------------
+    Strategies implement strategy_base.Strategy.execute(data). run_strategy()
+    runs one of them synchronously; run_all() fans the same data out to every
+    registered strategy (or a subset) on a shared thread pool and returns one
+    StrategyResult per strategy, so a failing strategy never stops the others.
+    The data itself is never copied: NumPy arrays are handed over as read-only
+    views, dicts as read-only mappings, and DataFrames or Series as shallow
+    copies, so no strategy can change the bar the others are reading.
+
+    run_stream() and run_stream_async() feed a sequence of bars through
+    run_all() one bar at a time, which keeps each strategy's calls in bar order.
+    get_stats() reports calls, errors, latency and throughput per strategy.
+    """
+
+    def __init__(self, max_workers=None):
         self.strategies = {}
+        self.stats = {}
+        self.max_workers = max_workers
+        self._executor = None
 
     def add_strategy(self, name, strategy):
         self.strategies[name] = strategy
+        self.stats[name] = StrategyStats()
 
     def remove_strategy(self, name):
         if name in self.strategies:
             del self.strategies[name]
+            del self.stats[name]
+
+    def _execute(self, name, data):
+        # Run one strategy, timing it and capturing any exception in the result
+        started = time.perf_counter()
+        try:
+            value = self.strategies[name].execute(data)
+        except Exception as error:
+            latency = time.perf_counter() - started
+            self.stats[name].record(latency, failed=True)
+            return StrategyResult(name, error=error, latency=latency)
+        latency = time.perf_counter() - started
+        self.stats[name].record(latency)
+        return StrategyResult(name, value=value, latency=latency)
 
     def run_strategy(self, name, data):
         if name in self.strategies:
-            return self.strategies[name].execute(data)
+            result = self._execute(name, data)
+            if result.error is not None:
+                raise result.error
+            return result.value
         else:
             raise ValueError(f"Strategy {name} not found.")
 
+    def _names(self, names):
+        names = self.list_strategies() if names is None else list(names)
+        for name in names:
+            if name not in self.strategies:
+                raise ValueError(f"Strategy {name} not found.")
+        return names
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='strategy')
+        return self._executor
+
+    def run_all(self, data, names=None):
+        # Run the strategies concurrently on the same data; returns {name: StrategyResult}
+        names = self._names(names)
+        if len(names) == 1:
+            return {names[0]: self._execute(names[0], _read_only(data))}
+        futures = {name: self._pool().submit(self._execute, name, _read_only(data)) for name in names}
+        return {name: future.result() for name, future in futures.items()}
+
+    async def run_all_async(self, data, names=None):
+        # Awaitable run_all() for asyncio feeds; the strategies still run on the thread pool
+        names = self._names(names)
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(loop.run_in_executor(self._pool(), self._execute, name, _read_only(data))
+                                         for name in names))
+        return dict(zip(names, results))
+
+    def run_stream(self, bars, names=None):
+        # Feed bars one at a time to every strategy, yielding the results per bar
+        for bar in bars:
+            yield self.run_all(bar, names)
+
+    async def run_stream_async(self, bars, names=None):
+        # Async version of run_stream() for an async iterator of bars
+        async for bar in bars:
+            yield await self.run_all_async(bar, names)
+
+    def get_stats(self):
+        return {name: stats.as_dict() for name, stats in self.stats.items()}
+
+    def reset_stats(self):
+        for name in self.stats:
+            self.stats[name] = StrategyStats()
+
     def list_strategies(self):
         return list(self.strategies.keys())
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
@@ -0,0 +1,180 @@
+import os
+import io
+import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import config
+import batch_runner
+import optimizer
+from data_store import MarketDataStore, CSVSource, YFinanceSource
+from strategies import indicator_cache
+
+
+def walk_forward_windows(start_date, end_date, train_months=24, test_months=6, anchored=False, last_date=None):
+    # (train start, train end, test start, test end) per step; test windows are back to back and
+    # the train window either rolls with them or stays anchored at start_date. Given the date of the
+    # last bar, windows stop after it instead of running on to end_date with no bars to test.
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    if last_date is not None:
+        end = min(end, pd.Timestamp(last_date).normalize() + pd.Timedelta(days=1))
+    windows = []
+    train_start = start
+    test_start = start + pd.DateOffset(months=train_months)
+    while test_start < end:
+        test_end = min(test_start + pd.DateOffset(months=test_months), end)
+        windows.append(tuple(date.strftime('%Y-%m-%d') for date in (train_start, test_start, test_start, test_end)))
+        test_start = test_end
+        if not anchored:
+            train_start = test_start - pd.DateOffset(months=train_months)
+    return windows
+
+
+def _init_worker(store_root, tickers, start_date, end_date):
+    # Load the data as the batch workers do and register each full history, so every train and
+    # test window in this worker slices indicators computed once on the whole series
+    batch_runner._init_worker(store_root, tickers, start_date, end_date)
+    for frame in batch_runner._worker_frames.values():
+        indicator_cache.register_history(frame.index, frame['High'], frame['Low'], frame['Close'], frame['Volume'])
+
+
+def run_window(task):
+    # Optimize on the train window, then backtest the best parameters on the test window
+    from backtesting import Backtest
+    ticker, strategy_name, candidates, metric, (train_start, train_end, test_start, test_end) = task
+    started = time.perf_counter()
+    scores = pd.DataFrame([optimizer.evaluate((ticker, strategy_name, params, train_start, train_end))
+                           for params in candidates])
+    row = {'Ticker': ticker, 'Strategy': strategy_name, 'Train Start': train_start, 'Train End': train_end,
+           'Test Start': test_start, 'Test End': test_end}
+    names = list(candidates[0])
+    best = optimizer.rank_results(scores, metric).iloc[0]
+    params = {name: best[name].item() if hasattr(best[name], 'item') else best[name] for name in names}
+    row.update(params)
+    row[f'Train {metric}'] = best.get(metric, np.nan)
+
+    frame = batch_runner._worker_frames[ticker]
+    data = frame.loc[(frame.index >= pd.Timestamp(test_start)) & (frame.index < pd.Timestamp(test_end))]
+    equity = None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            bt = Backtest(data, batch_runner._worker_strategies[strategy_name], cash=config.initial_balance,
+                          commission=config.commission, exclusive_orders=True)
+            output = bt.run(**params)
+    except Exception as error:
+        row['Error'] = f"{type(error).__name__}: {error}"
+    else:
+        row.update({f'Test {name}': output[name] for name in optimizer.METRICS + ['# Trades']})
+        equity = output['_equity_curve']['Equity']
+    row['Run Time [s]'] = time.perf_counter() - started
+    return row, equity
+
+
+def stitch_equity(segments, cash=config.initial_balance):
+    # Chain the test-window equity curves: each segment is rescaled to start from the
+    # capital the previous one ended with
+    pieces = []
+    capital = cash
+    for segment in segments:
+        if segment is None or segment.empty:
+            continue
+        scaled = segment / segment.iloc[0] * capital
+        pieces.append(scaled)
+        capital = scaled.iloc[-1]
+    if not pieces:
+        return pd.Series(dtype=np.float64, name='Equity')
+    return pd.concat(pieces).rename('Equity')
+
+
+class WalkForward:
+    """
+    Walk-forward evaluation of the Bollinger-Keltner Chaikin SMA strategies
+    -----------------------------------------------------------------------
+    Splits the history into rolling or anchored train/test windows, picks the
+    best parameters on each train window with the optimizer's candidates and
+    backtests them on the following test window. Windows run in parallel over a
+    process pool. Every worker registers the full price histories with
+    strategies.indicator_cache, so the indicators for a parameter set are
+    computed once per series and sliced for each overlapping window rather
+    than recomputed; test windows also start with warmed-up indicators.
+    The test segments are stitched into one out-of-sample equity curve per ticker.
+    """
+
+    def __init__(self, tickers, strategy_name='BollingerKeltnerChaikinSMAStrategy', start_date="2018-01-01",
+                 end_date="2024-12-31", train_months=24, test_months=6, anchored=False, processes=None, store=None):
+        self.tickers = list(tickers)
+        self.strategy_name = strategy_name
+        self.start_date = start_date
+        self.end_date = end_date
+        self.processes = processes or os.cpu_count()
+        self.store = store if store is not None else MarketDataStore()
+        for ticker in self.tickers:
+            self.store.update(ticker, start_date, end_date)
+        # Date of each ticker's last stored bar; windows end with the data rather than at end_date
+        self.last_dates = {}
+        for ticker in self.tickers:
+            dates = self.store.load(ticker, start_date, end_date, ['Close'])['Date']
+            if len(dates):
+                self.last_dates[ticker] = pd.Timestamp(dates[-1])
+        self.windows = walk_forward_windows(start_date, end_date, train_months, test_months, anchored,
+                                            max(self.last_dates.values(), default=None))
+
+    def run(self, candidates, metric='Sharpe Ratio'):
+        # Returns (one row per ticker and window, {ticker: stitched out-of-sample equity})
+        tasks = [(ticker, self.strategy_name, candidates, metric, window)
+                 for ticker in self.tickers for window in self.windows
+                 if ticker not in self.last_dates or pd.Timestamp(window[2]) <= self.last_dates[ticker]]
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker,
+                                 initargs=(self.store.root, self.tickers, self.start_date, self.end_date)) as executor:
+            outcomes = list(executor.map(run_window, tasks))
+        results = pd.DataFrame([row for row, _ in outcomes])
+        equity = {ticker: stitch_equity([curve for (row, curve) in outcomes if row['Ticker'] == ticker])
+                  for ticker in self.tickers}
+        return results, equity
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward optimization and out-of-sample evaluation.")
+    parser.add_argument('--tickers', nargs='+', default=['SPY'])
+    parser.add_argument('--strategy', default=batch_runner.STRATEGY_NAMES[0], choices=batch_runner.STRATEGY_NAMES)
+    parser.add_argument('--start', default="2018-01-01")
+    parser.add_argument('--end', default="2024-12-31")
+    parser.add_argument('--train-months', type=int, default=24)
+    parser.add_argument('--test-months', type=int, default=6)
+    parser.add_argument('--anchored', action='store_true', help="Grow the train window from --start instead of rolling it")
+    parser.add_argument('--method', choices=['grid', 'random'], default='random')
+    parser.add_argument('--n-iter', type=int, default=20, help="Candidates for random search")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--metric', default='Sharpe Ratio', choices=optimizer.METRICS)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--source', choices=['yfinance', 'csv'], default='yfinance')
+    parser.add_argument('--output', default=os.path.join('backtesting_results', 'walk_forward'))
+    args = parser.parse_args()
+
+    if args.source == 'csv':
+        source = CSVSource.from_lists('./stocks/options.txt', './stocks/tickers.txt', './data')
+    else:
+        source = YFinanceSource()
+    if args.method == 'grid':
+        candidates = optimizer.grid_candidates(optimizer.PARAM_SPACE)
+    else:
+        candidates = optimizer.random_candidates(optimizer.PARAM_SPACE, args.n_iter, args.seed)
+    walk_forward = WalkForward(args.tickers, args.strategy, args.start, args.end, args.train_months,
+                               args.test_months, args.anchored, args.processes, MarketDataStore(source=source))
+
+    started = time.perf_counter()
+    results, equity = walk_forward.run(candidates, args.metric)
+    print(f"Walk-forward over {len(walk_forward.windows)} windows finished in {time.perf_counter() - started:.2f}s")
+    print(results.drop(columns=['Strategy']).to_string(index=False))
+
+    os.makedirs(args.output, exist_ok=True)
+    results.to_csv(os.path.join(args.output, 'walk_forward_results.csv'), index=False)
+    for ticker, curve in equity.items():
+        curve.to_csv(os.path.join(args.output, f"{ticker.replace('^', '').lower()}_oos_equity_curve.csv"))
+    print(f"Walk-forward results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()